@@ -1,33 +1,69 @@
 # Register your models here.
 from django.contrib import admin
+
+from config.admin import LargeTableAdminMixin
 from .models import Shop, Category, Product, ProductInfo, Parameter, ProductParameter
+from .services.shops import set_shops_state
 
 @admin.register(Shop)
 class ShopAdmin(admin.ModelAdmin):
     list_display = ("id", "name", "state", "user", "url", "created_at")
     list_filter = ("state",)
+    list_select_related = ("user",)
     search_fields = ("name", "url", "user__username", "user__email")
+    autocomplete_fields = ("user",)
+    actions = ("enable_shops", "disable_shops")
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if "state" in form.changed_data:
+            # Предложения магазина переключаются вместе с ним (ProductInfo.shop_enabled)
+            set_shops_state([obj.pk], obj.state)
+
+    @admin.action(description="Включить выбранные магазины")
+    def enable_shops(self, request, queryset):
+        changed = set_shops_state(queryset.values_list("id", flat=True), True)
+        self.message_user(request, f"Включено магазинов: {changed}")
+
+    @admin.action(description="Выключить выбранные магазины")
+    def disable_shops(self, request, queryset):
+        changed = set_shops_state(queryset.values_list("id", flat=True), False)
+        self.message_user(request, f"Выключено магазинов: {changed}")
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ("id", "name")
     search_fields = ("name",)
-    filter_horizontal = ("shops",)
+    # filter_horizontal выводит в форму все магазины сразу
+    autocomplete_fields = ("shops",)
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "name", "category")
     list_filter = ("category",)
+    list_select_related = ("category",)
     search_fields = ("name",)
+    autocomplete_fields = ("category",)
 
 
 @admin.register(ProductInfo)
-class ProductInfoAdmin(admin.ModelAdmin):
+class ProductInfoAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "external_id", "model", "product", "shop", "name", "quantity", "price", "price_rrc")
-    list_filter = ("shop",)
-    search_fields = ("product__name", "name", "shop__name", "model")
+    list_filter = ("shop", "shop_enabled")
+    list_select_related = ("product", "shop")
+    # Только поля с trigram-индексом: OR с полями других таблиц (product__name, shop__name)
+    # индекс не использует. Товар ищется в своём списке, магазин — фильтром
+    search_fields = ("name", "model")
+    autocomplete_fields = ("product", "shop")
+    readonly_fields = ("shop_enabled",)
+
+    def save_model(self, request, obj, form, change):
+        if not change or "shop" in form.changed_data:
+            # Новое или перенесённое предложение — в состоянии своего магазина
+            obj.shop_enabled = obj.shop.state
+        super().save_model(request, obj, form, change)
 
 @admin.register(Parameter)
 class ParameterAdmin(admin.ModelAdmin):
@@ -36,7 +72,20 @@ class ParameterAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProductParameter)
-class ProductParameterAdmin(admin.ModelAdmin):
+class ProductParameterAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "product_info", "parameter", "value")
     list_filter = ("parameter",)
-    search_fields = ("product_info__product__name", "value", "parameter__name")
\ No newline at end of file
+    list_select_related = ("product_info__product", "product_info__shop", "parameter")
+    search_fields = ("value",)
+    autocomplete_fields = ("product_info", "parameter")
+
+    # Только просмотр: каталог читает ProductInfo.params, а строки ProductParameter — копия,
+    # которую пишет импорт. Параметры предложения правятся в его params (ProductInfoAdmin)
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,135 @@
+"""
+Async-версии read-эндпоинтов каталога для запуска под ASGI (CATALOG_ASYNC_VIEWS=1).
+
+Ответы совпадают с sync DRF-views (те же сериализаторы, фильтры и рендерер), но запрос
+не уходит целиком в пул потоков: ORM вызывается через async API (aiterator/afirst),
+готовый JSON кэшируется по версии каталога (apps.catalog.cache).
+"""
+from __future__ import annotations
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from apps.catalog import cache as catalog_cache
+from apps.catalog.models import Category, Shop
+from apps.users.authentication import ClaimsJWTAuthentication
+from apps.users.throttling import CatalogReadThrottle, LocMemTokenBucketStore, get_store
+from config.fastjson import FastJSONRenderer
+
+from .serializers import CategorySerializer, ProductSerializer, ShopSerializer
+from .views import ProductListAPIView, filter_products, product_queryset
+
+# Сколько товаров за раз: на каждый чанк — свои prefetch-запросы (офферы, параметры)
+PRODUCT_CHUNK_SIZE = 1000
+
+
+def product_ordering(params) -> list[str]:
+    """
+    ?ordering= так же, как OrderingFilter у ProductListAPIView: неизвестные поля отбрасываются.
+    """
+    allowed = set(ProductListAPIView.ordering_fields)
+    fields = [
+        term.strip() for term in params.get("ordering", "").split(",")
+        if term.strip().lstrip("-") in allowed
+    ]
+    return fields or list(ProductListAPIView.ordering)
+
+
+def _json_response(body: bytes, status: int = 200, headers: dict | None = None) -> HttpResponse:
+    return HttpResponse(body, status=status, content_type="application/json", headers=headers)
+
+
+def _error_response(exc: exceptions.APIException, request) -> HttpResponse:
+    # Те же ответы, что даёт exception handler DRF
+    headers = {}
+    status = exc.status_code
+    if isinstance(exc, (exceptions.AuthenticationFailed, exceptions.NotAuthenticated)):
+        status = 401
+        headers["WWW-Authenticate"] = ClaimsJWTAuthentication().authenticate_header(request)
+    if getattr(exc, "wait", None):
+        headers["Retry-After"] = "%d" % exc.wait
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    return _json_response(FastJSONRenderer().render(data), status, headers)
+
+
+class AsyncCatalogView(View):
+    """
+    Троттлинг (CatalogReadThrottle), кэш готового JSON, рендер. Данные — aget_data(): по умолчанию
+    весь queryset через serializer_class (списки); наследники со своей выборкой его переопределяют.
+
+    Пользователь для ключа троттлинга — только по JWT: анонимный запрос не покидает event loop,
+    запрос с токеном проверяется в потоке (старый токен может потребовать загрузки из БД).
+    """
+    http_method_names = ["get", "head", "options"]
+    url_name: str = ""
+    queryset = None
+    serializer_class = None
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            await self.check_throttle(request)
+
+            key = None
+            if catalog_cache.cache_timeout():
+                name = ":".join([self.url_name, *map(str, kwargs.values())])
+                key = catalog_cache.response_key(name, await catalog_cache.aget_version(), request.GET)
+                body = await catalog_cache.aget(key)
+                if body is not None:
+                    return _json_response(body)
+
+            body = FastJSONRenderer().render(await self.aget_data(request, *args, **kwargs))
+        except exceptions.APIException as exc:
+            return _error_response(exc, request)
+
+        if key is not None:
+            await catalog_cache.aset(key, body)
+        return _json_response(body)
+
+    async def check_throttle(self, request) -> None:
+        throttle = CatalogReadThrottle()
+        drf_request = Request(request, authenticators=[ClaimsJWTAuthentication()])
+        if "HTTP_AUTHORIZATION" in request.META or not isinstance(get_store(), LocMemTokenBucketStore):
+            allowed = await sync_to_async(throttle.allow_request)(drf_request, self)
+        else:
+            allowed = throttle.allow_request(drf_request, self)
+        if not allowed:
+            raise exceptions.Throttled(throttle.wait())
+
+    async def aget_data(self, request, *args, **kwargs):
+        # .all() — свежий queryset на каждый запрос, как get_queryset() у DRF
+        objects = [obj async for obj in self.queryset.all()]
+        return self.serializer_class(objects, many=True).data
+
+
+class CategoryListAsyncView(AsyncCatalogView):
+    url_name = "catalog-categories"
+    queryset = Category.objects.order_by("name")
+    serializer_class = CategorySerializer
+
+
+class ShopListAsyncView(AsyncCatalogView):
+    url_name = "catalog-shops"
+    queryset = Shop.objects.order_by("name")
+    serializer_class = ShopSerializer
+
+
+class ProductListAsyncView(AsyncCatalogView):
+    url_name = "catalog-products"
+
+    async def aget_data(self, request):
+        qs = filter_products(product_queryset(), request.GET).order_by(*product_ordering(request.GET))
+        products = [product async for product in qs.aiterator(chunk_size=PRODUCT_CHUNK_SIZE)]
+        return ProductSerializer(products, many=True).data
+
+
+class ProductDetailAsyncView(AsyncCatalogView):
+    url_name = "catalog-product-detail"
+
+    async def aget_data(self, request, pk):
+        product = await product_queryset().filter(pk=pk).afirst()
+        if product is None:
+            raise exceptions.NotFound("No Product matches the given query.")
+        return ProductSerializer(product).data
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+# Версия каталога входит в ключ каждого закэшированного ответа: изменение каталога
+# увеличивает её, и старые записи больше не читаются (доживают до таймаута)
+VERSION_KEY = "catalog:version"
+
+
+def cache_timeout() -> int:
+    """
+    0 — кэш ответов каталога выключен.
+    """
+    return getattr(settings, "CATALOG_CACHE_TIMEOUT", 60)
+
+
+def response_key(view: str, version: int, params) -> str:
+    query = "&".join(f"{key}={value}" for key, values in sorted(params.lists()) for value in values)
+    digest = hashlib.md5(query.encode(), usedforsecurity=False).hexdigest()
+    return f"catalog:{version}:{view}:{digest}"
+
+
+def get_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version() -> None:
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Ключа ещё нет (или вытеснен) — любая новая версия отличается от закэшированных
+        cache.add(VERSION_KEY, 2, timeout=None)
+
+
+_deferred_bump: ContextVar[set | None] = ContextVar("catalog_deferred_bump", default=None)
+
+
+def schedule_bump(using: str | None = None) -> None:
+    """
+    Сбросить кэш каталога после коммита текущей транзакции (или сразу, если её нет).
+    Внутри одной транзакции (savepoint) — не больше одного сброса, сколько бы строк ни менялось.
+    Внутри deferred_bump() только отмечает, что сброс нужен.
+    """
+    deferred = _deferred_bump.get()
+    if deferred is not None:
+        deferred.add(using)
+        return
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        bump_version()
+        return
+    sids = set(connection.savepoint_ids)
+    if not any(func is bump_version and pending == sids for pending, func, _ in connection.run_on_commit):
+        transaction.on_commit(bump_version, using=using)
+
+
+@contextmanager
+def deferred_bump():
+    """
+    Массовое изменение каталога (импорт прайса): сохранения строк внутри блока — в том числе
+    в savepoint-ах get_or_create, где schedule_bump() не видит уже запланированный сброс —
+    не планируют свой, а на выходе из блока планируется один. Ничего не менялось — сброса нет.
+    """
+    pending: set = set()
+    token = _deferred_bump.set(pending)
+    try:
+        yield
+    finally:
+        _deferred_bump.reset(token)
+    for using in pending:
+        schedule_bump(using)
+
+
+# -----------------------
+# Async-доступ
+# -----------------------
+# LocMemCache живёт в памяти процесса и не блокирует event loop — зовём его напрямую.
+# Остальные бэкенды (Redis, memcached) — через async API кэша Django.
+
+def _is_local() -> bool:
+    # cache — прокси, isinstance смотрит на сам бэкенд
+    return isinstance(caches["default"], LocMemCache)
+
+
+async def aget_version() -> int:
+    if _is_local():
+        return get_version()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, 1, timeout=None)
+        version = await cache.aget(VERSION_KEY, 1)
+    return version
+
+
+async def aget(key: str):
+    if _is_local():
+        return cache.get(key)
+    return await cache.aget(key)
+
+
+async def aset(key: str, value) -> None:
+    if _is_local():
+        cache.set(key, value, cache_timeout())
+    else:
+        await cache.aset(key, value, cache_timeout())
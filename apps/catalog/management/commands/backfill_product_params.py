@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.services.params import backfill_params
+
+
+class Command(BaseCommand):
+    help = "Fill ProductInfo.params from ProductParameter rows for already imported offers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        updated = backfill_params(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled params for {updated} offers"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.catalog.services.search_indexes import TRIGRAM_INDEXES, create_trigram_indexes
+
+
+class Command(BaseCommand):
+    help = "Create trigram search indexes (pg_trgm) skipped by migrations on PostgreSQL without contrib."
+
+    def handle(self, *args, **options):
+        if not create_trigram_indexes(connection):
+            raise CommandError("pg_trgm is not available: install PostgreSQL contrib and run again")
+        self.stdout.write(self.style.SUCCESS(f"Search indexes ready: {len(TRIGRAM_INDEXES)}"))
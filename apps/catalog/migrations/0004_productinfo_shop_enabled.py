@@ -0,0 +1,28 @@
+# Generated by Django 5.2.11 on 2026-10-19 00:22
+
+from django.db import migrations, models
+
+
+def copy_shop_state(apps, schema_editor):
+    ProductInfo = apps.get_model("catalog", "ProductInfo")
+    ProductInfo.objects.filter(shop__state=False).update(shop_enabled=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_remove_productinfo_uniq_product_shop_info_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productinfo',
+            name='shop_enabled',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(copy_shop_state, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='productinfo',
+            index=models.Index(condition=models.Q(('shop_enabled', True)), fields=['product', 'quantity'], name='productinfo_visible'),
+        ),
+    ]
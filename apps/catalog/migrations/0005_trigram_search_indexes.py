@@ -0,0 +1,51 @@
+import warnings
+
+from django.db import migrations
+
+# Поиск каталога (?q=) и админки — icontains, т.е. UPPER(col::text) LIKE UPPER('%...%').
+# Индексы — по тому же выражению с gin_trgm_ops. Только PostgreSQL (pg_trgm).
+# То же создаёт manage.py create_search_indexes (apps/catalog/services/search_indexes.py)
+TRIGRAM_INDEXES = (
+    ("product_name_trgm", "catalog_product", "name"),
+    ("productinfo_name_trgm", "catalog_productinfo", "name"),
+    ("productinfo_model_trgm", "catalog_productinfo", "model"),
+)
+
+
+def create_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            # PostgreSQL без contrib: поиск работает полным просмотром. После установки
+            # contrib индексы создаёт manage.py create_search_indexes (повторять миграцию не нужно)
+            warnings.warn(
+                "pg_trgm is not available: catalog search indexes were not created. "
+                "Install PostgreSQL contrib and run `manage.py create_search_indexes`."
+            )
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_productinfo_shop_enabled"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
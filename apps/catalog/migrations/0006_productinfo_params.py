@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-19 00:36
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productinfo',
+            name='params',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='productinfo',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['params'], name='productinfo_params_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.11 on 2026-10-19 00:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_productinfo_params'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productinfo',
+            name='catalog_pro_shop_id_7b69a8_idx',
+        ),
+        migrations.AddIndex(
+            model_name='productinfo',
+            index=models.Index(fields=['shop', 'quantity'], name='productinfo_shop_quantity'),
+        ),
+    ]
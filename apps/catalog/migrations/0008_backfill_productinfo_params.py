@@ -0,0 +1,50 @@
+from django.db import migrations
+from django.db.models import Max, Min
+
+# Копия BACKFILL_SQL из apps.catalog.services.params: миграция не должна меняться вместе с сервисом
+BACKFILL_SQL = """
+UPDATE {info} pi SET params = agg.params
+FROM (
+    SELECT pp.product_info_id, jsonb_object_agg(p.name, pp.value) AS params
+    FROM {product_parameter} pp
+    JOIN {parameter} p ON p.id = pp.parameter_id
+    WHERE pp.product_info_id >= %s AND pp.product_info_id < %s
+    GROUP BY pp.product_info_id
+) agg
+WHERE pi.id = agg.product_info_id AND (pi.params IS NULL OR pi.params = '{{}}'::jsonb)
+"""
+BATCH_SIZE = 10_000
+
+
+def backfill_params(apps, schema_editor):
+    # Предложения, загруженные до 0006: без этого каталог отдаёт им parameters: []
+    ProductInfo = apps.get_model("catalog", "ProductInfo")
+    ProductParameter = apps.get_model("catalog", "ProductParameter")
+    Parameter = apps.get_model("catalog", "Parameter")
+
+    bounds = ProductInfo.objects.aggregate(lo=Min("id"), hi=Max("id"))
+    if bounds["lo"] is None:
+        return
+    connection = schema_editor.connection
+    qn = connection.ops.quote_name
+    sql = BACKFILL_SQL.format(
+        info=qn(ProductInfo._meta.db_table),
+        product_parameter=qn(ProductParameter._meta.db_table),
+        parameter=qn(Parameter._meta.db_table),
+    )
+    with connection.cursor() as cursor:
+        for start in range(bounds["lo"], bounds["hi"] + 1, BATCH_SIZE):
+            cursor.execute(sql, [start, start + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    # Каждая пачка — своя транзакция: большая таблица не держит блокировки до конца миграции
+    atomic = False
+
+    dependencies = [
+        ('catalog', '0007_productinfo_shop_quantity_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_params, migrations.RunPython.noop),
+    ]
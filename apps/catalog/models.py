@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.utils import timezone
 
@@ -70,6 +71,16 @@ class ProductInfo(models.Model):
     price = models.DecimalField(max_digits=12, decimal_places=2)
     price_rrc = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
 
+    # Копия Shop.state: каталог и корзина отсекают предложения выключенных магазинов без JOIN.
+    # Меняется вместе с Shop.state в apps.catalog.services.shops.set_shops_state;
+    # новые и перенесённые в другой магазин предложения (импорт, админка) берут его из Shop.state
+    shop_enabled = models.BooleanField(default=True)
+
+    # Параметры предложения {"Цвет": "черный", ...} — копия ProductParameter одной колонкой:
+    # каталог читает её без prefetch, фильтр по параметрам — params @> {...} по GIN-индексу.
+    # Пишет импорт; уже загруженные прайсы заполняет миграция 0008 (повторно — manage.py backfill_product_params)
+    params = models.JSONField(default=dict, blank=True)
+
     created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -79,8 +90,16 @@ class ProductInfo(models.Model):
             models.UniqueConstraint(fields=["shop", "external_id"], name="uniq_shop_external_id"),
         ]
         indexes = [
-            models.Index(fields=["shop"]),
+            # Предложения магазина в наличии: обнуление пропавших из прайса (quantity > 0).
+            # Заменяет индекс по одному shop — запросы по shop обслуживает и этот, и uniq_shop_external_id
+            models.Index(fields=["shop", "quantity"], name="productinfo_shop_quantity"),
             models.Index(fields=["product"]),
+            # Видимые предложения (магазин включён) для каталога; quantity — под фильтр in_stock
+            models.Index(
+                fields=["product", "quantity"], condition=models.Q(shop_enabled=True), name="productinfo_visible"
+            ),
+            # jsonb_path_ops — только для @>, но компактнее и быстрее jsonb_ops
+            GinIndex(fields=["params"], opclasses=["jsonb_path_ops"], name="productinfo_params_gin"),
         ]
 
     def __str__(self) -> str:
@@ -1,3 +1,4 @@
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from apps.catalog.models import Category, Shop, Product, ProductInfo, ProductParameter
@@ -23,9 +24,24 @@ class ProductParameterSerializer(serializers.ModelSerializer):
         fields = ("parameter", "value")
 
 
+@extend_schema_field(ProductParameterSerializer(many=True))
+class OfferParametersField(serializers.Field):
+    """
+    ProductInfo.params {"Цвет": "черный"} -> [{"parameter": "Цвет", "value": "черный"}]:
+    формат ProductParameterSerializer, но без prefetch строк ProductParameter.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return [{"parameter": name, "value": param_value} for name, param_value in sorted(value.items())]
+
+
 class ProductInfoSerializer(serializers.ModelSerializer):
     shop = ShopSerializer(read_only=True)
-    parameters = ProductParameterSerializer(many=True, read_only=True)
+    parameters = OfferParametersField(source="params")
 
     class Meta:
         model = ProductInfo
@@ -0,0 +1,177 @@
+"""
+name -> id справочников каталога (Category, Parameter) в памяти процесса.
+
+Справочники маленькие и почти только пополняются, а импорт спрашивает их на каждый товар
+и каждый параметр. NameIdCache держит до CATALOG_LOOKUP_CACHE_SIZE имён (LRU), заполняется
+по мере обращений и сверяет версию в общем кэше (Redis/LocMem) раз на вызов resolve():
+вставка, переименование или удаление строки справочника увеличивают версию, и остальные
+процессы сбрасывают свою копию.
+
+Версия видна всем процессам только в общем кэше. С LocMemCache (CACHE_REDIS_URL не задан)
+сброс доходит лишь до своего процесса, поэтому найденные в копии id перепроверяются одним
+SELECT на вызов: строку, удалённую или переименованную в другом процессе, импорт иначе
+получил бы как несуществующий FK.
+
+Новые имена вставляются одним INSERT ... ON CONFLICT DO NOTHING и перечитываются SELECT-ом:
+параллельный импорт, вставивший то же имя, не роняет транзакцию, а id берётся его.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from apps.catalog.models import Category, Parameter
+
+
+def _cache_is_shared() -> bool:
+    # cache — прокси, isinstance смотрит на сам бэкенд
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+class NameIdCache:
+    """
+    name -> id одной таблицы-справочника (поле name уникально). Потокобезопасен.
+    verify — перепроверять найденные в копии id по БД; None — только если кэш не общий.
+    """
+
+    def __init__(self, model, maxsize: int | None = None, verify: bool | None = None):
+        self.model = model
+        self.maxsize = maxsize
+        self.verify = verify
+        self.version_key = f"catalog:lookups:{model._meta.model_name}"
+        self._ids: OrderedDict[str, int] = OrderedDict()
+        self._version: int | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _maxsize(self) -> int:
+        return self.maxsize if self.maxsize is not None else settings.CATALOG_LOOKUP_CACHE_SIZE
+
+    def _sync(self) -> None:
+        """
+        Сбросить копию процесса, если версия в общем кэше поменялась.
+        """
+        version = cache.get(self.version_key)
+        if version is None:
+            # Не 1: ключ мог пропасть (вытеснен, очищен кэш) — новая версия не должна совпасть со старой
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = cache.get(self.version_key)
+        with self._lock:
+            if version != self._version:
+                self._ids.clear()
+                self._version = version
+
+    def _store(self, ids: dict[str, int]) -> None:
+        maxsize = self._maxsize()
+        with self._lock:
+            for name, pk in ids.items():
+                self._ids[name] = pk
+                self._ids.move_to_end(name)
+            while len(self._ids) > maxsize:
+                self._ids.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """
+        Сбросить копии всех процессов. Своя сохраняется, если между нашими сбросами
+        версию никто не менял — тогда в ней нет чужих устаревших записей.
+        """
+        try:
+            version = cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = None
+        with self._lock:
+            if version is None or self._version is None or version != self._version + 1:
+                self._ids.clear()
+            self._version = version
+
+    def resolve(self, names: Iterable[str], stats: dict[str, int] | None = None) -> dict[str, int]:
+        """
+        id для каждого имени; отсутствующие в таблице создаются. stats (если передан) —
+        счётчики hits / misses / created этого вызова, прибавляются к имеющимся.
+        """
+        self._sync()
+        wanted = list(dict.fromkeys(names))
+        found: dict[str, int] = {}
+        with self._lock:
+            for name in wanted:
+                pk = self._ids.get(name)
+                if pk is not None:
+                    self._ids.move_to_end(name)
+                    found[name] = pk
+        if found and (self.verify if self.verify is not None else not _cache_is_shared()):
+            found = self._verified(found)
+        hits = len(found)
+        missing = [name for name in wanted if name not in found]
+
+        created: dict[str, int] = {}
+        if missing:
+            selected = dict(self.model.objects.filter(name__in=missing).values_list("name", "id"))
+            new = [name for name in missing if name not in selected]
+            if new:
+                self.model.objects.bulk_create([self.model(name=name) for name in new], ignore_conflicts=True)
+                created = dict(self.model.objects.filter(name__in=new).values_list("name", "id"))
+                selected.update(created)
+            found.update(selected)
+
+            def remember():
+                if created:
+                    # Строки, вставленные параллельным импортом, тоже попадают в created —
+                    # лишний сброс версии не страшен
+                    self.invalidate()
+                self._store(selected)
+
+            # В кэш процесса — только после коммита: при откате вставленных id не будет
+            transaction.on_commit(remember)
+
+        with self._lock:
+            self.hits += hits
+            self.misses += len(missing)
+        if stats is not None:
+            stats["hits"] = stats.get("hits", 0) + hits
+            stats["misses"] = stats.get("misses", 0) + len(missing)
+            stats["created"] = stats.get("created", 0) + len(created)
+        return found
+
+    def _verified(self, found: dict[str, int]) -> dict[str, int]:
+        """
+        Только те id из копии, что есть в таблице под тем же именем; остальные из копии убираются.
+        """
+        actual = dict(self.model.objects.filter(id__in=found.values()).values_list("id", "name"))
+        stale = [name for name, pk in found.items() if actual.get(pk) != name]
+        if not stale:
+            return found
+        with self._lock:
+            for name in stale:
+                self._ids.pop(name, None)
+        return {name: pk for name, pk in found.items() if name not in stale}
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._ids)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+            self._version = None
+            self.hits = self.misses = 0
+
+
+category_ids = NameIdCache(Category)
+parameter_ids = NameIdCache(Parameter)
+
+LOOKUP_CACHES = {"category": category_ids, "parameter": parameter_ids}
+
+
+def hit_rate(stats: dict[str, int]) -> float:
+    total = stats.get("hits", 0) + stats.get("misses", 0)
+    return round(stats.get("hits", 0) / total, 4) if total else 0.0
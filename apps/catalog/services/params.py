@@ -0,0 +1,67 @@
+"""
+ProductInfo.params — параметры предложения одной jsonb-колонкой, копия строк ProductParameter.
+Каталог читает и фильтрует только её; ProductParameter пишет импорт, пока включён
+CATALOG_PARAMS_EAV (админка, выгрузки).
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db import connection
+from django.db.models import Max, Min
+
+from apps.catalog.cache import schedule_bump
+from apps.catalog.models import Parameter, ProductInfo, ProductParameter
+
+BACKFILL_SQL = """
+UPDATE {info} pi SET params = agg.params
+FROM (
+    SELECT pp.product_info_id, jsonb_object_agg(p.name, pp.value) AS params
+    FROM {product_parameter} pp
+    JOIN {parameter} p ON p.id = pp.parameter_id
+    WHERE pp.product_info_id >= %s AND pp.product_info_id < %s
+    GROUP BY pp.product_info_id
+) agg
+WHERE pi.id = agg.product_info_id AND (pi.params IS NULL OR pi.params = '{{}}'::jsonb)
+"""
+
+
+def parse_param_filters(values: Iterable[str]) -> dict[str, str]:
+    """
+    ?param=Цвет:черный&param=Память:256 -> {"Цвет": "черный", "Память": "256"}.
+    Значение без «:» игнорируется.
+    """
+    filters = {}
+    for raw in values:
+        name, sep, value = raw.partition(":")
+        if sep and name.strip():
+            filters[name.strip()] = value.strip()
+    return filters
+
+
+def backfill_params(batch_size: int = 10_000) -> int:
+    """
+    Заполнить params из ProductParameter для предложений, у которых они пустые, — пачками
+    по диапазону id, каждая пачка — один UPDATE в своей транзакции. Заполненные строки не
+    трогаются: строки ProductParameter импорт не удаляет, а при CATALOG_PARAMS_EAV=0 и не пишет —
+    для заполненных предложений они устарели. Повторный запуск дешёвый.
+    Возвращает число обновлённых строк.
+    """
+    bounds = ProductInfo.objects.aggregate(lo=Min("id"), hi=Max("id"))
+    if bounds["lo"] is None:
+        return 0
+
+    qn = connection.ops.quote_name
+    sql = BACKFILL_SQL.format(
+        info=qn(ProductInfo._meta.db_table),
+        product_parameter=qn(ProductParameter._meta.db_table),
+        parameter=qn(Parameter._meta.db_table),
+    )
+    updated = 0
+    with connection.cursor() as cursor:
+        for start in range(bounds["lo"], bounds["hi"] + 1, batch_size):
+            cursor.execute(sql, [start, start + batch_size])
+            updated += cursor.rowcount
+    if updated:
+        schedule_bump()
+    return updated
@@ -0,0 +1,37 @@
+"""
+Trigram-индексы поиска каталога (?q=) и админки: icontains — это UPPER(col::text) LIKE UPPER('%...%'),
+индексы — по тому же выражению с gin_trgm_ops. Нужно расширение pg_trgm (PostgreSQL contrib).
+
+Миграция 0005 создаёт их, если pg_trgm доступен. Без contrib поиск работает полным просмотром,
+а индексы после его установки создаёт manage.py create_search_indexes — повторный запуск безопасен.
+"""
+from __future__ import annotations
+
+TRIGRAM_INDEXES = (
+    ("product_name_trgm", "catalog_product", "name"),
+    ("productinfo_name_trgm", "catalog_productinfo", "name"),
+    ("productinfo_model_trgm", "catalog_productinfo", "model"),
+)
+
+
+def trigram_available(connection) -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_trigram_indexes(connection) -> bool:
+    """
+    Расширение и индексы (IF NOT EXISTS). False — pg_trgm недоступен, ничего не создано.
+    """
+    if not trigram_available(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, table, column in TRIGRAM_INDEXES:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+            )
+    return True
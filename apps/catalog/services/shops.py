@@ -0,0 +1,37 @@
+"""
+Включение и выключение магазинов. Shop.state продублирован в ProductInfo.shop_enabled —
+по нему каталог и корзина отсекают предложения выключенных магазинов без JOIN к Shop.
+Поэтому Shop.state меняется только через set_shops_state: магазины и их предложения
+обновляются одним UPDATE на таблицу для всей пачки, в одной транзакции.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.catalog.cache import schedule_bump
+from apps.catalog.models import ProductInfo, Shop
+
+
+def set_shops_state(shop_ids: Iterable[int], state: bool) -> int:
+    """
+    Перевести магазины shop_ids в state. Возвращает, у скольких магазинов состояние поменялось.
+    Предложения приводятся к state у всех переданных магазинов — заодно чинится рассинхрон.
+    """
+    shop_ids = list(shop_ids)
+    if not shop_ids:
+        return 0
+
+    with transaction.atomic():
+        changed = Shop.objects.filter(id__in=shop_ids).exclude(state=state).update(
+            state=state, updated_at=timezone.now()
+        )
+        offers = ProductInfo.objects.filter(shop_id__in=shop_ids).exclude(shop_enabled=state).update(
+            shop_enabled=state
+        )
+        if changed or offers:
+            # update() не шлёт сигналы — кэш каталога сбрасываем явно
+            schedule_bump()
+    return changed
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .cache import schedule_bump
+from .models import Category, Parameter, Product, ProductInfo, ProductParameter, Shop
+from .services.lookups import LOOKUP_CACHES
+
+CATALOG_MODELS = (Category, Shop, Product, ProductInfo, Parameter, ProductParameter)
+
+
+def catalog_changed(sender, using=None, **kwargs):
+    schedule_bump(using)
+
+
+for _model in CATALOG_MODELS:
+    post_save.connect(catalog_changed, sender=_model, dispatch_uid=f"catalog_cache_save_{_model.__name__}")
+    post_delete.connect(catalog_changed, sender=_model, dispatch_uid=f"catalog_cache_delete_{_model.__name__}")
+
+
+def lookup_changed(sender, using=None, **kwargs):
+    # Переименование или удаление в админке — кэши name -> id всех процессов устарели
+    transaction.on_commit(LOOKUP_CACHES[sender._meta.model_name].invalidate, using=using)
+
+
+for _model in (Category, Parameter):
+    post_save.connect(lookup_changed, sender=_model, dispatch_uid=f"catalog_lookup_save_{_model.__name__}")
+    post_delete.connect(lookup_changed, sender=_model, dispatch_uid=f"catalog_lookup_delete_{_model.__name__}")
@@ -1,3 +1,672 @@
-from django.test import TestCase
+import datetime
+import gzip
+import io
+import json
+import uuid
+from decimal import Decimal
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import NotAuthenticated, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.catalog import cache as catalog_cache
+from apps.catalog.async_views import (
+    CategoryListAsyncView,
+    ProductDetailAsyncView,
+    ProductListAsyncView,
+    ShopListAsyncView,
+    _error_response,
+)
+from apps.catalog.models import Category, Parameter, Product, ProductInfo, ProductParameter, Shop
+from apps.catalog.serializers import ProductSerializer
+from apps.catalog.services import lookups
+from apps.catalog.services.params import backfill_params, parse_param_filters
+from apps.catalog.services.search_indexes import TRIGRAM_INDEXES, trigram_available
+from apps.catalog.services.shops import set_shops_state
+from apps.catalog.views import product_queryset
+from apps.common.testing import QueryBudgetTestCase, _seq, make_offers, make_shop, make_user
+from apps.users.models import UserProfile
+from config.admin import EstimatedCountPaginator, estimated_count
+from config.fastjson import FastJSONParser, FastJSONRenderer
+from config.db_router import ReplicaHealth, ReplicaRouter, replica_health, use_replica
+from config.middleware import DB_PIN_COOKIE, CompressionMiddleware, ReplicaRoutingMiddleware
+
+
+class CatalogQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.shops = [make_shop(), make_shop()]
+        self.category = Category.objects.create(name="Смартфоны")
+        self.offers: list[ProductInfo] = []
+
+    def seed(self, scale):
+        missing = scale - len(self.offers)
+        for shop in self.shops:
+            self.offers += make_offers(shop, missing // len(self.shops), categories=[self.category])
+
+    def test_categories(self):
+        self.assertBudgetAtScales(1, self.seed, lambda: (self.api.get, ("/api/catalog/categories/",), {}))
+
+    def test_shops(self):
+        self.assertBudgetAtScales(1, self.seed, lambda: (self.api.get, ("/api/catalog/shops/",), {}))
+
+    def test_products(self):
+        params = [
+            {},
+            {"category": self.category.id},
+            {"shop": self.shops[0].id},
+            {"in_stock": 1},
+            {"param": ["Цвет:1", "Память:1"]},
+            {"q": "Product"},
+            {"ordering": "-name"},
+        ]
+        for query in params:
+            with self.subTest(query=query):
+                self.offers = []
+                Product.objects.all().delete()
+                self.assertBudgetAtScales(
+                    2, self.seed, lambda: (self.api.get, ("/api/catalog/products/",), {"data": query})
+                )
+
+    def test_product_detail(self):
+        self.assertBudgetAtScales(
+            2, self.seed, lambda: (self.api.get, (f"/api/catalog/products/{self.offers[-1].product_id}/",), {})
+        )
+
+
+class AdminQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Changelist админки — фиксированное число запросов при любом числе строк (list_select_related).
+    """
+
+    def setUp(self):
+        self.client.force_login(make_user(is_staff=True, is_superuser=True))
+        self.shops = [make_shop(make_user(role=UserProfile.Role.SUPPLIER)), make_shop()]
+        self.offers: list[ProductInfo] = []
+
+    def seed(self, scale):
+        missing = scale - len(self.offers)
+        for shop in self.shops:
+            self.offers += make_offers(shop, missing // len(self.shops))
+
+    def test_changelists(self):
+        # Сессия, пользователь, COUNT, страница. Небольшие таблицы — плюс COUNT «всего N»;
+        # большие (LargeTableAdminMixin) — плюс reltuples и варианты list_filter
+        for model, budget in (
+            ("shop", 5),
+            ("category", 5),
+            ("product", 6),
+            ("productinfo", 6),
+            ("parameter", 5),
+            ("productparameter", 6),
+        ):
+            for query in ({}, {"q": "Product"}):
+                with self.subTest(model=model, query=query):
+                    self.assertBudgetAtScales(
+                        budget, self.seed, lambda: (self.client.get, (f"/admin/catalog/{model}/",), {"data": query})
+                    )
+
+    def test_change_forms(self):
+        # autocomplete: в форме только выбранные значения, а не все строки связанных таблиц
+        self.seed(10)
+        offer = self.offers[0]
+        for url, budget in (
+            (f"/admin/catalog/productinfo/{offer.id}/change/", 8),
+            (f"/admin/catalog/category/{offer.product.category_id}/change/", 6),
+        ):
+            with self.subTest(url=url):
+                self.assertQueryBudget(budget, self.client.get, url)
+
+    def test_product_parameters_read_only(self):
+        # Правка строки не дошла бы до ProductInfo.params, по которому фильтрует каталог
+        self.seed(10)
+        row = ProductParameter.objects.filter(product_info=self.offers[0]).first()
+        url = f"/admin/catalog/productparameter/{row.id}/"
+        self.assertEqual(self.client.get(f"{url}change/").status_code, 200)
+        response = self.client.post(f"{url}change/", {
+            "product_info": row.product_info_id, "parameter": row.parameter_id, "value": "changed",
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.post(f"{url}delete/", {"post": "yes"}).status_code, 403)
+        self.assertEqual(self.client.get("/admin/catalog/productparameter/add/").status_code, 403)
+        row.refresh_from_db()
+        self.assertNotEqual(row.value, "changed")
+
+    def test_estimated_count(self):
+        self.seed(10)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE catalog_productinfo")
+        queryset = ProductInfo.objects.order_by("id")
+
+        with self.settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1), CaptureQueriesContext(connection) as ctx:
+            count = EstimatedCountPaginator(queryset, 5).count
+        self.assertEqual(count, estimated_count(queryset))
+        self.assertNotIn("COUNT", " ".join(q["sql"] for q in ctx.captured_queries))
+
+        # Фильтр или таблица меньше порога — точный COUNT
+        self.assertIsNone(estimated_count(queryset.filter(quantity__gt=0)))
+        self.assertEqual(EstimatedCountPaginator(queryset, 5).count, 10)
+
+
+class ShopStateTests(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.shops = [make_shop(), make_shop()]
+        self.offers = [make_offers(shop, 3) for shop in self.shops]
+
+    def product_ids(self, **query):
+        return sorted(p["id"] for p in self.api.get("/api/catalog/products/", query).data)
+
+    def test_disabled_shop_hidden_from_catalog(self):
+        visible = sorted(offer.product_id for offer in self.offers[0])
+        version = catalog_cache.get_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(set_shops_state([shop.id for shop in self.shops[1:]], False), 1)
+        self.assertGreater(catalog_cache.get_version(), version)
+        self.assertFalse(Shop.objects.get(pk=self.shops[1].pk).state)
+        self.assertFalse(ProductInfo.objects.filter(shop=self.shops[1], shop_enabled=True).exists())
+
+        self.assertEqual(self.product_ids(), visible)
+        self.assertEqual(self.product_ids(shop=self.shops[1].id), [])
+        detail = self.api.get(f"/api/catalog/products/{self.offers[1][0].product_id}/").data
+        self.assertEqual(detail["offers"], [])
+
+        # Повторно — ничего не меняется, кэш не сбрасывается
+        version = catalog_cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(set_shops_state([self.shops[1].id], False), 0)
+        self.assertEqual(catalog_cache.get_version(), version)
+
+        set_shops_state([self.shops[1].id], True)
+        self.assertEqual(len(self.product_ids()), 6)
+
+    def test_offer_filters_apply_to_one_offer(self):
+        # Товар есть у обоих магазинов, но в наличии — только у второго
+        offer = self.offers[0][0]
+        offer.quantity = 0
+        offer.save(update_fields=["quantity"])
+        ProductInfo.objects.create(
+            product=offer.product, shop=self.shops[1], external_id=next(_seq), name="x", quantity=5, price=1
+        )
+        self.assertNotIn(offer.product_id, self.product_ids(shop=self.shops[0].id, in_stock=1))
+        self.assertIn(offer.product_id, self.product_ids(shop=self.shops[1].id, in_stock=1))
+
+    def test_search_skips_disabled_offers(self):
+        # Название есть только у предложения выключенного магазина
+        offer = self.offers[0][0]
+        ProductInfo.objects.create(
+            product=offer.product, shop=self.shops[1], external_id=next(_seq), name="hidden name", model="hidden/1",
+            quantity=5, price=1,
+        )
+        self.assertEqual(self.product_ids(q="hidden"), [offer.product_id])
+        set_shops_state([self.shops[1].id], False)
+        self.assertEqual(self.product_ids(q="hidden"), [])
+        self.assertEqual(self.product_ids(q=offer.product.name), [offer.product_id])
+
+    def test_admin_offer_takes_shop_state(self):
+        admin_user = make_user(is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        set_shops_state([self.shops[1].id], False)
+        offer = self.offers[0][0]
+        data = {
+            "product": offer.product_id, "shop": self.shops[1].id, "external_id": next(_seq), "model": "",
+            "name": "x", "quantity": 1, "price": "1.00", "price_rrc": "", "params": "{}",
+        }
+        response = self.client.post("/admin/catalog/productinfo/add/", data)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(ProductInfo.objects.get(external_id=data["external_id"]).shop_enabled)
+
+        # Перенос в другой магазин — состояние нового магазина
+        data.update(external_id=offer.external_id, name=offer.name, price=str(offer.price))
+        response = self.client.post(f"/admin/catalog/productinfo/{offer.id}/change/", data)
+        self.assertEqual(response.status_code, 302)
+        offer.refresh_from_db()
+        self.assertEqual((offer.shop_id, offer.shop_enabled), (self.shops[1].id, False))
+
+    def test_admin_actions(self):
+        admin_user = make_user(is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        response = self.client.post(
+            "/admin/catalog/shop/",
+            {"action": "disable_shops", "_selected_action": [shop.id for shop in self.shops]},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(ProductInfo.objects.filter(shop_enabled=True).exists())
+
+        # Смена state в форме магазина тоже переключает предложения
+        shop = self.shops[0]
+        response = self.client.post(
+            f"/admin/catalog/shop/{shop.id}/change/",
+            {"name": shop.name, "url": "", "user": "", "state": "on"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ProductInfo.objects.filter(shop_enabled=True).count(), 3)
+
+
+class ProductParamsTests(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.shop = make_shop()
+        self.offers = make_offers(self.shop, 3)
+
+    def test_serialized_from_params_column(self):
+        offer = self.offers[0]
+        offer.params = {"Цвет": "черный", "Вес": "200"}
+        offer.save(update_fields=["params"])
+        detail = self.api.get(f"/api/catalog/products/{offer.product_id}/").data
+        self.assertEqual(
+            detail["offers"][0]["parameters"],
+            [{"parameter": "Вес", "value": "200"}, {"parameter": "Цвет", "value": "черный"}],
+        )
+
+    def test_filter_by_params(self):
+        offer = self.offers[1]
+        value = str(offer.id)
+        ids = [p["id"] for p in self.api.get("/api/catalog/products/", {"param": [f"Цвет:{value}"]}).data]
+        self.assertEqual(ids, [offer.product_id])
+        ids = [
+            p["id"] for p in
+            self.api.get("/api/catalog/products/", {"param": [f"Цвет:{value}", "Память:другое"]}).data
+        ]
+        self.assertEqual(ids, [])
+        # Некорректный фильтр игнорируется
+        self.assertEqual(len(self.api.get("/api/catalog/products/", {"param": "Цвет"}).data), 3)
+        self.assertEqual(parse_param_filters([" Цвет : черный", "плохо", ":x"]), {"Цвет": "черный"})
+
+    def test_backfill(self):
+        ProductInfo.objects.update(params={})
+        version = catalog_cache.get_version()
+        # Своя транзакция: в транзакции теста уже ждёт сброс от setUp
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            self.assertEqual(backfill_params(batch_size=2), 3)
+        self.assertGreater(catalog_cache.get_version(), version)
+        for offer in ProductInfo.objects.all():
+            self.assertEqual(offer.params, {name: str(offer.id) for name in ("Цвет", "Память", "Диагональ")})
+        # Повторный запуск ничего не переписывает
+        self.assertEqual(backfill_params(), 0)
+
+    def test_backfill_keeps_filled_params(self):
+        # Строки ProductParameter устаревают (импорт их не удаляет) — заполненные params главнее
+        offer = self.offers[0]
+        offer.params = {"Цвет": "белый"}
+        offer.save(update_fields=["params"])
+        ProductInfo.objects.exclude(pk=offer.pk).update(params={})
+        self.assertEqual(backfill_params(), 2)
+        offer.refresh_from_db()
+        self.assertEqual(offer.params, {"Цвет": "белый"})
+
+
+class LookupCacheTests(TestCase):
+    def tearDown(self):
+        for lookup_cache in lookups.LOOKUP_CACHES.values():
+            lookup_cache.clear()
+
+    def resolve(self, lookup_cache, names, stats=None):
+        # В кэш процесса попадает только закоммиченное
+        with self.captureOnCommitCallbacks(execute=True):
+            return lookup_cache.resolve(names, stats)
+
+    def test_resolve_creates_and_caches(self):
+        existing = Parameter.objects.create(name="Цвет")
+        # Как с общим кэшем: копии процесса верим без проверки
+        lookup_cache = lookups.NameIdCache(Parameter, verify=False)
+        stats = {}
+        ids = self.resolve(lookup_cache, ["Цвет", "Вес", "Цвет"], stats)
+        self.assertEqual(ids["Цвет"], existing.id)
+        self.assertEqual(ids["Вес"], Parameter.objects.get(name="Вес").id)
+        self.assertEqual(stats, {"hits": 0, "misses": 2, "created": 1})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(lookup_cache.resolve(["Вес", "Цвет"], stats), ids)
+        self.assertEqual(stats, {"hits": 2, "misses": 2, "created": 1})
+        self.assertEqual(lookups.hit_rate(stats), 0.5)
+        self.assertEqual(lookup_cache.snapshot(), {"hits": 2, "misses": 2, "size": 2})
+
+    def test_verified_without_shared_cache(self):
+        # LocMem: сброс версии в другом процессе сюда не доходит — строку удаляем мимо сигналов
+        lookup_cache = lookups.NameIdCache(Category)
+        ids = self.resolve(lookup_cache, ["Смартфоны", "Аксессуары"])
+        with self.assertNumQueries(1):
+            self.assertEqual(lookup_cache.resolve(["Смартфоны", "Аксессуары"]), ids)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {Category._meta.db_table} WHERE id = %s", [ids["Смартфоны"]])
+
+        stats = {}
+        fresh = self.resolve(lookup_cache, ["Смартфоны", "Аксессуары"], stats)
+        self.assertEqual(stats, {"hits": 1, "misses": 1, "created": 1})
+        self.assertEqual(fresh["Смартфоны"], Category.objects.get(name="Смартфоны").id)
+        self.assertNotEqual(fresh["Смартфоны"], ids["Смартфоны"])
+
+    def test_not_cached_before_commit(self):
+        lookup_cache = lookups.NameIdCache(Category)
+        lookup_cache.resolve(["Смартфоны"])
+        self.assertEqual(lookup_cache.snapshot()["size"], 0)
+
+    def test_lru_bound(self):
+        lookup_cache = lookups.NameIdCache(Parameter, maxsize=2)
+        self.resolve(lookup_cache, ["a", "b"])
+        lookup_cache.resolve(["a"])
+        self.resolve(lookup_cache, ["c"])
+        stats = {}
+        lookup_cache.resolve(["a", "b", "c"], stats)
+        self.assertEqual(stats, {"hits": 2, "misses": 1, "created": 0})
+
+    def test_version_invalidation(self):
+        # Два экземпляра на одну таблицу — как два процесса с общим кэшем
+        first, second = lookups.NameIdCache(Category), lookups.NameIdCache(Category)
+        self.resolve(first, ["Смартфоны"])
+        self.resolve(second, ["Смартфоны"])
+
+        # Вставка во втором сбрасывает первый, сам второй свою копию сохраняет
+        self.resolve(second, ["Аксессуары"])
+        self.assertEqual(second.snapshot()["size"], 2)
+        stats = {}
+        self.resolve(first, ["Смартфоны"], stats)
+        self.assertEqual(stats["misses"], 1)
+
+        # Переименование (админка) — сигнал сбрасывает версию
+        category = Category.objects.get(name="Смартфоны")
+        with self.captureOnCommitCallbacks(execute=True):
+            category.name = "Телефоны"
+            category.save()
+        stats = {}
+        ids = self.resolve(first, ["Смартфоны"], stats)
+        self.assertEqual(stats, {"hits": 0, "misses": 1, "created": 1})
+        self.assertNotEqual(ids["Смартфоны"], category.id)
+
+        # Кэш очищен целиком (версия пропала) — тоже сброс
+        cache.clear()
+        stats = {}
+        first.resolve(["Телефоны"], stats)
+        self.assertEqual(stats["hits"], 0)
+
+
+# -----------------------
+# Async-каталог
+# -----------------------
+
+@override_settings(THROTTLE_BUCKETS={}, DATABASE_REPLICAS=[])
+class AsyncCatalogViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.factory = RequestFactory()
+        self.shop = make_shop()
+        self.offers = make_offers(self.shop, 10)
+
+    def call_async(self, view_class, path, query=None, **kwargs):
+        return async_to_sync(view_class.as_view())(self.factory.get(path, query or {}), **kwargs)
+
+    def test_same_responses_as_sync_views(self):
+        product_id = self.offers[0].product_id
+        cases = [
+            (CategoryListAsyncView, "/api/catalog/categories/", {}, {}),
+            (ShopListAsyncView, "/api/catalog/shops/", {}, {}),
+            (ProductListAsyncView, "/api/catalog/products/", {}, {}),
+            (ProductListAsyncView, "/api/catalog/products/", {"q": "Product", "ordering": "-name,bogus"}, {}),
+            (ProductListAsyncView, "/api/catalog/products/", {"shop": self.shop.id, "in_stock": 1}, {}),
+            (ProductDetailAsyncView, f"/api/catalog/products/{product_id}/", {}, {"pk": product_id}),
+            (ProductDetailAsyncView, "/api/catalog/products/0/", {}, {"pk": 0}),
+        ]
+        for view_class, path, query, kwargs in cases:
+            with self.subTest(path=path, query=query):
+                expected = self.api.get(path, query)
+                response = self.call_async(view_class, path, query, **kwargs)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+
+    def test_error_response_keeps_exception(self):
+        exc = NotAuthenticated()
+        response = _error_response(exc, RequestFactory().get("/api/catalog/products/"))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+        self.assertNotIn("status_code", vars(exc))
+
+    def test_cached_until_catalog_changes(self):
+        product = self.offers[0].product
+        path = f"/api/catalog/products/{product.id}/"
+
+        with CaptureQueriesContext(connection) as first:
+            self.call_async(ProductDetailAsyncView, path, pk=product.id)
+        with CaptureQueriesContext(connection) as second:
+            response = self.call_async(ProductDetailAsyncView, path, pk=product.id)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 0)
+        self.assertEqual(response.content, self.api.get(path).content)
+
+        # Сброс — после коммита транзакции, в которой менялся каталог (своя, т.к. в транзакции
+        # теста уже ждёт сброс от setUp)
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            product.name = "Renamed"
+            product.save(update_fields=["name"])
+        response = self.call_async(ProductDetailAsyncView, path, pk=product.id)
+        self.assertEqual(json.loads(response.content)["name"], "Renamed")
+
+
+# -----------------------
+# JSON и сжатие
+# -----------------------
+
+class FastJSONCompatibilityTests(TestCase):
+    """
+    FastJSONRenderer/FastJSONParser должны давать те же байты и данные, что стандартные DRF.
+    """
+
+    def assertSameRender(self, data, **kwargs):
+        self.assertEqual(FastJSONRenderer().render(data, **kwargs), JSONRenderer().render(data, **kwargs))
+
+    def test_scalars_and_special_types(self):
+        cases = [
+            None, [], {}, "", 0, -7, 1.5, 0.1, 123456789.125, True,
+            {"text": "Привет \u2028 \u2029 \x00 \x1f \x7f \"q\" \\ / é 😀"},
+            {"utc": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)},
+            {"msk": datetime.datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=ZoneInfo("Europe/Moscow"))},
+            {"naive": datetime.datetime(2024, 1, 2, 3, 4, 5), "date": datetime.date(2024, 1, 2)},
+            {"time": datetime.time(1, 2, 3, 4), "delta": datetime.timedelta(seconds=90)},
+            {"decimal": Decimal("12.30"), "amount": Decimal("0.10"), "uuid": uuid.UUID(int=1)},
+            {"lazy": gettext_lazy("Hello"), "set": {1}, "tuple": (1, 2), 1: "int key", "big": 2 ** 70},
+        ]
+        for data in cases:
+            with self.subTest(data=data):
+                self.assertSameRender(data)
+        self.assertSameRender({"a": [1, 2]}, accepted_media_type="application/json; indent=4")
+
+    def test_product_payload(self):
+        offers = make_offers(make_shop(), 20)
+        Product.objects.filter(pk=offers[0].product_id).update(name="Смартфон «Тест» \u2028")
+        data = ProductSerializer(product_queryset().order_by("name"), many=True).data
+        self.assertSameRender(data)
+
+    def test_parser(self):
+        bodies = [
+            b'{"a": 1, "b": [1.5, "x"], "c": null, "u": "\\u041f\xd1\x80"}',
+            b"[]",
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(
+                    FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body))
+                )
+        for body in (b"{bad", b'{"nan": NaN}'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024, COMPRESSION_BROTLI_QUALITY=0)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def process(self, response, accept_encoding="gzip, deflate"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda r: response)(request)
+
+    def test_compresses_large_responses_only(self):
+        body = b'{"items":[' + b",".join(b'{"id":%d,"name":"Product"}' % i for i in range(200)) + b"]}"
+        response = self.process(HttpResponse(body, content_type="application/json"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        small = self.process(HttpResponse(b'{"Status":true}' * 20, content_type="application/json"))
+        self.assertFalse(small.has_header("Content-Encoding"))
+
+        plain = self.process(HttpResponse(body, content_type="application/json"), accept_encoding="")
+        self.assertFalse(plain.has_header("Content-Encoding"))
+
+    def test_streaming_and_precompressed(self):
+        chunks = [b"id,name\n"] + [b"%d,Product %d\n" % (i, i) for i in range(1000)]
+        response = self.process(StreamingHttpResponse(iter(chunks), content_type="text/csv"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"".join(chunks))
+
+        archive = self.process(StreamingHttpResponse(iter(chunks), content_type="application/gzip"))
+        self.assertFalse(archive.has_header("Content-Encoding"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    """
+    Алиас replica1 не настроен — здоровье реплики и её соединение подменены.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.object(replica_health, "is_healthy", return_value=True)
+        self.is_healthy = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = ReplicaRouter()
+
+    def test_router(self):
+        self.assertIsNone(self.router.db_for_read(Product))
+        with use_replica() as alias:
+            self.assertEqual(alias, "replica1")
+            self.assertEqual(self.router.db_for_read(Product), "replica1")
+            self.assertEqual(self.router.db_for_write(Product), "default")
+        self.is_healthy.return_value = False
+        with use_replica() as alias:
+            self.assertIsNone(alias)
+            self.assertIsNone(self.router.db_for_read(Product))
+        self.assertIsNone(self.router.db_for_read(Product))
+        self.assertFalse(self.router.allow_migrate("replica1", "catalog"))
+        self.assertIsNone(self.router.allow_migrate("default", "catalog"))
+
+    def process(self, request, status=200, streaming=False):
+        """
+        Ответ middleware и база, с которой view (и поток ответа) читали бы Product.
+        """
+        seen = {}
+
+        def view(request):
+            seen["view"] = self.router.db_for_read(Product)
+            if streaming:
+                def content():
+                    seen["stream"] = self.router.db_for_read(Product)
+                    yield b"id\n"
+                return StreamingHttpResponse(content(), status=status)
+            return HttpResponse(status=status)
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        if streaming:
+            b"".join(response.streaming_content)
+        # Флаг не переживает запрос
+        self.assertIsNone(self.router.db_for_read(Product))
+        return response, seen
+
+    def test_reads_of_listed_views_go_to_replica(self):
+        factory = RequestFactory()
+        self.assertEqual(self.process(factory.get("/api/catalog/products/"))[1], {"view": "replica1"})
+        self.assertEqual(
+            self.process(factory.get("/api/partner/orders/export/"), streaming=True)[1],
+            {"view": "replica1", "stream": "replica1"},
+        )
+        for request in (factory.get("/api/basket/"), factory.get("/no-such-url/"), factory.head("/api/contacts/")):
+            with self.subTest(path=request.path):
+                self.assertEqual(self.process(request)[1], {"view": None})
+
+    @override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+    def test_one_replica_per_request(self):
+        seen = []
+
+        def view(request):
+            seen.extend(self.router.db_for_read(model) for model in (Product, ProductInfo, Shop, Category))
+            return HttpResponse()
+
+        for _ in range(10):
+            ReplicaRoutingMiddleware(view)(RequestFactory().get("/api/catalog/products/"))
+            self.assertEqual(len(set(seen[-4:])), 1, seen[-4:])
+        self.assertLessEqual(set(seen), {"replica1", "replica2"})
+
+    def test_write_pins_client_to_primary(self):
+        factory = RequestFactory()
+        response, seen = self.process(factory.post("/api/basket/items/"))
+        self.assertEqual(seen, {"view": None})
+        self.assertEqual(response.cookies[DB_PIN_COOKIE]["max-age"], 5)
+
+        response, _ = self.process(factory.post("/api/basket/items/"), status=400)
+        self.assertNotIn(DB_PIN_COOKIE, response.cookies)
+
+        request = factory.get("/api/catalog/products/")
+        request.COOKIES[DB_PIN_COOKIE] = "1"
+        self.assertEqual(self.process(request)[1], {"view": None})
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        response, seen = self.process(RequestFactory().post("/api/basket/items/"))
+        self.assertEqual(seen, {"view": None})
+        self.assertNotIn(DB_PIN_COOKIE, response.cookies)
+
+
+@override_settings(REPLICA_MAX_LAG_SECONDS=5, REPLICA_CHECK_INTERVAL=60)
+class ReplicaHealthTests(SimpleTestCase):
+    def check(self, health, lag=None, error=None):
+        replica = mock.MagicMock()
+        cursor = replica.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (lag,)
+        if error:
+            cursor.execute.side_effect = error
+        with mock.patch("config.db_router.connections", {"replica1": replica}):
+            return health.is_healthy("replica1"), cursor
+
+    def test_lag(self):
+        self.assertTrue(self.check(ReplicaHealth(), lag=1.5)[0])
+        self.assertFalse(self.check(ReplicaHealth(), lag=30)[0])
+        self.assertFalse(self.check(ReplicaHealth(), error=DatabaseError("connection refused"))[0])
+
+    def test_result_cached_for_interval(self):
+        health = ReplicaHealth()
+        self.assertFalse(self.check(health, lag=30)[0])
+        # В пределах REPLICA_CHECK_INTERVAL реплика не опрашивается
+        healthy, cursor = self.check(health, lag=0)
+        self.assertFalse(healthy)
+        cursor.execute.assert_not_called()
+
+        health.reset()
+        self.assertTrue(self.check(health, lag=0)[0])
+        with self.settings(REPLICA_CHECK_INTERVAL=0):
+            self.assertFalse(self.check(health, lag=30)[0])
+
+
+class SearchIndexTests(TestCase):
+    def test_create_search_indexes(self):
+        if not trigram_available(connection):
+            self.skipTest("pg_trgm is not available")
+        # Повторный запуск — без ошибок (индексы могли уже создать миграции)
+        for _ in range(2):
+            call_command("create_search_indexes", stdout=io.StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)", [[n for n, _, _ in TRIGRAM_INDEXES]])
+            self.assertEqual(len(cursor.fetchall()), len(TRIGRAM_INDEXES))
+
+    def test_without_pg_trgm(self):
+        with mock.patch("apps.catalog.services.search_indexes.trigram_available", return_value=False):
+            with self.assertRaisesMessage(CommandError, "pg_trgm is not available"):
+                call_command("create_search_indexes", stdout=io.StringIO())
@@ -1,10 +1,20 @@
+from django.conf import settings
 from django.urls import path
 
 from .views import CategoryListAPIView, ShopListAPIView, ProductListAPIView, ProductDetailAPIView
 
+if settings.CATALOG_ASYNC_VIEWS:
+    # Под ASGI: нативные async-views с кэшем ответов (apps/catalog/async_views.py)
+    from .async_views import (
+        CategoryListAsyncView as CategoryListAPIView,
+        ShopListAsyncView as ShopListAPIView,
+        ProductListAsyncView as ProductListAPIView,
+        ProductDetailAsyncView as ProductDetailAPIView,
+    )
+
 urlpatterns = [
     path("categories/", CategoryListAPIView.as_view(), name="catalog-categories"),
     path("shops/", ShopListAPIView.as_view(), name="catalog-shops"),
     path("products/", ProductListAPIView.as_view(), name="catalog-products"),
     path("products/<int:pk>/", ProductDetailAPIView.as_view(), name="catalog-product-detail"),
-]
\ No newline at end of file
+]
@@ -2,31 +2,25 @@ from django.shortcuts import render
 
 # Create your views here.
 
-from django.db.models import Prefetch, Q
+from django.db.models import Exists, OuterRef, Prefetch, Q
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import generics, filters
 from rest_framework.permissions import AllowAny
 
-from apps.catalog.models import Category, Shop, Product, ProductInfo, ProductParameter
+from apps.catalog.models import Category, Shop, Product, ProductInfo
+from apps.catalog.services.params import parse_param_filters
+from apps.users.throttling import CatalogReadThrottle
 from .serializers import CategorySerializer, ShopSerializer, ProductSerializer
 
 
-def _product_queryset():
+def product_queryset():
     """
     Оптимизированный queryset, чтобы не ловить N+1:
     Product -> category (select_related)
-    Product -> product_infos (prefetch, с shop)
-    ProductInfo -> parameters (prefetch, с parameter)
+    Product -> product_infos (prefetch, с shop; только предложения включённых магазинов)
+    Параметры предложений — колонка ProductInfo.params, отдельного prefetch нет.
     """
-    product_info_qs = (
-        ProductInfo.objects.select_related("shop")
-        .prefetch_related(
-            Prefetch(
-                "parameters",
-                queryset=ProductParameter.objects.select_related("parameter"),
-            )
-        )
-    )
+    product_info_qs = ProductInfo.objects.filter(shop_enabled=True).select_related("shop")
 
     return (
         Product.objects.select_related("category")
@@ -34,14 +28,54 @@ def _product_queryset():
     )
 
 
+def filter_products(qs, params):
+    """
+    Фильтры списка товаров (category, shop, in_stock, param, q) — общие для sync и async views.
+    В список попадают только товары, у которых есть предложение включённого магазина;
+    условия на предложение (shop, in_stock, param, поиск q по предложению) — в том же EXISTS (индекс productinfo_visible,
+    для param — params @> {...} по GIN-индексу).
+    """
+    category_id = params.get("category")
+    if category_id:
+        qs = qs.filter(category_id=category_id)
+
+    offers = ProductInfo.objects.filter(product=OuterRef("pk"), shop_enabled=True)
+
+    shop_id = params.get("shop")
+    if shop_id:
+        offers = offers.filter(shop_id=shop_id)
+
+    in_stock = params.get("in_stock")
+    if in_stock == "1":
+        offers = offers.filter(quantity__gt=0)
+
+    param_filters = parse_param_filters(params.getlist("param"))
+    if param_filters:
+        offers = offers.filter(params__contains=param_filters)
+
+    qs = qs.filter(Exists(offers))
+
+    q = params.get("q")
+    if q:
+        # По названию/модели ищем среди тех же видимых предложений — EXISTS, без JOIN и distinct
+        qs = qs.filter(
+            Q(name__icontains=q)
+            | Exists(offers.filter(Q(name__icontains=q) | Q(model__icontains=q)))
+        )
+
+    return qs
+
+
 class CategoryListAPIView(generics.ListAPIView):
     permission_classes = [AllowAny]
+    throttle_classes = [CatalogReadThrottle]
     serializer_class = CategorySerializer
     queryset = Category.objects.all().order_by("name")
 
 
 class ShopListAPIView(generics.ListAPIView):
     permission_classes = [AllowAny]
+    throttle_classes = [CatalogReadThrottle]
     serializer_class = ShopSerializer
     queryset = Shop.objects.all().order_by("name")
 
@@ -51,47 +85,30 @@ class ShopListAPIView(generics.ListAPIView):
         OpenApiParameter(name="category", required=False, type=int, description="Category id"),
         OpenApiParameter(name="shop", required=False, type=int, description="Shop id"),
         OpenApiParameter(name="in_stock", required=False, type=int, description="1 -> only quantity > 0"),
+        OpenApiParameter(
+            name="param", required=False, type=str, many=True,
+            description="Offer parameter name:value, repeat for several (all must match one offer)",
+        ),
         OpenApiParameter(name="q", required=False, type=str, description="Search (product name / offer name / model)"),
         OpenApiParameter(name="ordering", required=False, type=str, description="Ordering: name or -name"),
     ],
 )
 class ProductListAPIView(generics.ListAPIView):
     permission_classes = [AllowAny]
+    throttle_classes = [CatalogReadThrottle]
     serializer_class = ProductSerializer
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ["name"]
     ordering = ["name"]
 
     def get_queryset(self):
-        qs = _product_queryset()
-
-        category_id = self.request.query_params.get("category")
-        if category_id:
-            qs = qs.filter(category_id=category_id)
-
-        shop_id = self.request.query_params.get("shop")
-        if shop_id:
-            qs = qs.filter(product_infos__shop_id=shop_id)
-
-        in_stock = self.request.query_params.get("in_stock")
-        if in_stock == "1":
-            qs = qs.filter(product_infos__quantity__gt=0)
-
-        q = self.request.query_params.get("q")
-        if q:
-            qs = qs.filter(
-                Q(name__icontains=q)
-                | Q(product_infos__name__icontains=q)
-                | Q(product_infos__model__icontains=q)
-            )
-
-        # Чтобы список не раздувался от JOIN-ов
-        return qs.distinct()
+        return filter_products(product_queryset(), self.request.query_params)
 
 
 class ProductDetailAPIView(generics.RetrieveAPIView):
     permission_classes = [AllowAny]
+    throttle_classes = [CatalogReadThrottle]
     serializer_class = ProductSerializer
 
     def get_queryset(self):
-        return _product_queryset()
\ No newline at end of file
+        return product_queryset()
\ No newline at end of file
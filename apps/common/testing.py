@@ -0,0 +1,140 @@
+"""
+Общее для тестов приложений: фабрики тестовых данных и QueryBudgetTestCase.
+"""
+import itertools
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.catalog.models import Category, Parameter, Product, ProductInfo, ProductParameter, Shop
+from apps.orders.models import Order, OrderItem
+from apps.orders.services.fulfilment import finalize_order
+from apps.users.models import UserProfile
+
+User = get_user_model()
+
+_seq = itertools.count(1)
+
+
+# -----------------------
+# Фабрики тестовых данных
+# -----------------------
+
+def make_user(role=UserProfile.Role.CLIENT, **kwargs):
+    n = next(_seq)
+    kwargs.setdefault("username", f"user{n}")
+    kwargs.setdefault("email", f"user{n}@example.com")
+    user = User.objects.create_user(password="pw123456", **kwargs)
+    if role != UserProfile.Role.CLIENT:
+        UserProfile.objects.filter(user=user).update(role=role)
+        # Профиль, созданный сигналом, закэширован на объекте — перечитываем пользователя
+        user = User.objects.get(pk=user.pk)
+    return user
+
+
+def make_shop(user=None, **kwargs):
+    kwargs.setdefault("name", f"Shop {next(_seq)}")
+    return Shop.objects.create(user=user, **kwargs)
+
+
+def make_offers(shop, count, *, categories=None, params=("Цвет", "Память", "Диагональ")) -> list[ProductInfo]:
+    """
+    count товаров с предложением магазина и параметрами; категории — по одной на 5 товаров.
+    """
+    parameters = [Parameter.objects.get_or_create(name=name)[0] for name in params]
+    if categories is None:
+        categories = [Category.objects.create(name=f"Category {next(_seq)}") for _ in range(max(1, count // 5))]
+    for category in categories:
+        category.shops.add(shop)
+
+    products = Product.objects.bulk_create(
+        Product(category=categories[i % len(categories)], name=f"Product {next(_seq)}") for i in range(count)
+    )
+    offers = ProductInfo.objects.bulk_create(
+        ProductInfo(
+            product=product,
+            shop=shop,
+            external_id=next(_seq),
+            model=f"M-{product.id}",
+            name=product.name,
+            quantity=1000,
+            price=Decimal("100.00"),
+            price_rrc=Decimal("120.00"),
+        )
+        for product in products
+    )
+    ProductParameter.objects.bulk_create(
+        ProductParameter(product_info=offer, parameter=parameter, value=str(offer.id))
+        for offer in offers
+        for parameter in parameters
+    )
+    for offer in offers:
+        offer.params = {parameter.name: str(offer.id) for parameter in parameters}
+    ProductInfo.objects.bulk_update(offers, ["params"])
+    return offers
+
+
+def make_order(user, offers, status=Order.Status.NEW, quantity=2) -> Order:
+    """
+    Оформленный заказ по предложениям offers (как после checkout: цены зафиксированы, итоги посчитаны).
+    """
+    order = Order.objects.create(user=user, status=status)
+    items = OrderItem.objects.bulk_create(
+        OrderItem(
+            order=order,
+            product=offer.product,
+            shop=offer.shop,
+            product_info=offer,
+            quantity=quantity,
+            unit_price=offer.price,
+            unit_price_rrc=offer.price_rrc,
+        )
+        for offer in offers
+    )
+    if status != Order.Status.BASKET:
+        finalize_order(order, items)
+    return order
+
+
+
+# -----------------------
+# Бюджет запросов
+# -----------------------
+
+@override_settings(THROTTLE_BUCKETS={}, DATABASE_REPLICAS=[])
+class QueryBudgetTestCase(TestCase):
+    """
+    Эндпоинт должен укладываться в фиксированное число SQL-запросов, не зависящее от объёма
+    данных: проверяем на SCALES (10 и 100 объектов). При превышении в ошибке — все запросы.
+    Бюджеты считаются по primary, поэтому чтение с реплик здесь выключено.
+    """
+    SCALES = (10, 100)
+
+    def capture(self, request, *args, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = request(*args, **kwargs)
+        return response, ctx.captured_queries
+
+    def assertQueryBudget(self, budget, request, *args, expected_status=200, **kwargs):
+        response, queries = self.capture(request, *args, **kwargs)
+        self.assertEqual(
+            response.status_code, expected_status,
+            getattr(response, "data", None) if not getattr(response, "streaming", False) else None,
+        )
+        if len(queries) > budget:
+            sql = "\n".join(f"{i}. {q['sql']}" for i, q in enumerate(queries, 1))
+            self.fail(f"{len(queries)} queries > budget {budget}:\n{sql}")
+        return response
+
+    def assertBudgetAtScales(self, budget, seed, make_request, expected_status=200):
+        """
+        seed(n) догоняет данные до масштаба n; make_request() возвращает (метод, args, kwargs).
+        """
+        for scale in self.SCALES:
+            with self.subTest(scale=scale):
+                seed(scale)
+                request, args, kwargs = make_request()
+                self.assertQueryBudget(budget, request, *args, expected_status=expected_status, **kwargs)
@@ -1,23 +1,113 @@
 # Register your models here.
+from django import forms
 from django.contrib import admin
-from .models import Order, OrderItem
 
+from config.admin import LargeTableAdminMixin, PaginatedInlineMixin
+from .models import Order, OrderItem, ShopOrder
+from .services.fulfilment import set_order_status
 
-class OrderItemInline(admin.TabularInline):
+
+def _is_placed(order) -> bool:
+    # Итоги, ShopOrder и роллапы продаж зафиксированы при оформлении — позиции больше не правим
+    return order is not None and order.status != Order.Status.BASKET
+
+
+class OrderItemInline(PaginatedInlineMixin, admin.TabularInline):
     model = OrderItem
     extra = 0
+    fields = ("product", "shop", "quantity", "unit_price", "unit_price_rrc")
+    # Выпадающие списки товаров и магазинов на каждую строку — это вся таблица товаров
+    # в каждом <select>; позиции правятся по количеству, товар и магазин только показываем
+    readonly_fields = ("product", "shop", "unit_price", "unit_price_rrc")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return not _is_placed(obj) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not _is_placed(obj) and super().has_delete_permission(request, obj)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product", "shop")
+
+
+class OrderAdminForm(forms.ModelForm):
+    """
+    Статус меняется только между оформленными: в корзину и из неё заказ переходит
+    лишь через оформление (finalize_order), иначе итоги и ShopOrder не соответствуют заказу.
+    """
+
+    class Meta:
+        model = Order
+        fields = "__all__"
+
+    def clean_status(self):
+        new_status = self.cleaned_data["status"]
+        old_status = self.instance.status if self.instance.pk else Order.Status.BASKET
+        if new_status != old_status and Order.Status.BASKET in (old_status, new_status):
+            raise forms.ValidationError("Basket status can not be set or changed here: orders are placed via checkout.")
+        return new_status
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "status", "dt", "created_at", "updated_at")
+class OrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "user", "status", "dt", "items_count", "amount_total", "created_at", "updated_at")
     list_filter = ("status",)
+    list_select_related = ("user",)
     search_fields = ("user__username", "user__email")
+    readonly_fields = ("items_count", "quantity_total", "amount_total")
+    autocomplete_fields = ("user",)
     inlines = [OrderItemInline]
+    form = OrderAdminForm
+
+    def save_model(self, request, obj, form, change):
+        # Смена статуса оформленного заказа — вместе с ShopOrder (переходы через корзину отсекает форма)
+        if change and "status" in form.changed_data:
+            new_status = obj.status
+            obj.status = form.initial["status"]
+            super().save_model(request, obj, form, change)
+            set_order_status(obj, new_status)
+            return
+        super().save_model(request, obj, form, change)
+
+
+class OrderItemAdminForm(forms.ModelForm):
+    class Meta:
+        model = OrderItem
+        fields = "__all__"
+
+    def clean_order(self):
+        order = self.cleaned_data["order"]
+        if _is_placed(order):
+            raise forms.ValidationError("Items of a placed order can not be changed.")
+        return order
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "order", "product", "shop", "quantity", "unit_price")
     list_filter = ("shop",)
-    search_fields = ("product__name", "shop__name")
\ No newline at end of file
+    # Order.__str__ выводит пользователя
+    list_select_related = ("order__user", "product", "shop")
+    search_fields = ("product__name", "shop__name")
+    autocomplete_fields = ("order", "product", "shop", "product_info")
+    form = OrderItemAdminForm
+    # Массовое удаление не видит статус заказа у каждой позиции
+    actions = None
+
+    def has_change_permission(self, request, obj=None):
+        return not (obj and _is_placed(obj.order)) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not (obj and _is_placed(obj.order)) and super().has_delete_permission(request, obj)
+
+
+@admin.register(ShopOrder)
+class ShopOrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "order", "shop", "status", "dt", "item_count", "quantity_total", "subtotal")
+    list_filter = ("status", "shop")
+    list_select_related = ("order__user", "shop")
+    search_fields = ("shop__name",)
+    autocomplete_fields = ("order", "shop")
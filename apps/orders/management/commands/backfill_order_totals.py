@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.services.fulfilment import backfill_order_totals
+
+
+class Command(BaseCommand):
+    help = "Fill denormalized Order totals and per-shop ShopOrder rows for already placed orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        processed = backfill_order_totals(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled totals for {processed} orders"))
@@ -0,0 +1,66 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from apps.orders.services.benchmark import summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-request DB latency with a new connection per request, with persistent connections "
+        "and (if DB_POOL=1) with the configured pool. Each iteration goes through request_started / "
+        "request_finished, exactly like a real request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--queries", type=int, default=3, help="Queries per simulated request")
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--output", default=None, help="Write the JSON report here")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        connection = connections[alias]
+        pooled = bool(connection.settings_dict.get("OPTIONS", {}).get("pool"))
+
+        modes = [("pool", None)] if pooled else [("new_connection", 0), ("persistent", 600)]
+        results = {}
+        for mode, max_age in modes:
+            results[mode] = self._run(connection, max_age, options["requests"], options["queries"])
+            r = results[mode]
+            self.stdout.write(
+                f"{mode:15} p50 {r['p50_ms']:7.2f} ms  p95 {r['p95_ms']:7.2f} ms  "
+                f"p99 {r['p99_ms']:7.2f} ms  {r['throughput_rps']:8.1f} req/s"
+            )
+
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    def _run(self, connection, max_age, requests: int, queries: int) -> dict:
+        saved = connection.settings_dict["CONN_MAX_AGE"]
+        if max_age is not None:
+            connection.settings_dict["CONN_MAX_AGE"] = max_age
+        connection.close()
+
+        latencies = []
+        started = time.perf_counter()
+        try:
+            for _ in range(requests):
+                t0 = time.perf_counter()
+                request_started.send(sender=WSGIHandler)
+                with connection.cursor() as cursor:
+                    for _ in range(queries):
+                        cursor.execute("SELECT 1")
+                        cursor.fetchone()
+                # Здесь Django закрывает соединение (CONN_MAX_AGE=0) или возвращает его в пул
+                request_finished.send(sender=WSGIHandler)
+                latencies.append(time.perf_counter() - t0)
+        finally:
+            connection.settings_dict["CONN_MAX_AGE"] = saved
+            connection.close()
+        return summarize(latencies, {200: len(latencies)}, time.perf_counter() - started)
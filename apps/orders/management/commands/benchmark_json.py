@@ -0,0 +1,99 @@
+import io
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import compress_string
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from apps.catalog.serializers import ProductSerializer
+from apps.catalog.views import product_queryset
+from config.fastjson import FastJSONParser, FastJSONRenderer, orjson_available
+from config.middleware import brotli_available
+
+
+# Типичное тело запроса к API (добавление в корзину)
+SMALL_BODY = b'{"product_info_id": 12345, "quantity": 2}'
+
+
+class Command(BaseCommand):
+    help = (
+        "Throughput of the standard DRF JSON renderer/parser vs FastJSONRenderer/FastJSONParser "
+        "on a real product list payload, plus gzip/brotli size and time for the same body."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=500, help="Products in the payload")
+        parser.add_argument("--seconds", type=float, default=2.0, help="Time budget per measurement")
+        parser.add_argument("--output", default=None, help="Write the JSON report here")
+
+    def handle(self, *args, **options):
+        if not orjson_available():
+            raise CommandError("orjson is not installed - FastJSONRenderer falls back to the standard one")
+
+        products = list(product_queryset().order_by("id")[: options["products"]])
+        if not products:
+            raise CommandError("No products found - run generate_synthetic_data first")
+        data = ProductSerializer(products, many=True).data
+        body = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != body:
+            raise CommandError("FastJSONRenderer output differs from JSONRenderer on this payload")
+
+        seconds = options["seconds"]
+        results = {"products": len(products), "payload_bytes": len(body)}
+        # имя -> (операция, размер обрабатываемого JSON в байтах)
+        cases = {
+            "render_drf": (lambda: JSONRenderer().render(data), len(body)),
+            "render_fast": (lambda: FastJSONRenderer().render(data), len(body)),
+            "serialize_render_drf": (
+                lambda: JSONRenderer().render(ProductSerializer(products, many=True).data), len(body)
+            ),
+            "serialize_render_fast": (
+                lambda: FastJSONRenderer().render(ProductSerializer(products, many=True).data), len(body)
+            ),
+            "parse_drf": (lambda: JSONParser().parse(io.BytesIO(body)), len(body)),
+            "parse_fast": (lambda: FastJSONParser().parse(io.BytesIO(body)), len(body)),
+            "parse_small_drf": (lambda: JSONParser().parse(io.BytesIO(SMALL_BODY)), len(SMALL_BODY)),
+            "parse_small_fast": (lambda: FastJSONParser().parse(io.BytesIO(SMALL_BODY)), len(SMALL_BODY)),
+            "gzip": (lambda: compress_string(body), len(body)),
+        }
+        if brotli_available():
+            import brotli
+
+            cases["brotli_q5"] = (lambda: brotli.compress(body, quality=5), len(body))
+
+        for name, (func, size) in cases.items():
+            results[name] = _measure(func, seconds, size)
+            r = results[name]
+            self.stdout.write(f"{name:22} {r['ms']:8.3f} ms/op  {r['ops']:9.1f} op/s  {r['mb_s']:8.1f} MB/s")
+
+        for name in ("render", "serialize_render", "parse", "parse_small"):
+            speedup = results[f"{name}_drf"]["ms"] / results[f"{name}_fast"]["ms"]
+            results[f"{name}_speedup"] = round(speedup, 2)
+            self.stdout.write(f"{name:22} x{speedup:.2f}")
+
+        results["gzip_bytes"] = len(compress_string(body))
+        self.stdout.write(f"payload {len(body)} bytes, gzip {results['gzip_bytes']} bytes")
+
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+def _measure(func, seconds: float, size: int) -> dict:
+    """
+    Среднее время операции; MB/s — по размеру JSON-тела (на входе или на выходе).
+    """
+    func()  # прогрев
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        func()
+        count += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+    elapsed = now - started
+    return {"ms": elapsed / count * 1000, "ops": count / elapsed, "mb_s": size * count / elapsed / 1e6}
@@ -0,0 +1,149 @@
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Exists, OuterRef, Prefetch
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from apps.catalog.models import Parameter, Product, ProductInfo, ProductParameter, Shop
+from apps.catalog.views import product_queryset
+from apps.orders.services.benchmark import summarize
+from apps.orders.services.synthetic import write_price_files
+from apps.partners.services.importer import import_price_content
+
+
+class Command(BaseCommand):
+    help = (
+        "Offer parameters as EAV rows (ProductParameter) vs the ProductInfo.params jsonb column: "
+        "catalog read and filter latency, price import throughput with and without EAV writes, storage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100, help="Products per catalog page")
+        parser.add_argument("--repeats", type=int, default=50, help="Measurements per read/filter case")
+        parser.add_argument("--import-shop", type=int, default=None, help="Shop to re-import (default: first)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default=None, help="Write the JSON report here")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("jsonb/GIN benchmark needs PostgreSQL")
+        if not ProductInfo.objects.exclude(params={}).exists():
+            raise CommandError("ProductInfo.params is empty - run backfill_product_params first")
+
+        rnd = random.Random(options["seed"])
+        results = {}
+        for name, (func, check) in self._read_cases(options["products"], options["repeats"], rnd).items():
+            results[name] = self._measure(func, options["repeats"])
+            results[name]["queries"] = check
+            r = results[name]
+            self.stdout.write(
+                f"{name:14} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  queries {r['queries']}"
+            )
+
+        results.update(self._imports(options["import_shop"]))
+        results["storage"] = self._storage()
+        for key, value in results["storage"].items():
+            self.stdout.write(f"{key:24} {value / 1024 / 1024:10.2f} MB")
+
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    def _read_cases(self, products: int, repeats: int, rnd: random.Random) -> dict:
+        ids = list(Product.objects.order_by("id").values_list("id", flat=True)[:products])
+
+        def read_eav():
+            offers = ProductInfo.objects.filter(shop_enabled=True).select_related("shop").prefetch_related(
+                Prefetch("parameters", queryset=ProductParameter.objects.select_related("parameter"))
+            )
+            page = Product.objects.filter(id__in=ids).prefetch_related(Prefetch("product_infos", queryset=offers))
+            return [
+                sorted((pp.parameter.name, pp.value) for pp in info.parameters.all())
+                for product in page for info in product.product_infos.all()
+            ]
+
+        def read_jsonb():
+            page = product_queryset().filter(id__in=ids)
+            return [
+                sorted(info.params.items())
+                for product in page for info in product.product_infos.all()
+            ]
+
+        if read_eav() != read_jsonb():
+            raise CommandError("params differ from ProductParameter rows - run backfill_product_params")
+
+        # Фильтры — по параметрам случайных предложений, одинаковые для обоих вариантов
+        samples = []
+        for info_id in rnd.sample(list(ProductInfo.objects.values_list("id", flat=True)[:10_000]), 10):
+            name, value = next(iter(ProductInfo.objects.get(pk=info_id).params.items()))
+            samples.append((name, value))
+        position = iter(range(10**9))
+
+        def filter_eav():
+            name, value = samples[next(position) % len(samples)]
+            match = ProductParameter.objects.filter(
+                product_info__product=OuterRef("pk"), product_info__shop_enabled=True,
+                parameter__name=name, value=value,
+            )
+            return list(Product.objects.filter(Exists(match)).values_list("id", flat=True)[:products])
+
+        def filter_jsonb():
+            name, value = samples[next(position) % len(samples)]
+            match = ProductInfo.objects.filter(product=OuterRef("pk"), shop_enabled=True, params__contains={name: value})
+            return list(Product.objects.filter(Exists(match)).values_list("id", flat=True)[:products])
+
+        cases = {}
+        for name, func in (("read_eav", read_eav), ("read_jsonb", read_jsonb),
+                           ("filter_eav", filter_eav), ("filter_jsonb", filter_jsonb)):
+            with CaptureQueriesContext(connection) as ctx:
+                func()
+            cases[name] = (func, len(ctx.captured_queries))
+        return cases
+
+    def _measure(self, func, repeats: int) -> dict:
+        func()  # прогрев
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            func()
+            latencies.append(time.perf_counter() - t0)
+        return summarize(latencies, {200: repeats}, time.perf_counter() - started)
+
+    def _imports(self, shop_id: int | None) -> dict:
+        shop = Shop.objects.filter(**({"id": shop_id} if shop_id else {})).order_by("id").first()
+        if shop is None or shop.user is None:
+            raise CommandError("Import benchmark needs a shop with a supplier user")
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            content = write_price_files([shop.id], directory)[0].read_bytes()
+            goods = ProductInfo.objects.filter(shop=shop).count()
+            for name, eav in (("import_eav", True), ("import_jsonb", False)):
+                # Первый прогон — прогрев и выравнивание данных, замер — повторный импорт того же прайса
+                with override_settings(CATALOG_PARAMS_EAV=eav):
+                    import_price_content(user=shop.user, url=f"file://{directory}", content=content)
+                    started = time.perf_counter()
+                    result = import_price_content(user=shop.user, url=f"file://{directory}", content=content)
+                    elapsed = time.perf_counter() - started
+                if not result["Status"]:
+                    raise CommandError(f"Import failed: {result['Error']}")
+                results[name] = {"goods": goods, "seconds": round(elapsed, 3), "goods_per_s": round(goods / elapsed, 1)}
+                self.stdout.write(f"{name:14} {goods} goods in {elapsed:.2f} s  {goods / elapsed:8.1f} goods/s")
+        return results
+
+    def _storage(self) -> dict:
+        qn = connection.ops.quote_name
+        info = qn(ProductInfo._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_total_relation_size(%s::regclass) + pg_total_relation_size(%s::regclass), "
+                f"(SELECT COALESCE(sum(pg_column_size(params)), 0) FROM {info}), "
+                "pg_relation_size('productinfo_params_gin'::regclass)",
+                [qn(ProductParameter._meta.db_table), qn(Parameter._meta.db_table)],
+            )
+            eav, column, gin = cursor.fetchone()
+        return {"eav_tables_bytes": eav, "params_column_bytes": column, "params_gin_bytes": gin}
@@ -0,0 +1,169 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalog.models import Shop
+from apps.orders.services.benchmark import PERCENTILES, percentile, serve_directory
+from apps.orders.services.synthetic import write_price_files
+
+MODES = ("shared", "dedicated")
+BENCH_QUEUES = ("imports", "notifications", "maintenance")
+
+
+class Command(BaseCommand):
+    help = (
+        "End-to-end latency of a notifications task (enqueue -> start on a worker) while large partner "
+        "imports occupy the imports queue. shared: one worker for every queue (how it was), dedicated: "
+        "a worker per queue with WORKER_PROFILES. Starts the workers itself; needs a real broker "
+        "(CELERY_BROKER_URL) and a result backend. Writes data - run it on a synthetic database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated: {', '.join(MODES)}")
+        parser.add_argument("--imports", type=int, default=12, help="Price imports enqueued before the probes")
+        parser.add_argument("--probes", type=int, default=40, help="Notification probes per mode")
+        parser.add_argument("--interval", type=float, default=0.5, help="Seconds between probes")
+        parser.add_argument("--timeout", type=float, default=900, help="Max seconds to wait for a task")
+        parser.add_argument("--output", default=None, help="Write the JSON report here")
+
+    def handle(self, *args, **options):
+        if settings.CELERY_TASK_ALWAYS_EAGER:
+            raise CommandError("Tasks run eagerly - set CELERY_BROKER_URL (and CELERY_RESULT_BACKEND) first")
+        modes = [name.strip() for name in options["modes"].split(",") if name.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+        shops = list(Shop.objects.filter(user__isnull=False, state=True).order_by("id"))
+        if not shops:
+            raise CommandError("No supplier shops found - run generate_synthetic_data first")
+
+        results = {}
+        with tempfile.TemporaryDirectory() as price_dir, serve_directory(Path(price_dir)) as base_url:
+            write_price_files([shop.id for shop in shops], price_dir)
+            imports = [(shop.user_id, f"{base_url}/shop-{shop.id}.yaml") for shop in shops]
+            for mode in modes:
+                self.stdout.write(f"{mode}: starting workers")
+                results[mode] = self.run_mode(mode, imports, options)
+                r = results[mode]
+                self.stdout.write(
+                    f"{mode:10} probe p50 {r['p50_ms']:9.1f} ms  p95 {r['p95_ms']:9.1f} ms  "
+                    f"p99 {r['p99_ms']:9.1f} ms  max {r['max_ms']:9.1f} ms  "
+                    f"imports {r['imports_ok']}/{r['imports']} in {r['imports_seconds']:.1f} s"
+                )
+
+        report = {
+            "imports": options["imports"],
+            "probes": options["probes"],
+            "interval": options["interval"],
+            "profiles": {name: settings.WORKER_PROFILES[name] for name in ("imports", "notifications")},
+            "modes": results,
+        }
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def run_mode(self, mode: str, imports: list[tuple[int, str]], options) -> dict:
+        from apps.partners.tasks import import_price
+        from config.celery import app, ping
+
+        _purge(app)
+        workers = _start_workers(mode)
+        try:
+            _wait_ready(app, len(workers), options["timeout"])
+
+            started = time.perf_counter()
+            import_results = [
+                import_price.delay(*imports[i % len(imports)]) for i in range(options["imports"])
+            ]
+            # Даём воркерам разобрать импорты, прежде чем мерить
+            time.sleep(1.0)
+
+            probes = []
+            for _ in range(options["probes"]):
+                probes.append((time.time(), ping.apply_async(queue="notifications")))
+                time.sleep(options["interval"])
+            latencies = sorted(
+                max(result.get(timeout=options["timeout"]) - sent, 0.0) for sent, result in probes
+            )
+
+            imports_ok = sum(
+                1 for result in import_results if result.get(timeout=options["timeout"]).get("Status")
+            )
+            imports_seconds = time.perf_counter() - started
+        finally:
+            _stop_workers(workers)
+            _purge(app)
+
+        summary = {
+            "probes": len(latencies),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+            "imports": len(import_results),
+            "imports_ok": imports_ok,
+            "imports_seconds": round(imports_seconds, 2),
+        }
+        for pct in PERCENTILES:
+            summary[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 2)
+        return summary
+
+
+def _start_workers(mode: str) -> list[subprocess.Popen]:
+    """
+    shared — один воркер на все очереди с настройками по умолчанию и тем же числом процессов,
+    что у двух профилей вместе; dedicated — по воркеру на очередь с профилями из WORKER_PROFILES.
+    """
+    base = [sys.executable, "-m", "celery", "-A", "config", "--quiet", "worker", "--loglevel", "WARNING"]
+    env = {key: value for key, value in os.environ.items() if key != "CELERY_WORKER_PROFILE"}
+
+    if mode == "shared":
+        concurrency = sum(settings.WORKER_PROFILES[name]["concurrency"] for name in ("imports", "notifications"))
+        commands = [(
+            [*base, "-n", "shared@bench", "-Q", ",".join(BENCH_QUEUES), "-c", str(concurrency)],
+            env,
+        )]
+    else:
+        commands = [
+            ([*base, "-n", f"{name}@bench"], {**env, "CELERY_WORKER_PROFILE": name})
+            for name in ("imports", "notifications")
+        ]
+    return [
+        subprocess.Popen(command, env=command_env, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL)
+        for command, command_env in commands
+    ]
+
+
+def _wait_ready(app, count: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(app.control.ping(timeout=1.0)) >= count:
+            return
+    raise CommandError(f"Workers did not start in {timeout:.0f} s")
+
+
+def _stop_workers(workers: list[subprocess.Popen]) -> None:
+    # Холодная остановка: не ждём недоделанные импорты (acks_late вернёт их в очередь — её чистим)
+    for worker in workers:
+        if worker.poll() is None:
+            worker.send_signal(signal.SIGQUIT)
+    for worker in workers:
+        try:
+            worker.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+            worker.wait()
+
+
+def _purge(app) -> None:
+    with app.connection_for_write() as conn:
+        channel = conn.default_channel
+        for queue in BENCH_QUEUES:
+            channel.queue_purge(queue)
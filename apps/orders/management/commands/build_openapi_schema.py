@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.schema import SCHEMA_FORMATS, generate_schema, schema_path
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema into OPENAPI_SCHEMA_DIR/schema-<VERSION>.{yaml,json}; "
+        "/api/schema/ serves these files from memory. Run it on deploy, after code changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-dir", default=None, help="Default: settings.OPENAPI_SCHEMA_DIR")
+        parser.add_argument("--check", action="store_true", help="Only verify the files are up to date")
+
+    def handle(self, *args, **options):
+        directory = Path(options["output_dir"]) if options["output_dir"] else None
+        documents = generate_schema()
+
+        if options["check"]:
+            stale = [
+                str(schema_path(fmt, directory)) for fmt in SCHEMA_FORMATS
+                if not schema_path(fmt, directory).exists()
+                or schema_path(fmt, directory).read_bytes() != documents[fmt]
+            ]
+            if stale:
+                raise CommandError(f"OpenAPI schema is missing or outdated: {', '.join(stale)}")
+            self.stdout.write(self.style.SUCCESS("OpenAPI schema is up to date"))
+            return
+
+        for fmt in SCHEMA_FORMATS:
+            path = schema_path(fmt, directory)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(documents[fmt])
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path} ({len(documents[fmt])} bytes)"))
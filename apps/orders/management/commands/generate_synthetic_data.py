@@ -0,0 +1,60 @@
+import secrets
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.orders.services.synthetic import SyntheticConfig, SyntheticDataGenerator, write_price_files
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic shops, catalog, users and orders at production scale (bulk inserts / COPY)."
+
+    def add_arguments(self, parser):
+        defaults = SyntheticConfig()
+        parser.add_argument("--shops", type=int, default=defaults.shops)
+        parser.add_argument("--categories", type=int, default=defaults.categories)
+        parser.add_argument("--products", type=int, default=defaults.products)
+        parser.add_argument("--offers-per-product", type=int, default=defaults.offers_per_product)
+        parser.add_argument("--parameters", type=int, default=defaults.parameters)
+        parser.add_argument("--params-per-offer", type=int, default=defaults.params_per_offer)
+        parser.add_argument("--users", type=int, default=defaults.users)
+        parser.add_argument("--orders", type=int, default=defaults.orders)
+        parser.add_argument("--items-per-order", type=int, default=defaults.items_per_order)
+        parser.add_argument("--days", type=int, default=defaults.days, help="Spread order dates over N days")
+        parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+        parser.add_argument("--copy", action="store_true", help="Use COPY for parameter and order item rows")
+        parser.add_argument("--prefix", default=None, help="Name prefix (default: random, so runs do not clash)")
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--yaml-dir", default=None, help="Also write supplier price files shop-<id>.yaml here")
+
+    def handle(self, *args, **options):
+        config = SyntheticConfig(
+            shops=options["shops"],
+            categories=options["categories"],
+            products=options["products"],
+            offers_per_product=options["offers_per_product"],
+            parameters=options["parameters"],
+            params_per_offer=options["params_per_offer"],
+            users=options["users"],
+            orders=options["orders"],
+            items_per_order=options["items_per_order"],
+            days=options["days"],
+            batch_size=options["batch_size"],
+            use_copy=options["copy"],
+            prefix=options["prefix"] or f"syn-{secrets.token_hex(3)}",
+            seed=options["seed"],
+        )
+
+        started = time.perf_counter()
+        generator = SyntheticDataGenerator(config, log=self.stdout.write)
+        stats = generator.run()
+        for key, value in stats.items():
+            self.stdout.write(f"{key}: {value}")
+
+        if options["yaml_dir"]:
+            paths = write_price_files(generator.shop_ids, options["yaml_dir"])
+            self.stdout.write(f"price files: {len(paths)} in {options['yaml_dir']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated data with prefix '{config.prefix}' in {time.perf_counter() - started:.1f}s"
+        ))
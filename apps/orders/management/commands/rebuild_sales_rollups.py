@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.orders.services.analytics import check_sales_rollups, rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild daily sales rollups from OrderItem, or (--check) compare them with raw aggregates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shop", type=int, default=None, help="Only this shop id")
+        parser.add_argument("--check", action="store_true", help="Only compare, do not rewrite")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        shop_id = options["shop"]
+
+        if options["check"]:
+            mismatches = check_sales_rollups(shop_id=shop_id)
+            for m in mismatches:
+                self.stdout.write(f"{m['key']}: rollup={m['rollup']} expected={m['expected']}")
+            if mismatches:
+                raise CommandError(f"Sales rollups are inconsistent ({len(mismatches)} mismatches shown)")
+            self.stdout.write(self.style.SUCCESS("Sales rollups are consistent"))
+            return
+
+        written = rebuild_sales_rollups(shop_id=shop_id, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollup rows"))
@@ -0,0 +1,88 @@
+import json
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from apps.orders.services.benchmark import (
+    SCENARIOS,
+    BenchmarkContext,
+    ClientDriver,
+    HttpDriver,
+    build_report,
+    compare_reports,
+    run_scenario,
+    serve_directory,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load benchmark: catalog listing/search, basket mutations, checkout and partner import. "
+        "Writes p50/p95/p99 latency and throughput to JSON. Writes data - run it on a synthetic database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated: {', '.join(SCENARIOS)}")
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--clients", type=int, default=50, help="Customer accounts to spread basket load over")
+        parser.add_argument("--base-url", default=None, help="Benchmark a running server over HTTP instead of in-process")
+        parser.add_argument("--price-dir", default=None, help="Directory with shop-<id>.yaml files for partner_import")
+        parser.add_argument("--keep-throttling", action="store_true", help="In-process only: do not disable throttles")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default=None, help="Write the JSON report here")
+        parser.add_argument("--compare", default=None, help="Previous JSON report to compare with")
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options["scenarios"].split(",") if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        base_url = options["base_url"]
+        price_dir = Path(options["price_dir"]) if options["price_dir"] else None
+
+        with ExitStack() as stack:
+            if not base_url and not options["keep_throttling"]:
+                stack.enter_context(override_settings(THROTTLE_BUCKETS={}))
+            price_base_url = stack.enter_context(serve_directory(price_dir)) if price_dir else None
+
+            ctx = BenchmarkContext(clients=options["clients"], price_base_url=price_base_url, price_dir=price_dir)
+            if not ctx.client_tokens or not ctx.offer_ids:
+                raise CommandError("No customers or in-stock offers found - run generate_synthetic_data first")
+
+            make_driver = (lambda: HttpDriver(base_url)) if base_url else ClientDriver
+            results = {}
+            for name in scenarios:
+                results[name] = run_scenario(
+                    name, ctx, make_driver,
+                    requests=options["requests"], concurrency=options["concurrency"], seed=options["seed"],
+                )
+                r = results[name]
+                self.stdout.write(
+                    f"{name:15} {r['requests']:6} req  p50 {r['p50_ms']:8.1f} ms  p95 {r['p95_ms']:8.1f} ms  "
+                    f"p99 {r['p99_ms']:8.1f} ms  {r['throughput_rps']:8.1f} req/s  errors {r['errors']}"
+                )
+
+        report = build_report(
+            results,
+            driver="http" if base_url else "client",
+            base_url=base_url,
+            requests=options["requests"],
+            concurrency=options["concurrency"],
+        )
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if options["compare"]:
+            baseline = json.loads(Path(options["compare"]).read_text(encoding="utf-8"))
+            self.stdout.write(f"\nCompared with {baseline['meta'].get('revision')} -> {report['meta']['revision']}:")
+            for row in compare_reports(baseline, report):
+                cells = []
+                for key, (old, new, delta) in ((k, v) for k, v in row.items() if k != "scenario"):
+                    change = f"{delta:+.1f}%" if delta is not None else "n/a"
+                    cells.append(f"{key} {old} -> {new} ({change})")
+                self.stdout.write(f"{row['scenario']:15} " + "  ".join(cells))
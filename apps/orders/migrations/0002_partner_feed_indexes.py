@@ -0,0 +1,24 @@
+# Generated by Django 5.2.11 on 2026-10-18 22:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_remove_productinfo_uniq_product_shop_info_and_more'),
+        ('orders', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='orderitem',
+            name='orders_orde_shop_id_55dec6_idx',
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['shop', 'order'], name='orders_orde_shop_id_a35532_idx'),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.2.11 on 2026-10-18 22:49
+
+from decimal import Decimal
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    # Без итогов и ShopOrder старые заказы пропадают из ленты поставщика, а в истории клиента amount=None.
+    # Логика — копия backfill_order_totals на исторических моделях: миграция не должна меняться вместе с сервисом
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    ShopOrder = apps.get_model("orders", "ShopOrder")
+    amount = Coalesce(
+        Sum(F("quantity") * F("unit_price"), output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+        Value(Decimal("0.00")),
+    )
+
+    last_id = 0
+    while True:
+        orders = list(
+            Order.objects.filter(amount_total__isnull=True, id__gt=last_id).exclude(status="basket").order_by("id")[:500]
+        )
+        if not orders:
+            return
+        last_id = orders[-1].id
+        orders_by_id = {o.id: o for o in orders}
+        for order in orders:
+            order.items_count = 0
+            order.quantity_total = 0
+            order.amount_total = Decimal("0.00")
+
+        rows = (
+            OrderItem.objects.filter(order_id__in=orders_by_id)
+            .values("order_id", "shop_id")
+            .annotate(item_count=Count("id"), quantity_total=Sum("quantity"), subtotal=amount)
+            .order_by()
+        )
+        shop_orders = []
+        for row in rows:
+            order = orders_by_id[row["order_id"]]
+            order.items_count += row["item_count"]
+            order.quantity_total += row["quantity_total"]
+            order.amount_total += row["subtotal"]
+            shop_orders.append(ShopOrder(
+                order=order,
+                shop_id=row["shop_id"],
+                dt=order.dt,
+                status=order.status,
+                item_count=row["item_count"],
+                quantity_total=row["quantity_total"],
+                subtotal=row["subtotal"],
+            ))
+
+        Order.objects.bulk_update(orders, ["items_count", "quantity_total", "amount_total"])
+        ShopOrder.objects.bulk_create(shop_orders, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_remove_productinfo_uniq_product_shop_info_and_more'),
+        ('orders', '0002_partner_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dt', models.DateTimeField()),
+                ('status', models.CharField(choices=[('basket', 'Basket'), ('new', 'New'), ('confirmed', 'Confirmed'), ('processing', 'Processing'), ('done', 'Done'), ('canceled', 'Canceled')], default='new', max_length=20)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('quantity_total', models.PositiveIntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='amount_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='quantity_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shoporder',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shop_orders', to='orders.order'),
+        ),
+        migrations.AddField(
+            model_name='shoporder',
+            name='shop',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='shop_orders', to='catalog.shop'),
+        ),
+        migrations.AddIndex(
+            model_name='shoporder',
+            index=models.Index(fields=['shop', 'dt', 'order'], name='orders_shop_shop_id_163583_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoporder',
+            index=models.Index(fields=['shop', 'updated_at', 'id'], name='orders_shop_shop_id_3d0378_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoporder',
+            constraint=models.UniqueConstraint(fields=('order', 'shop'), name='uniq_shop_order'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-18 22:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_remove_productinfo_uniq_product_shop_info_and_more'),
+        ('orders', '0003_order_totals_shop_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('orders_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_daily', to='catalog.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_daily', to='catalog.product')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_daily', to='catalog.shop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['shop', 'day'], name='orders_prod_shop_id_81e161_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'shop', 'product'), name='uniq_sales_daily_position')],
+            },
+        ),
+    ]
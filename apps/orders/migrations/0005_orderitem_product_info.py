@@ -0,0 +1,34 @@
+# Generated by Django 5.2.11 on 2026-10-19 01:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def link_basket_offers(apps, schema_editor):
+    # Позиции открытых корзин — к первому предложению (product, shop), как их раньше и оценивали
+    OrderItem = apps.get_model("orders", "OrderItem")
+    ProductInfo = apps.get_model("catalog", "ProductInfo")
+    first_offer = (
+        ProductInfo.objects.filter(product_id=OuterRef("product_id"), shop_id=OuterRef("shop_id"))
+        .order_by("id")
+        .values("id")[:1]
+    )
+    OrderItem.objects.filter(order__status="basket", product_info__isnull=True).update(product_info=Subquery(first_offer))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_backfill_productinfo_params'),
+        ('orders', '0004_product_sales_daily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_info',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='catalog.productinfo'),
+        ),
+        migrations.RunPython(link_basket_offers, migrations.RunPython.noop),
+    ]
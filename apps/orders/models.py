@@ -3,7 +3,7 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
-from apps.catalog.models import Product, Shop
+from apps.catalog.models import Product, ProductInfo, Shop
 
 
 class Order(models.Model):
@@ -19,6 +19,11 @@ class Order(models.Model):
     dt = models.DateTimeField(default=timezone.now, editable=False)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.BASKET)
 
+    # Итоги фиксируются при оформлении (для корзины не ведутся; NULL — ещё не посчитаны)
+    items_count = models.PositiveIntegerField(default=0)
+    quantity_total = models.PositiveIntegerField(default=0)
+    amount_total = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+
     created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -36,6 +41,11 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name="order_items")
     shop = models.ForeignKey(Shop, on_delete=models.PROTECT, related_name="order_items")
+    # Предложение, из которого позиция добавлена в корзину: у (product, shop) их может быть
+    # несколько, цену до оформления берём именно его
+    product_info = models.ForeignKey(
+        ProductInfo, on_delete=models.SET_NULL, null=True, blank=True, related_name="order_items"
+    )
     quantity = models.PositiveIntegerField(default=1)
 
     # Важное дополнение: фиксация цены на момент заказа (для накладных/писем)
@@ -51,8 +61,71 @@ class OrderItem(models.Model):
         ]
         indexes = [
             models.Index(fields=["order"]),
-            models.Index(fields=["shop"]),
+            # Лента заказов поставщика: позиции магазина по заказам
+            models.Index(fields=["shop", "order"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.order_id}: {self.product} x{self.quantity}"
+
+
+class ShopOrder(models.Model):
+    """
+    Часть заказа, приходящаяся на один магазин: создаётся при оформлении,
+    поставщик читает одну строку на (shop, order) вместо агрегации позиций.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="shop_orders")
+    shop = models.ForeignKey(Shop, on_delete=models.PROTECT, related_name="shop_orders")
+
+    # Копия Order.dt — чтобы лента поставщика шла по индексу (shop, dt, order)
+    dt = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Order.Status.choices, default=Order.Status.NEW)
+
+    item_count = models.PositiveIntegerField(default=0)
+    quantity_total = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["order", "shop"], name="uniq_shop_order"),
+        ]
+        indexes = [
+            models.Index(fields=["shop", "dt", "order"]),
+            # Инкрементальная выгрузка для поставщиков (since)
+            models.Index(fields=["shop", "updated_at", "id"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Order#{self.order_id} @ {self.shop_id} {self.status}"
+
+
+class ProductSalesDaily(models.Model):
+    """
+    Роллап продаж: день × магазин × товар. Обновляется инкрементально при оформлении
+    и отмене заказа; аналитика поставщика читает только эту таблицу.
+    """
+    day = models.DateField()
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="sales_daily")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="sales_daily")
+    # Копия product.category_id — для группировки по категориям без join
+    category = models.ForeignKey("catalog.Category", on_delete=models.CASCADE, related_name="sales_daily")
+
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    orders_count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "shop", "product"], name="uniq_sales_daily_position"),
+        ]
+        indexes = [
+            models.Index(fields=["shop", "day"]),
         ]
 
     def __str__(self) -> str:
-        return f"{self.order_id}: {self.product} x{self.quantity}"
\ No newline at end of file
+        return f"{self.day} {self.shop_id}/{self.product_id}: {self.quantity}"
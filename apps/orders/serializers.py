@@ -17,6 +17,8 @@ class BasketItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source="product.name", read_only=True)
     shop_id = serializers.IntegerField(source="shop.id", read_only=True)
     shop_name = serializers.CharField(source="shop.name", read_only=True)
+    # false — магазин выключен, позицию не оформить
+    shop_enabled = serializers.BooleanField(source="shop.state", read_only=True)
 
     class Meta:
         model = OrderItem
@@ -26,12 +28,20 @@ class BasketItemSerializer(serializers.ModelSerializer):
             "product_name",
             "shop_id",
             "shop_name",
+            "shop_enabled",
             "quantity",
             "unit_price",
             "unit_price_rrc",
         )
 
 
+class BasketSummarySerializer(serializers.Serializer):
+    lines = serializers.IntegerField()
+    unavailable = serializers.IntegerField(help_text="Позиций из выключенных магазинов")
+    quantity = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
 class BasketSerializer(serializers.ModelSerializer):
     items = BasketItemSerializer(many=True, read_only=True)
 
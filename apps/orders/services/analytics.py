@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.orders.models import Order, OrderItem, ProductSalesDaily
+
+# Заказы в этих статусах в продажи не входят
+EXCLUDED_STATUSES = (Order.Status.BASKET, Order.Status.CANCELED)
+
+
+def _rollup_deltas(order: Order, items: Iterable[OrderItem], sign: int) -> dict[tuple, list]:
+    day = timezone.localdate(order.dt)
+    deltas: dict[tuple, list] = {}
+    for item in items:
+        unit_price = item.unit_price if item.unit_price is not None else Decimal("0.00")
+        key = (day, item.shop_id, item.product_id)
+        # orders_count — заказы, а не позиции: несколько позиций товара в заказе считаются одним
+        row = deltas.setdefault(key, [item.product.category_id, 0, Decimal("0.00"), sign])
+        row[1] += sign * item.quantity
+        row[2] += sign * unit_price * item.quantity
+    return deltas
+
+
+def apply_order_to_rollups(order: Order, items: Iterable[OrderItem] | None = None, sign: int = 1) -> None:
+    """
+    Прибавляет (sign=1) или вычитает (sign=-1) позиции заказа из дневных роллапов
+    одним INSERT ... ON CONFLICT DO UPDATE. Вызывается в транзакции смены статуса.
+    """
+    if items is None:
+        items = OrderItem.objects.filter(order=order).select_related("product")
+
+    deltas = _rollup_deltas(order, items, sign)
+    if not deltas:
+        return
+
+    table = connection.ops.quote_name(ProductSalesDaily._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} (day, shop_id, product_id, category_id, quantity, revenue, orders_count, updated_at) "
+        f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+        f"ON CONFLICT (day, shop_id, product_id) DO UPDATE SET "
+        f"quantity = {table}.quantity + EXCLUDED.quantity, "
+        f"revenue = {table}.revenue + EXCLUDED.revenue, "
+        f"orders_count = {table}.orders_count + EXCLUDED.orders_count, "
+        f"updated_at = EXCLUDED.updated_at"
+    )
+    now = timezone.now()
+    params = [
+        (day, shop_id, product_id, category_id, quantity, revenue, orders, now)
+        for (day, shop_id, product_id), (category_id, quantity, revenue, orders) in deltas.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _raw_rollup_queryset(shop_id: int | None = None):
+    """
+    Те же агрегаты, что в роллапах, но посчитанные по OrderItem (для rebuild и проверки).
+    """
+    qs = OrderItem.objects.exclude(order__status__in=EXCLUDED_STATUSES)
+    if shop_id is not None:
+        qs = qs.filter(shop_id=shop_id)
+    return (
+        qs.annotate(day=TruncDate("order__dt"))
+        .values("day", "shop_id", "product_id", "product__category_id")
+        .annotate(
+            total_quantity=Sum("quantity"),
+            total_revenue=Sum(
+                F("quantity") * F("unit_price"),
+                output_field=DecimalField(max_digits=16, decimal_places=2),
+            ),
+            total_orders=Count("order", distinct=True),
+        )
+        .order_by()
+    )
+
+
+def rebuild_sales_rollups(shop_id: int | None = None, batch_size: int = 2000) -> int:
+    """
+    Полный пересчёт роллапов из OrderItem. Возвращает число записанных строк.
+    """
+    written = 0
+    with transaction.atomic():
+        rollups = ProductSalesDaily.objects.all()
+        if shop_id is not None:
+            rollups = rollups.filter(shop_id=shop_id)
+        rollups.delete()
+
+        batch: list[ProductSalesDaily] = []
+        for row in _raw_rollup_queryset(shop_id).iterator(chunk_size=batch_size):
+            batch.append(
+                ProductSalesDaily(
+                    day=row["day"],
+                    shop_id=row["shop_id"],
+                    product_id=row["product_id"],
+                    category_id=row["product__category_id"],
+                    quantity=row["total_quantity"],
+                    revenue=row["total_revenue"] or Decimal("0.00"),
+                    orders_count=row["total_orders"],
+                )
+            )
+            if len(batch) >= batch_size:
+                ProductSalesDaily.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            ProductSalesDaily.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def check_sales_rollups(shop_id: int | None = None, limit: int = 50) -> list[dict]:
+    """
+    Сверка роллапов с сырыми агрегатами по OrderItem. Возвращает расхождения (не больше limit).
+    """
+    expected = {
+        (row["day"], row["shop_id"], row["product_id"]): (
+            row["total_quantity"],
+            row["total_revenue"] or Decimal("0.00"),
+            row["total_orders"],
+        )
+        for row in _raw_rollup_queryset(shop_id).iterator()
+    }
+
+    rollups = ProductSalesDaily.objects.all()
+    if shop_id is not None:
+        rollups = rollups.filter(shop_id=shop_id)
+
+    mismatches: list[dict] = []
+    for row in rollups.values("day", "shop_id", "product_id", "quantity", "revenue", "orders_count").iterator():
+        key = (row["day"], row["shop_id"], row["product_id"])
+        actual = (row["quantity"], row["revenue"], row["orders_count"])
+        # Строка с нулями после отмены всех заказов эквивалентна отсутствию строки
+        wanted = expected.pop(key, (0, Decimal("0.00"), 0))
+        if actual != wanted:
+            mismatches.append({"key": key, "rollup": actual, "expected": wanted})
+            if len(mismatches) >= limit:
+                return mismatches
+
+    for key, wanted in expected.items():
+        mismatches.append({"key": key, "rollup": None, "expected": wanted})
+        if len(mismatches) >= limit:
+            break
+    return mismatches
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import json
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+from urllib.parse import urlencode
+
+from django.db import connections
+from django.utils import timezone
+
+from apps.catalog.models import Category, ProductInfo, Shop
+from apps.orders.services.synthetic import BRANDS, KINDS
+from apps.users.models import UserProfile
+from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+SCENARIOS = ("catalog_list", "catalog_search", "basket_add", "basket_update", "checkout", "partner_import")
+PERCENTILES = (50, 95, 99)
+
+
+# -----------------------
+# Драйверы
+# -----------------------
+
+class ClientDriver:
+    """
+    In-process: запрос проходит весь WSGI-стек Django (middleware, DRF), без сети.
+    """
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client()
+
+    def request(self, method: str, path: str, *, token=None, params=None, payload=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        body = json.dumps(payload) if payload is not None else ""
+        response = self.client.generic(method, path, body, content_type="application/json", **headers)
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, _json_or_none(content, response.get("Content-Type", ""))
+
+    def close(self):
+        # У каждого потока своё соединение с БД
+        connections.close_all()
+
+
+class HttpDriver:
+    """
+    По HTTP к работающему серверу (gunicorn/uvicorn/runserver).
+    """
+
+    def __init__(self, base_url: str):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def request(self, method: str, path: str, *, token=None, params=None, payload=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self.session.request(method, self.base_url + path, params=params, json=payload, headers=headers)
+        return response.status_code, _json_or_none(response.content, response.headers.get("Content-Type", ""))
+
+    def close(self):
+        self.session.close()
+
+
+def _json_or_none(content: bytes, content_type: str):
+    if "json" not in content_type:
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        return None
+
+
+# -----------------------
+# Сценарии
+# -----------------------
+
+class BenchmarkContext:
+    """
+    Общие для сценариев данные: токены покупателей и поставщиков, id категорий и предложений.
+    """
+
+    def __init__(self, *, clients: int, price_base_url: str | None = None, price_dir: Path | None = None):
+        self.client_tokens = [
+            _access_token(profile.user)
+            for profile in UserProfile.objects.filter(role=UserProfile.Role.CLIENT, user__is_active=True)
+            .select_related("user").order_by("id")[:clients]
+        ]
+        self.category_ids = list(Category.objects.values_list("id", flat=True)[:1000])
+        self.offer_ids = list(
+            ProductInfo.objects.filter(quantity__gt=1000, shop__state=True).values_list("id", flat=True)[:10_000]
+        )
+        self.search_terms = [*BRANDS, *KINDS]
+
+        self.price_files: list[tuple[str, str]] = []
+        if price_base_url and price_dir:
+            for shop in Shop.objects.filter(user__isnull=False, state=True).select_related("user"):
+                if (price_dir / f"shop-{shop.id}.yaml").exists():
+                    self.price_files.append((_access_token(shop.user), f"{price_base_url}/shop-{shop.id}.yaml"))
+
+    def client_token(self, worker: int) -> str:
+        # Один покупатель на поток — корзины потоков не конкурируют за блокировки
+        return self.client_tokens[worker % len(self.client_tokens)]
+
+
+def _access_token(user) -> str:
+    return str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+
+
+Timed = Callable[..., tuple[int, object]]
+
+
+def catalog_list(ctx, driver, timed: Timed, worker: int, rnd: random.Random):
+    timed("GET", "/api/catalog/products/", params={"category": rnd.choice(ctx.category_ids)})
+
+
+def catalog_search(ctx, driver, timed: Timed, worker: int, rnd: random.Random):
+    timed("GET", "/api/catalog/products/", params={"q": rnd.choice(ctx.search_terms), "in_stock": 1})
+
+
+def basket_add(ctx, driver, timed: Timed, worker: int, rnd: random.Random):
+    payload = {"product_info_id": rnd.choice(ctx.offer_ids), "quantity": 1}
+    timed("POST", "/api/basket/items/", token=ctx.client_token(worker), params={"response": "delta"}, payload=payload)
+
+
+def basket_update(ctx, driver, timed: Timed, worker: int, rnd: random.Random):
+    token = ctx.client_token(worker)
+    # Подготовка (не замеряется): позиция, которую будем менять
+    _, data = driver.request(
+        "POST", "/api/basket/items/", token=token, params={"response": "delta"},
+        payload={"product_info_id": rnd.choice(ctx.offer_ids), "quantity": 1},
+    )
+    item_id = (data or {}).get("item", {}).get("id")
+    if item_id:
+        timed("PATCH", f"/api/basket/items/{item_id}/", token=token, params={"response": "summary"},
+              payload={"quantity": rnd.randint(1, 3)})
+
+
+def checkout(ctx, driver, timed: Timed, worker: int, rnd: random.Random):
+    token = ctx.client_token(worker)
+    for offer_id in rnd.sample(ctx.offer_ids, min(3, len(ctx.offer_ids))):
+        driver.request("POST", "/api/basket/items/", token=token, params={"response": "delta"},
+                       payload={"product_info_id": offer_id, "quantity": 1})
+    timed("POST", "/api/basket/checkout/", token=token)
+
+
+def partner_import(ctx, driver, timed: Timed, worker: int, rnd: random.Random):
+    if not ctx.price_files:
+        raise RuntimeError("partner_import needs --price-dir with shop-<id>.yaml files (generate_synthetic_data --yaml-dir)")
+    token, url = ctx.price_files[worker % len(ctx.price_files)]
+    timed("POST", "/api/partner/update/", token=token, payload={"url": url})
+
+
+SCENARIO_FUNCS = {
+    "catalog_list": catalog_list,
+    "catalog_search": catalog_search,
+    "basket_add": basket_add,
+    "basket_update": basket_update,
+    "checkout": checkout,
+    "partner_import": partner_import,
+}
+
+
+# -----------------------
+# Прогон и отчёт
+# -----------------------
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(latencies: list[float], statuses: dict[int, int], wall: float) -> dict:
+    values = sorted(latencies)
+    summary = {
+        "requests": len(values),
+        "errors": sum(count for code, count in statuses.items() if code >= 400),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "throughput_rps": round(len(values) / wall, 2) if wall else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(values, pct) * 1000, 2)
+    return summary
+
+
+def run_scenario(name: str, ctx: BenchmarkContext, make_driver: Callable[[], object], *,
+                 requests: int, concurrency: int, seed: int = 0) -> dict:
+    func = SCENARIO_FUNCS[name]
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    lock = threading.Lock()
+    per_worker = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    def worker(index: int):
+        driver = make_driver()
+        rnd = random.Random(seed * 1000 + index)
+
+        def timed(method, path, **kwargs):
+            started = time.perf_counter()
+            code, data = driver.request(method, path, **kwargs)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[code] = statuses.get(code, 0) + 1
+            return code, data
+
+        try:
+            for _ in range(per_worker[index]):
+                func(ctx, driver, timed, index, rnd)
+        finally:
+            driver.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, i) for i in range(concurrency)]:
+            future.result()
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+@contextmanager
+def serve_directory(directory: Path):
+    """
+    Раздаёт прайсы по HTTP на 127.0.0.1 (импорт скачивает прайс по url) — на время прогона.
+    """
+    handler = partial(_QuietHandler, directory=str(directory))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results: dict[str, dict], **meta) -> dict:
+    return {
+        "meta": {"revision": git_revision(), "created_at": timezone.now().isoformat(), **meta},
+        "scenarios": results,
+    }
+
+
+def compare_reports(baseline: dict, current: dict) -> list[dict]:
+    """
+    Сравнение двух отчётов по сценариям: значения и изменение в процентах (для латентности
+    рост — плохо, для throughput — хорошо).
+    """
+    rows = []
+    for name, now in current.get("scenarios", {}).items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        row = {"scenario": name}
+        for key in (*(f"p{pct}_ms" for pct in PERCENTILES), "throughput_rps"):
+            old, new = before.get(key, 0), now.get(key, 0)
+            row[key] = (old, new, round((new - old) / old * 100, 1) if old else None)
+        rows.append(row)
+    return rows
@@ -25,7 +25,12 @@ def _order_lines(order: Order) -> list[str]:
     lines.append("Items:")
     total_sum = Decimal("0.00")
 
-    for item in order.items.select_related("product", "shop").all():
+    # Если items уже предзагружены (checkout) — не перечитываем их
+    items = order.items.all()
+    if "items" not in getattr(order, "_prefetched_objects_cache", {}):
+        items = items.select_related("product", "shop")
+
+    for item in items:
         unit_price = item.unit_price if item.unit_price is not None else Decimal("0.00")
         line_total = unit_price * Decimal(item.quantity)
         total_sum += line_total
@@ -36,7 +41,8 @@ def _order_lines(order: Order) -> list[str]:
         )
 
     lines.append("")
-    lines.append(f"TOTAL: {_money(total_sum)}")
+    # Итог зафиксирован при оформлении; для старых заказов без него — сумма строк
+    lines.append(f"TOTAL: {_money(order.amount_total if order.amount_total is not None else total_sum)}")
     return lines
 
 
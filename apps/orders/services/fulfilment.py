@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.orders.models import Order, OrderItem, ShopOrder
+from apps.orders.services.analytics import apply_order_to_rollups
+
+
+def _line_total(item) -> Decimal:
+    unit_price = item.unit_price if item.unit_price is not None else Decimal("0.00")
+    return unit_price * Decimal(item.quantity)
+
+
+def finalize_order(order: Order, items: Iterable[OrderItem]) -> list[ShopOrder]:
+    """
+    Фиксирует итоги заказа (вместе с уже выставленным order.status) и создаёт ShopOrder
+    по каждому магазину. Вызывается внутри транзакции оформления, когда цены позиций зафиксированы.
+    """
+    items = list(items)
+    by_shop: dict[int, ShopOrder] = {}
+    items_count = 0
+    quantity_total = 0
+    amount_total = Decimal("0.00")
+
+    for item in items:
+        line_total = _line_total(item)
+        items_count += 1
+        quantity_total += item.quantity
+        amount_total += line_total
+
+        shop_order = by_shop.get(item.shop_id)
+        if shop_order is None:
+            shop_order = by_shop[item.shop_id] = ShopOrder(
+                order=order,
+                shop_id=item.shop_id,
+                dt=order.dt,
+                status=order.status,
+                subtotal=Decimal("0.00"),
+            )
+        shop_order.item_count += 1
+        shop_order.quantity_total += item.quantity
+        shop_order.subtotal += line_total
+
+    order.items_count = items_count
+    order.quantity_total = quantity_total
+    order.amount_total = amount_total
+    order.save(update_fields=["status", "items_count", "quantity_total", "amount_total", "updated_at"])
+
+    # Заказ вышел из корзины — учитываем его в роллапах продаж
+    apply_order_to_rollups(order, items)
+
+    return ShopOrder.objects.bulk_create(by_shop.values())
+
+
+def set_order_status(order: Order, new_status: str) -> None:
+    """
+    Смена статуса оформленного заказа вместе со статусами его ShopOrder.
+    Отмена вычитает заказ из роллапов продаж, возврат из отмены — добавляет обратно.
+    """
+    old_status = order.status
+    with transaction.atomic():
+        if old_status != Order.Status.CANCELED and new_status == Order.Status.CANCELED:
+            apply_order_to_rollups(order, sign=-1)
+        elif old_status == Order.Status.CANCELED and new_status != Order.Status.CANCELED:
+            apply_order_to_rollups(order, sign=1)
+
+        order.status = new_status
+        order.save(update_fields=["status", "updated_at"])
+        # update() не трогает auto_now — выставляем updated_at сами (по нему идёт since у поставщика)
+        for shop_order in ShopOrder.objects.filter(order=order).exclude(status=new_status):
+            shop_order.status = new_status
+            shop_order.save(update_fields=["status", "updated_at"])
+
+
+def backfill_order_totals(batch_size: int = 500) -> int:
+    """
+    Досчитывает итоги и ShopOrder для оформленных заказов, у которых amount_total ещё NULL.
+    Возвращает число обработанных заказов.
+    """
+    amount = Coalesce(
+        Sum(F("quantity") * F("unit_price"), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        Value(Decimal("0.00")),
+    )
+
+    processed = 0
+    last_id = 0
+    while True:
+        orders = list(
+            Order.objects.filter(amount_total__isnull=True, id__gt=last_id)
+            .exclude(status=Order.Status.BASKET)
+            .order_by("id")[:batch_size]
+        )
+        if not orders:
+            return processed
+        last_id = orders[-1].id
+        orders_by_id = {o.id: o for o in orders}
+
+        # Одна агрегация на пачку: (order, shop) -> count / quantity / amount
+        rows = (
+            OrderItem.objects.filter(order_id__in=orders_by_id)
+            .values("order_id", "shop_id")
+            .annotate(item_count=Count("id"), quantity_total=Sum("quantity"), subtotal=amount)
+            .order_by()
+        )
+
+        for order in orders:
+            order.items_count = 0
+            order.quantity_total = 0
+            order.amount_total = Decimal("0.00")
+
+        shop_orders = []
+        for row in rows:
+            order = orders_by_id[row["order_id"]]
+            order.items_count += row["item_count"]
+            order.quantity_total += row["quantity_total"]
+            order.amount_total += row["subtotal"]
+            shop_orders.append(
+                ShopOrder(
+                    order=order,
+                    shop_id=row["shop_id"],
+                    dt=order.dt,
+                    status=order.status,
+                    item_count=row["item_count"],
+                    quantity_total=row["quantity_total"],
+                    subtotal=row["subtotal"],
+                )
+            )
+
+        with transaction.atomic():
+            Order.objects.bulk_update(orders, ["items_count", "quantity_total", "amount_total"])
+            ShopOrder.objects.bulk_create(shop_orders, ignore_conflicts=True)
+
+        processed += len(orders)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import base64
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_limit(raw, default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if value < 1:
+        raise ValueError("limit must be >= 1")
+    return min(value, maximum)
+
+
+def encode_cursor(dt: datetime, pk: int) -> str:
+    """
+    Курсор keyset-пагинации: (dt, id) последней строки страницы, в base64.
+    """
+    raw = f"{dt.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, name: str = "cursor") -> tuple[datetime, int]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        dt_raw, pk_raw = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        dt = parse_datetime(dt_raw)
+        pk = int(pk_raw)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"{name} is invalid")
+    if dt is None:
+        raise ValueError(f"{name} is invalid")
+    return dt, pk
+
+
+def keyset_filter(cursor: tuple[datetime, int], dt_field: str = "dt", pk_field: str = "id",
+                  descending: bool = True) -> Q:
+    """
+    Строки строго после курсора при сортировке по (dt_field, pk_field).
+    """
+    dt, pk = cursor
+    op = "lt" if descending else "gt"
+    return Q(**{f"{dt_field}__{op}": dt}) | Q(**{dt_field: dt, f"{pk_field}__{op}": pk})
+
+
+def _parse_day(raw, name: str):
+    if not raw:
+        return None
+    day = parse_date(raw)
+    if not day:
+        raise ValueError(f"{name} must be YYYY-MM-DD")
+    return day
+
+
+def day_range(date_from, date_to) -> tuple[datetime | None, datetime | None]:
+    """
+    YYYY-MM-DD -> полуинтервал [начало date_from, начало (date_to + 1 день)) в текущей таймзоне.
+    Фильтр по границам самой колонки (а не dt__date) позволяет использовать индекс по dt.
+    """
+    day_from = _parse_day(date_from, "date_from")
+    day_to = _parse_day(date_to, "date_to")
+    tz = timezone.get_current_timezone()
+
+    lower = timezone.make_aware(datetime.combine(day_from, time.min), tz) if day_from else None
+    upper = timezone.make_aware(datetime.combine(day_to + timedelta(days=1), time.min), tz) if day_to else None
+    return lower, upper
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import csv
+import io
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+import yaml
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.catalog.models import Category, Parameter, Product, ProductInfo, ProductParameter, Shop
+from apps.orders.models import Order, OrderItem, ShopOrder
+from apps.orders.services.analytics import rebuild_sales_rollups
+from apps.users.models import UserProfile
+
+User = get_user_model()
+
+SYNTHETIC_PASSWORD = "synthetic-pass-123"
+
+BRANDS = ("Apple", "Samsung", "Xiaomi", "Huawei", "Sony", "Lenovo", "Asus", "Acer", "Philips", "Bosch")
+KINDS = ("Смартфон", "Ноутбук", "Планшет", "Наушники", "Монитор", "Телевизор", "Колонка", "Часы", "Роутер", "Камера")
+PARAMETER_NAMES = ("Цвет", "Память", "Диагональ", "Вес", "Гарантия", "Материал", "Разрешение", "Мощность")
+
+# Распределение статусов оформленных заказов
+ORDER_STATUSES = (
+    (Order.Status.NEW, 30),
+    (Order.Status.CONFIRMED, 20),
+    (Order.Status.PROCESSING, 10),
+    (Order.Status.DONE, 35),
+    (Order.Status.CANCELED, 5),
+)
+
+
+@dataclass
+class SyntheticConfig:
+    shops: int = 10
+    categories: int = 50
+    products: int = 10_000
+    offers_per_product: int = 2
+    parameters: int = 20
+    params_per_offer: int = 5
+    users: int = 1_000
+    orders: int = 10_000
+    items_per_order: int = 3
+    days: int = 180
+    batch_size: int = 5_000
+    use_copy: bool = False
+    prefix: str = "syn"
+    seed: int = 42
+
+
+def copy_rows(model, fields: Sequence[str], rows: Iterable[Sequence]) -> int:
+    """
+    COPY ... FROM STDIN (CSV) — для листовых таблиц, id которых дальше не нужны.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    if not count:
+        return 0
+    buf.seek(0)
+
+    opts = model._meta
+    columns = ", ".join(connection.ops.quote_name(opts.get_field(name).column) for name in fields)
+    sql = f"COPY {connection.ops.quote_name(opts.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):  # psycopg2
+            raw.copy_expert(sql, buf)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buf.getvalue())
+    return count
+
+
+def _insert_leaf(model, fields: Sequence[str], rows: list[Sequence], use_copy: bool, batch_size: int) -> int:
+    if use_copy:
+        return copy_rows(model, fields, rows)
+    model.objects.bulk_create((model(**dict(zip(fields, row))) for row in rows), batch_size=batch_size)
+    return len(rows)
+
+
+def _batches(total: int, size: int):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+class SyntheticDataGenerator:
+    """
+    Синтетические данные масштаба прода: магазины, категории, товары, предложения с параметрами,
+    покупатели и оформленные заказы. Пишет пачками (bulk_create или COPY), держит в памяти
+    только компактные кортежи предложений — для выбора позиций заказов.
+    """
+
+    def __init__(self, config: SyntheticConfig, log: Callable[[str], None] | None = None):
+        self.config = config
+        self.rnd = random.Random(config.seed)
+        self.now = timezone.now()
+        self.log = log or (lambda message: None)
+        self.stats: dict[str, int] = {}
+
+        self.shop_ids: list[int] = []
+        self.category_ids: list[int] = []
+        self.parameter_ids: list[int] = []
+        self.client_ids: list[int] = []
+        # (product_id, shop_id, price, price_rrc, category_id)
+        self.offers: list[tuple[int, int, Decimal, Decimal, int]] = []
+
+    def _count(self, key: str, value: int) -> None:
+        self.stats[key] = self.stats.get(key, 0) + value
+
+    def run(self) -> dict[str, int]:
+        with transaction.atomic():
+            self.create_users_and_shops()
+            self.create_categories_and_parameters()
+        for start, size in _batches(self.config.products, self.config.batch_size):
+            with transaction.atomic():
+                self.create_products(start, size)
+            self.log(f"products: {start + size}/{self.config.products}")
+        for start, size in _batches(self.config.orders, self.config.batch_size):
+            with transaction.atomic():
+                self.create_orders(size)
+            self.log(f"orders: {start + size}/{self.config.orders}")
+        if self.config.orders:
+            self._count("sales_rollups", rebuild_sales_rollups(batch_size=self.config.batch_size))
+        return self.stats
+
+    def _create_users(self, kind: str, count: int, role: str) -> list[int]:
+        password = make_password(SYNTHETIC_PASSWORD)
+        prefix = self.config.prefix
+        ids: list[int] = []
+        for start, size in _batches(count, self.config.batch_size):
+            users = User.objects.bulk_create(
+                User(username=f"{prefix}-{kind}-{i}", email=f"{prefix}-{kind}-{i}@example.com", password=password)
+                for i in range(start, start + size)
+            )
+            # bulk_create не шлёт post_save — профили создаём сами
+            UserProfile.objects.bulk_create(UserProfile(user=user, role=role) for user in users)
+            ids += [user.id for user in users]
+        self._count("users", count)
+        return ids
+
+    def create_users_and_shops(self) -> None:
+        supplier_ids = self._create_users("supplier", self.config.shops, UserProfile.Role.SUPPLIER)
+        self.client_ids = self._create_users("client", self.config.users, UserProfile.Role.CLIENT)
+        shops = Shop.objects.bulk_create(
+            Shop(name=f"{self.config.prefix} Shop {i}", user_id=user_id) for i, user_id in enumerate(supplier_ids)
+        )
+        self.shop_ids = [shop.id for shop in shops]
+        self._count("shops", len(shops))
+
+    def create_categories_and_parameters(self) -> None:
+        prefix = self.config.prefix
+        categories = Category.objects.bulk_create(
+            Category(name=f"{prefix} {KINDS[i % len(KINDS)]} {i}") for i in range(self.config.categories)
+        )
+        self.category_ids = [c.id for c in categories]
+        Category.shops.through.objects.bulk_create(
+            Category.shops.through(category_id=category_id, shop_id=shop_id)
+            for category_id in self.category_ids
+            for shop_id in self.shop_ids
+        )
+        parameters = Parameter.objects.bulk_create(
+            Parameter(name=f"{prefix} {PARAMETER_NAMES[i % len(PARAMETER_NAMES)]} {i}")
+            for i in range(self.config.parameters)
+        )
+        self.parameter_ids = [p.id for p in parameters]
+        self.parameter_names = {p.id: p.name for p in parameters}
+        self._count("categories", len(categories))
+        self._count("parameters", len(parameters))
+
+    def create_products(self, start: int, size: int) -> None:
+        rnd = self.rnd
+        products = Product.objects.bulk_create(
+            Product(
+                category_id=rnd.choice(self.category_ids),
+                name=f"{rnd.choice(BRANDS)} {rnd.choice(KINDS)} {i}",
+            )
+            for i in range(start, start + size)
+        )
+
+        offers_per_product = min(self.config.offers_per_product, len(self.shop_ids))
+        params_per_offer = min(self.config.params_per_offer, len(self.parameter_ids))
+        infos = []
+        # Параметры предложения: строки ProductParameter и та же копия в ProductInfo.params
+        offer_params = []
+        for product in products:
+            base_price = Decimal(rnd.randrange(500, 200_000)) / 100
+            for shop_id in rnd.sample(self.shop_ids, offers_per_product):
+                price = (base_price * Decimal(rnd.uniform(0.9, 1.1))).quantize(Decimal("0.01"))
+                values = [
+                    (parameter_id, str(rnd.randrange(1, 1000)))
+                    for parameter_id in rnd.sample(self.parameter_ids, params_per_offer)
+                ]
+                offer_params.append(values)
+                infos.append(
+                    ProductInfo(
+                        product_id=product.id,
+                        shop_id=shop_id,
+                        # external_id уникален в пределах магазина — берём номер товара
+                        external_id=product.id,
+                        model=f"{product.name.split()[0].lower()}/{product.id}",
+                        name=product.name,
+                        quantity=rnd.randrange(10, 10_000),
+                        price=price,
+                        price_rrc=(price * Decimal("1.2")).quantize(Decimal("0.01")),
+                        params={self.parameter_names[parameter_id]: value for parameter_id, value in values},
+                    )
+                )
+        infos = ProductInfo.objects.bulk_create(infos)
+
+        category_by_product = {p.id: p.category_id for p in products}
+        now = self.now
+        rows = []
+        for info, values in zip(infos, offer_params):
+            self.offers.append(
+                (info.product_id, info.shop_id, info.price, info.price_rrc, category_by_product[info.product_id])
+            )
+            for parameter_id, value in values:
+                rows.append((info.id, parameter_id, value, now, now))
+        written = _insert_leaf(
+            ProductParameter,
+            ("product_info", "parameter", "value", "created_at", "updated_at"),
+            rows, self.config.use_copy, self.config.batch_size,
+        )
+
+        self._count("products", len(products))
+        self._count("offers", len(infos))
+        self._count("product_parameters", written)
+
+    def create_orders(self, size: int) -> None:
+        rnd = self.rnd
+        config = self.config
+        statuses, weights = zip(*ORDER_STATUSES)
+
+        orders = []
+        lines_by_order = []
+        for _ in range(size):
+            dt = self.now - timedelta(seconds=rnd.randrange(config.days * 86400))
+            count = min(len(self.offers), rnd.randint(1, 2 * config.items_per_order - 1))
+            lines = [(offer, rnd.randint(1, 3)) for offer in rnd.sample(self.offers, count)]
+            orders.append(
+                Order(
+                    user_id=rnd.choice(self.client_ids),
+                    dt=dt,
+                    status=rnd.choices(statuses, weights)[0],
+                    items_count=len(lines),
+                    quantity_total=sum(qty for _, qty in lines),
+                    amount_total=sum((offer[2] * qty for offer, qty in lines), Decimal("0.00")),
+                    created_at=dt,
+                )
+            )
+            lines_by_order.append(lines)
+        orders = Order.objects.bulk_create(orders)
+
+        now = self.now
+        item_rows = []
+        shop_orders = []
+        for order, lines in zip(orders, lines_by_order):
+            by_shop: dict[int, ShopOrder] = {}
+            for (product_id, shop_id, price, price_rrc, _), qty in lines:
+                item_rows.append((order.id, product_id, shop_id, qty, price, price_rrc, order.dt, now))
+                shop_order = by_shop.get(shop_id)
+                if shop_order is None:
+                    shop_order = by_shop[shop_id] = ShopOrder(
+                        order_id=order.id, shop_id=shop_id, dt=order.dt, status=order.status,
+                        subtotal=Decimal("0.00"), created_at=order.dt,
+                    )
+                shop_order.item_count += 1
+                shop_order.quantity_total += qty
+                shop_order.subtotal += price * qty
+            shop_orders += by_shop.values()
+
+        written = _insert_leaf(
+            OrderItem,
+            ("order", "product", "shop", "quantity", "unit_price", "unit_price_rrc", "created_at", "updated_at"),
+            item_rows, config.use_copy, config.batch_size,
+        )
+        ShopOrder.objects.bulk_create(shop_orders, batch_size=config.batch_size)
+
+        self._count("orders", len(orders))
+        self._count("order_items", written)
+        self._count("shop_orders", len(shop_orders))
+
+
+def write_price_files(shop_ids: Iterable[int], directory: str | Path) -> list[Path]:
+    """
+    Прайсы магазинов в формате /api/partner/update/ (shop, categories, goods) — shop-<id>.yaml.
+    Повторный импорт такого файла обновляет те же ProductInfo (по external_id).
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for shop in Shop.objects.filter(id__in=list(shop_ids)).order_by("id"):
+        categories: dict[int, str] = {}
+        goods = []
+        for row in ProductInfo.objects.filter(shop=shop).order_by("id").values(
+            "external_id", "product__category_id", "product__category__name",
+            "model", "name", "price", "price_rrc", "quantity", "params",
+        ).iterator(chunk_size=10_000):
+            categories[row["product__category_id"]] = row["product__category__name"]
+            goods.append({
+                "id": row["external_id"],
+                "category": row["product__category_id"],
+                "model": row["model"],
+                "name": row["name"],
+                "price": float(row["price"]),
+                "price_rrc": float(row["price_rrc"]) if row["price_rrc"] is not None else None,
+                "quantity": row["quantity"],
+                "parameters": row["params"],
+            })
+
+        data = {
+            "shop": shop.name,
+            "categories": [{"id": cid, "name": name} for cid, name in sorted(categories.items())],
+            "goods": goods,
+        }
+        path = directory / f"shop-{shop.id}.yaml"
+        with path.open("w", encoding="utf-8") as fh:
+            yaml.safe_dump(data, fh, allow_unicode=True, sort_keys=False)
+        paths.append(path)
+    return paths
@@ -0,0 +1,53 @@
+"""
+Фоновые задачи заказов. Очереди — CELERY_TASK_ROUTES в settings: письма уходят в
+notifications, пересчёты — в maintenance.
+"""
+from __future__ import annotations
+
+from smtplib import SMTPException
+
+from django.db.models import Prefetch
+
+from apps.orders.models import Order, OrderItem
+from config.celery import app
+
+ORDER_EMAIL_RECIPIENTS = ("customer", "admin")
+
+
+@app.task(
+    autoretry_for=(SMTPException, OSError),
+    retry_backoff=True,
+    retry_backoff_max=300,
+    max_retries=5,
+    priority=3,
+)
+def send_order_email(order_id: int, recipient: str) -> None:
+    """
+    Письмо об оформленном заказе клиенту (recipient="customer") или админу ("admin").
+    Каждому — отдельная задача: повтор после ошибки SMTP не дублирует уже отправленное письмо.
+    """
+    from apps.orders.services.emails import send_order_email_to_admin, send_order_email_to_customer
+
+    order = (
+        Order.objects.filter(id=order_id)
+        .prefetch_related(Prefetch("items", queryset=OrderItem.objects.select_related("product", "shop")))
+        .select_related("user")
+        .first()
+    )
+    if order is None:
+        return
+
+    if recipient == "customer":
+        send_order_email_to_customer(order)
+    else:
+        send_order_email_to_admin(order)
+
+
+@app.task
+def rebuild_sales_rollups(shop_id: int | None = None) -> int:
+    """
+    Пересборка дневных агрегатов продаж (как manage.py rebuild_sales_rollups).
+    """
+    from apps.orders.services import analytics
+
+    return analytics.rebuild_sales_rollups(shop_id=shop_id)
@@ -1,3 +1,505 @@
-from django.test import TestCase
+import sys
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.catalog.models import ProductInfo
+from apps.catalog.services.shops import set_shops_state
+from apps.common.testing import QueryBudgetTestCase, make_offers, make_order, make_shop, make_user
+from apps.orders.models import Order, OrderItem, ShopOrder
+from apps.orders.services.fulfilment import backfill_order_totals, set_order_status
+from apps.orders.tasks import send_order_email
+from apps.partners.tasks import import_price
+from apps.users.models import UserProfile
+from config.celery import _is_celery_command, app as celery_app, apply_worker_profile
+
+
+class OrdersQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.shop = make_shop(make_user(role=UserProfile.Role.SUPPLIER))
+        self.offers = []
+        self.basket = Order.objects.create(user=self.user, status=Order.Status.BASKET)
+
+    def seed_offers(self, scale):
+        self.offers += make_offers(self.shop, scale - len(self.offers))
+
+    def seed_basket(self, scale):
+        """
+        Корзина из scale позиций.
+        """
+        start = len(self.offers)
+        self.seed_offers(scale)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=self.basket, product=offer.product, shop=offer.shop, product_info=offer, quantity=1)
+            for offer in self.offers[start:]
+        )
+
+    def seed_orders(self, scale):
+        """
+        scale оформленных заказов, в каждом до 10 позиций.
+        """
+        self.seed_offers(10)
+        for _ in range(scale - Order.objects.filter(user=self.user).exclude(status=Order.Status.BASKET).count()):
+            make_order(self.user, self.offers[:10])
+
+    def test_basket(self):
+        for mode in ("full", "summary"):
+            with self.subTest(mode=mode):
+                self.assertBudgetAtScales(
+                    2, self.seed_basket, lambda: (self.api.get, ("/api/basket/",), {"data": {"response": mode}})
+                )
+
+    def test_add_item(self):
+        # full — плюс перечитывание корзины с позициями
+        for mode, budget in (("full", 8), ("summary", 7), ("delta", 7)):
+            with self.subTest(mode=mode):
+                self.assertBudgetAtScales(
+                    budget, self.seed_basket,
+                    lambda: (
+                        self.api.post,
+                        (f"/api/basket/items/?response={mode}",),
+                        {"data": {"product_info_id": self.offers[0].id, "quantity": 1}, "format": "json"},
+                    ),
+                )
+
+    def test_update_and_delete_item(self):
+        def patch():
+            item = self.basket.items.order_by("id").first()
+            return self.api.patch, (f"/api/basket/items/{item.id}/",), {"data": {"quantity": 3}, "format": "json"}
+
+        def delete():
+            item = self.basket.items.order_by("id").first()
+            return self.api.delete, (f"/api/basket/items/{item.id}/",), {}
+
+        self.assertBudgetAtScales(4, self.seed_basket, patch)
+        self.assertBudgetAtScales(4, self.seed_basket, delete)
+
+    def test_checkout(self):
+        for scale in self.SCALES:
+            with self.subTest(scale=scale):
+                # Корзина из setUp на первом шаге, после оформления — новая
+                self.basket, _ = Order.objects.get_or_create(user=self.user, status=Order.Status.BASKET)
+                self.offers = []
+                self.seed_basket(scale)
+                # Письма считает воркер, не запрос: задачи ставим в очередь, а выполняем после замера
+                with mock.patch.object(send_order_email, "delay") as delay:
+                    response = self.assertQueryBudget(14, self.api.post, "/api/basket/checkout/")
+                self.assertEqual(
+                    [c.args for c in delay.call_args_list],
+                    [(response.data["id"], "customer"), (response.data["id"], "admin")],
+                )
+                for c in delay.call_args_list:
+                    send_order_email.delay(*c.args)
+                self.assertEqual(len(mail.outbox), 2)
+                mail.outbox.clear()
+
+    def test_disabled_shop_in_basket(self):
+        other_shop = make_shop(make_user(role=UserProfile.Role.SUPPLIER))
+        self.seed_basket(2)
+        disabled_offer = make_offers(other_shop, 1)[0]
+        item = OrderItem.objects.create(
+            order=self.basket, product=disabled_offer.product, shop=other_shop, quantity=1
+        )
+        set_shops_state([other_shop.id], False)
+
+        summary = self.api.get("/api/basket/", {"response": "summary"}).data["summary"]
+        self.assertEqual((summary["lines"], summary["unavailable"]), (3, 1))
+        items = {i["id"]: i["shop_enabled"] for i in self.api.get("/api/basket/").data["items"]}
+        self.assertFalse(items.pop(item.id))
+        self.assertTrue(all(items.values()))
+
+        response = self.api.post("/api/basket/items/", {"product_info_id": disabled_offer.id, "quantity": 1}, format="json")
+        self.assertEqual(response.status_code, 409)
+
+        response = self.api.post("/api/basket/checkout/")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["unavailable_item_ids"], [item.id])
+        self.assertEqual(Order.objects.get(pk=self.basket.pk).status, Order.Status.BASKET)
+
+    def test_client_orders(self):
+        for query, budget in (
+            ({"limit": 200}, 2),
+            ({"limit": 200, "include_items": 0}, 1),
+            ({"status": "new", "limit": 200}, 2),
+        ):
+            with self.subTest(query=query):
+                self.assertBudgetAtScales(
+                    budget, self.seed_orders, lambda: (self.api.get, ("/api/orders/",), {"data": query})
+                )
+
+
+class ClientOrderHistoryTests(QueryBudgetTestCase):
+    """
+    GET /api/orders/: страницы по курсору, фильтры и итоги — каждая страница в тех же двух запросах.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.offers = make_offers(make_shop(), 3)
+        self.orders = [make_order(self.user, self.offers) for _ in range(5)]
+        # Один день назад — для фильтра по датам; совпадающий dt — для сортировки по id
+        day_ago = timezone.now() - timedelta(days=1)
+        Order.objects.filter(pk__in=[self.orders[0].pk, self.orders[1].pk]).update(dt=day_ago)
+        set_order_status(self.orders[4], Order.Status.CONFIRMED)
+        Order.objects.create(user=self.user, status=Order.Status.BASKET)
+        make_order(make_user(), self.offers)
+
+    def get(self, budget=2, expected_status=200, **query):
+        return self.assertQueryBudget(budget, self.api.get, "/api/orders/", query, expected_status=expected_status)
+
+    def test_pages_follow_cursor(self):
+        ids, cursor = [], None
+        while True:
+            data = self.get(limit=2, **({"cursor": cursor} if cursor else {})).data["data"]
+            self.assertLessEqual(len(data["orders"]), 2)
+            ids += [row["id"] for row in data["orders"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        # Новые сверху; у заказов с одинаковым dt — больший id первым
+        self.assertEqual(ids, [o.pk for o in reversed(self.orders)])
+
+    def test_rows(self):
+        row = self.get(limit=1).data["data"]["orders"][0]
+        self.assertEqual((row["id"], row["status"]), (self.orders[4].pk, Order.Status.CONFIRMED))
+        self.assertEqual(row["totals"], {"items": 3, "quantity": 6, "amount": "600.00"})
+        self.assertEqual({item["product_id"] for item in row["items"]}, {o.product_id for o in self.offers})
+
+        row = self.get(budget=1, limit=1, include_items=0).data["data"]["orders"][0]
+        self.assertNotIn("items", row)
+
+    def test_filters(self):
+        def ids(response):
+            return [row["id"] for row in response.data["data"]["orders"]]
+
+        self.assertEqual(ids(self.get(status="confirmed")), [self.orders[4].pk])
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertEqual(
+            ids(self.get(date_from=yesterday, date_to=yesterday)), [self.orders[1].pk, self.orders[0].pk]
+        )
+        self.assertEqual(len(ids(self.get(date_from=timezone.localdate().isoformat()))), 3)
+
+    def test_bad_params(self):
+        for query in ({"status": "basket"}, {"limit": 0}, {"cursor": "nope"}, {"date_from": "01.01.2026"}):
+            with self.subTest(query=query):
+                response = self.get(budget=1, expected_status=400, **query)
+                self.assertFalse(response.data["Status"])
+
+
+@override_settings(THROTTLE_BUCKETS={}, DATABASE_REPLICAS=[])
+class BasketResponseModeTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.shop = make_shop(make_user(role=UserProfile.Role.SUPPLIER))
+        self.offer, other = make_offers(self.shop, 2)
+        self.api.post("/api/basket/items/", {"product_info_id": other.id, "quantity": 1}, format="json")
+
+    def add(self, mode, quantity=2):
+        return self.api.post(
+            f"/api/basket/items/?response={mode}", {"product_info_id": self.offer.id, "quantity": quantity}, format="json"
+        )
+
+    def test_get(self):
+        self.add("full")
+        full = self.api.get("/api/basket/").data
+        self.assertEqual(len(full["items"]), 2)
+        self.assertEqual(self.api.get("/api/basket/", {"response": "full"}).data, full)
+
+        summary = self.api.get("/api/basket/", {"response": "summary"}).data
+        self.assertEqual(summary["id"], full["id"])
+        self.assertNotIn("items", summary)
+        self.assertEqual(
+            summary["summary"], {"lines": 2, "unavailable": 0, "quantity": 3, "total": "300.00"}
+        )
+        # delta — только для изменений
+        self.assertEqual(self.api.get("/api/basket/", {"response": "delta"}).status_code, 400)
+
+    def test_mutations(self):
+        full = self.add("full").data
+        self.assertEqual({item["quantity"] for item in full["items"]}, {1, 2})
+
+        summary = self.add("summary", quantity=1).data
+        self.assertEqual(summary["summary"]["quantity"], 4)
+        self.assertNotIn("item", summary)
+
+        delta = self.add("delta", quantity=1).data
+        self.assertEqual(delta["item"]["product_id"], self.offer.product_id)
+        self.assertEqual(delta["item"]["quantity"], 4)
+        self.assertEqual(delta["summary"]["total"], "500.00")
+
+        item_id = delta["item"]["id"]
+        delta = self.api.patch(f"/api/basket/items/{item_id}/?response=delta", {"quantity": 1}, format="json").data
+        self.assertEqual((delta["item"]["quantity"], delta["summary"]["quantity"]), (1, 2))
+
+        delta = self.api.delete(f"/api/basket/items/{item_id}/?response=delta").data
+        self.assertEqual((delta["item"], delta["deleted_item_id"]), (None, item_id))
+        self.assertEqual(delta["summary"]["lines"], 1)
+        self.assertEqual(self.add("bogus").status_code, 400)
+
+    def test_summary_priced_by_basket_offer(self):
+        # Второе предложение того же товара в том же магазине по другой цене: цена — у предложения позиции
+        cheap = ProductInfo.objects.create(
+            product=self.offer.product, shop=self.shop, external_id=10**6, name="x", quantity=5, price=Decimal("1.00")
+        )
+        ProductInfo.objects.filter(pk=self.offer.pk).update(price=Decimal("50.00"))
+        self.add("full", quantity=1)
+        summary = self.api.get("/api/basket/", {"response": "summary"}).data["summary"]
+        self.assertEqual(summary["total"], "150.00")
+
+        # Другое предложение того же (товар, магазин) не переоценивает уже добавленное количество
+        response = self.api.post("/api/basket/items/", {"product_info_id": cheap.id, "quantity": 1}, format="json")
+        self.assertEqual(response.status_code, 409)
+        item = OrderItem.objects.get(order__user=self.user, product=self.offer.product)
+        self.assertEqual((response.data["item_id"], item.product_info_id, item.quantity), (item.id, self.offer.id, 1))
+        summary = self.api.get("/api/basket/", {"response": "summary"}).data["summary"]
+        self.assertEqual((summary["lines"], summary["total"]), (2, "150.00"))
+
+        with mock.patch.object(send_order_email, "delay"):
+            order_id = self.api.post("/api/basket/checkout/").data["id"]
+        line = OrderItem.objects.get(order_id=order_id, product=self.offer.product)
+        self.assertEqual(line.unit_price, Decimal("50.00"))
+        self.assertEqual(ProductInfo.objects.get(pk=cheap.pk).quantity, 5)
+
+
+class FulfilmentTests(TestCase):
+    """
+    Заказ делится на ShopOrder по магазинам: их читает лента поставщика, итоги — история клиента.
+    """
+
+    def setUp(self):
+        self.customer = make_user()
+        self.suppliers = [make_user(role=UserProfile.Role.SUPPLIER) for _ in range(2)]
+        self.shops = [make_shop(supplier) for supplier in self.suppliers]
+        self.offers = [make_offers(shop, 2) for shop in self.shops]
+        self.api = APIClient()
+
+    def feed(self, supplier):
+        self.api.force_authenticate(supplier)
+        response = self.api.get("/api/partner/orders/")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["data"]["orders"]
+
+    def history(self):
+        self.api.force_authenticate(self.customer)
+        response = self.api.get("/api/orders/")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["data"]["orders"]
+
+    def assertSplit(self, order):
+        order.refresh_from_db()
+        self.assertEqual((order.items_count, order.quantity_total, order.amount_total), (4, 8, Decimal("800.00")))
+        shop_orders = ShopOrder.objects.filter(order=order).order_by("shop_id")
+        self.assertEqual(
+            [(so.shop_id, so.item_count, so.quantity_total, so.subtotal, so.status) for so in shop_orders],
+            [(shop.id, 2, 4, Decimal("400.00"), order.status) for shop in self.shops],
+        )
+        for supplier, offers in zip(self.suppliers, self.offers):
+            [row] = self.feed(supplier)
+            self.assertEqual(row["id"], order.id)
+            self.assertEqual(row["totals"], {"items": 2, "quantity": 4, "amount": "400.00"})
+            self.assertEqual({item["product_id"] for item in row["items"]}, {offer.product_id for offer in offers})
+        [row] = self.history()
+        self.assertEqual(row["totals"]["amount"], "800.00")
+
+    def test_checkout_splits_by_shop(self):
+        basket = Order.objects.create(user=self.customer, status=Order.Status.BASKET)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=basket, product=offer.product, shop=offer.shop, product_info=offer, quantity=2)
+            for offers in self.offers
+            for offer in offers
+        )
+        self.api.force_authenticate(self.customer)
+        with mock.patch.object(send_order_email, "delay"):
+            response = self.api.post("/api/basket/checkout/")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertSplit(Order.objects.get(pk=basket.pk))
+
+    def test_status_change_reaches_shop_orders(self):
+        order = make_order(self.customer, self.offers[0] + self.offers[1])
+        set_order_status(order, Order.Status.CONFIRMED)
+        self.assertEqual(set(ShopOrder.objects.filter(order=order).values_list("status", flat=True)), {"confirmed"})
+        self.assertEqual(self.feed(self.suppliers[0])[0]["status"], "confirmed")
+
+    def test_backfill_order_totals(self):
+        # Заказ, оформленный до появления итогов: amount_total NULL, ShopOrder нет
+        order = make_order(self.customer, self.offers[0] + self.offers[1], status=Order.Status.BASKET)
+        Order.objects.filter(pk=order.pk).update(status=Order.Status.NEW)
+        basket = Order.objects.create(user=self.customer, status=Order.Status.BASKET)
+        self.assertEqual(self.feed(self.suppliers[0]), [])
+
+        self.assertEqual(backfill_order_totals(batch_size=1), 1)
+        self.assertSplit(order)
+        basket.refresh_from_db()
+        self.assertIsNone(basket.amount_total)
+        self.assertEqual(backfill_order_totals(), 0)
+
+
+class OrdersAdminQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.client.force_login(make_user(is_staff=True, is_superuser=True))
+        self.user = make_user()
+        self.offers = make_offers(make_shop(make_user(role=UserProfile.Role.SUPPLIER)), 10)
+
+    def seed_orders(self, scale):
+        for _ in range(scale // 10 - Order.objects.count()):
+            make_order(self.user, self.offers)
+
+    def test_changelists(self):
+        # сессия, пользователь, reltuples, COUNT, страница (+ варианты list_filter по магазинам)
+        for model, budget in (("order", 5), ("orderitem", 6), ("shoporder", 6)):
+            for query in ({}, {"q": self.user.username}):
+                with self.subTest(model=model, query=query):
+                    self.assertBudgetAtScales(
+                        budget, self.seed_orders, lambda: (self.client.get, (f"/admin/orders/{model}/",), {"data": query})
+                    )
+
+    def test_order_items_paginated(self):
+        offers = self.offers + make_offers(self.offers[0].shop, 60)
+        # Правка позиций доступна только в корзине
+        order = make_order(self.user, offers, status=Order.Status.BASKET)
+        url = f"/admin/orders/order/{order.id}/change/"
+
+        response = self.assertQueryBudget(8, self.client.get, url)
+        formset = response.context["inline_admin_formsets"][0].formset
+        self.assertEqual((formset.page.paginator.count, len(formset.forms)), (70, 50))
+        self.assertContains(response, '<a href="?items-page=2">2</a>', html=True)
+
+        response = self.client.get(url, {"items-page": 2})
+        forms = response.context["inline_admin_formsets"][0].formset.forms
+        self.assertEqual(len(forms), 20)
+
+        # Сохраняется показанная страница
+        items = [form.instance for form in forms]
+        data = {
+            "user": self.user.id, "status": order.status,
+            "items-TOTAL_FORMS": 20, "items-INITIAL_FORMS": 20, "items-MIN_NUM_FORMS": 0, "items-MAX_NUM_FORMS": 1000,
+        }
+        for i, item in enumerate(items):
+            data.update({f"items-{i}-id": item.id, f"items-{i}-order": order.id, f"items-{i}-quantity": 5})
+        response = self.client.post(f"{url}?items-page=2", data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(OrderItem.objects.filter(order=order, quantity=5).count(), 20)
+
+
+class OrdersAdminTests(TestCase):
+    """
+    Оформленный заказ в админке: позиции только для чтения, статус — только между оформленными.
+    """
+
+    def setUp(self):
+        self.client.force_login(make_user(is_staff=True, is_superuser=True))
+        self.user = make_user()
+        self.offers = make_offers(make_shop(), 2)
+        self.order = make_order(self.user, self.offers)
+        self.item = self.order.items.first()
+
+    def change_order(self, order, status, quantity=None):
+        data = {
+            "user": order.user_id, "status": status,
+            "items-TOTAL_FORMS": 0, "items-INITIAL_FORMS": 0, "items-MIN_NUM_FORMS": 0, "items-MAX_NUM_FORMS": 1000,
+        }
+        if quantity is not None:
+            items = list(order.items.all())
+            data.update({"items-TOTAL_FORMS": len(items), "items-INITIAL_FORMS": len(items)})
+            for i, item in enumerate(items):
+                data.update({f"items-{i}-id": item.id, f"items-{i}-order": order.id, f"items-{i}-quantity": quantity})
+        return self.client.post(f"/admin/orders/order/{order.id}/change/", data)
+
+    def test_placed_items_read_only(self):
+        self.change_order(self.order, self.order.status, quantity=9)
+        self.assertFalse(OrderItem.objects.filter(order=self.order, quantity=9).exists())
+
+        url = f"/admin/orders/orderitem/{self.item.id}/"
+        response = self.client.post(f"{url}change/", {
+            "order": self.order.id, "product": self.item.product_id, "shop": self.item.shop_id, "quantity": 9,
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.post(f"{url}delete/", {"post": "yes"}).status_code, 403)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 2)
+
+        # Новая позиция в оформленный заказ тоже не добавляется
+        response = self.client.post("/admin/orders/orderitem/add/", {
+            "order": self.order.id, "product": self.offers[0].product_id, "shop": self.offers[0].shop_id, "quantity": 1,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.order.items.count(), 2)
+
+    def test_status_between_placed_only(self):
+        response = self.change_order(self.order, Order.Status.CONFIRMED)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(ShopOrder.objects.filter(order=self.order).values_list("status", flat=True)), [Order.Status.CONFIRMED]
+        )
+
+        basket = make_order(self.user, self.offers, status=Order.Status.BASKET)
+        for order, status in ((self.order, Order.Status.BASKET), (basket, Order.Status.NEW)):
+            with self.subTest(order=order.status, status=status):
+                response = self.change_order(order, status)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context["adminform"].form.errors["status"])
+        self.assertEqual(Order.objects.get(pk=basket.pk).status, Order.Status.BASKET)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.Status.CONFIRMED)
+
+
+class CeleryRoutingTests(SimpleTestCase):
+    def test_routes(self):
+        for name, queue in (
+            ("apps.partners.tasks.import_price", "imports"),
+            ("apps.partners.tasks.refresh_shop_price", "imports"),
+            ("apps.partners.tasks.enqueue_due_imports", "maintenance"),
+            ("apps.orders.tasks.send_order_email", "notifications"),
+            ("apps.users.tasks.send_password_reset_email", "notifications"),
+            ("apps.orders.tasks.rebuild_sales_rollups", "maintenance"),
+        ):
+            with self.subTest(task=name):
+                self.assertEqual(celery_app.amqp.router.route({}, name, (), {})["queue"].name, queue)
+
+    def test_import_task_options(self):
+        self.assertTrue(import_price.acks_late)
+        self.assertTrue(import_price.reject_on_worker_lost)
+        self.assertFalse(import_price.ignore_result)
+        # Иначе Redis вернёт ещё выполняющийся импорт в очередь и он запустится второй раз
+        self.assertGreater(
+            settings.CELERY_BROKER_TRANSPORT_OPTIONS["visibility_timeout"], import_price.time_limit
+        )
+
+    def test_worker_profile(self):
+        instance = mock.Mock()
+        conf = {}
+        with mock.patch.dict("os.environ", {"CELERY_WORKER_PROFILE": "imports"}):
+            apply_worker_profile(instance=instance, conf=conf)
+        instance.app.amqp.queues.select.assert_called_once_with(["imports"])
+        self.assertEqual(conf["worker_prefetch_multiplier"], 1)
+        self.assertEqual(conf["worker_concurrency"], settings.WORKER_PROFILES["imports"]["concurrency"])
+
+        with mock.patch.dict("os.environ", {"CELERY_WORKER_PROFILE": "nope"}), self.assertRaises(ValueError):
+            apply_worker_profile(instance=instance, conf={})
+
+    def test_app_loaded_with_django(self):
+        import config
+
+        self.assertIs(config.celery_app, celery_app)
+        # Web-процесс тоже импортирует config.celery — роль БД воркера только у процессов celery
+        self.assertEqual(settings.DB_PROCESS_ROLE, "web")
+        for argv, expected in (
+            (["/venv/bin/celery", "-A", "config", "worker"], True),
+            (["/venv/lib/python3.11/site-packages/celery/__main__.py", "beat"], True),
+            (["manage.py", "runserver"], False),
+            (["/venv/bin/gunicorn", "config.wsgi"], False),
+        ):
+            with self.subTest(argv=argv), mock.patch.object(sys, "argv", argv):
+                self.assertIs(_is_celery_command(), expected)
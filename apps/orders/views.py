@@ -1,23 +1,62 @@
 # Create your views here.
-from apps.users.permissions import IsClient
+from decimal import Decimal
+import logging
 
-from apps.orders.services.emails import send_order_email_to_admin, send_order_email_to_customer
+from apps.users.permissions import IsClient
+from apps.users.throttling import BasketWriteThrottle
+from apps.orders.services.fulfilment import finalize_order
+from apps.orders.services.listing import (
+    MAX_PAGE_SIZE,
+    day_range,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    parse_limit,
+)
 
 from django.db import transaction
-from django.db.models import Prefetch
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Prefetch, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.catalog.cache import schedule_bump
 from apps.catalog.models import ProductInfo
 from apps.orders.models import Order, OrderItem
 
 from .serializers import (
     BasketSerializer,
     BasketItemAddSerializer,
+    BasketItemSerializer,
     BasketItemUpdateSerializer,
+    BasketSummarySerializer,
+)
+
+logger = logging.getLogger(__name__)
+
+BASKET_RESPONSE_MODES = ("full", "summary", "delta")
+
+BASKET_RESPONSE_PARAMETER = OpenApiParameter(
+    name="response",
+    required=False,
+    type=str,
+    enum=list(BASKET_RESPONSE_MODES),
+    description="full (default) -> whole basket, summary -> totals only, delta -> changed item + totals",
+)
+
+# GET корзины ничего не меняет — delta ему не положен
+BASKET_GET_RESPONSE_MODES = ("full", "summary")
+
+BASKET_GET_RESPONSE_PARAMETER = OpenApiParameter(
+    name="response",
+    required=False,
+    type=str,
+    enum=list(BASKET_GET_RESPONSE_MODES),
+    description="full (default) -> whole basket, summary -> totals only",
 )
 
 
@@ -38,31 +77,128 @@ def _basket_queryset(user):
     )
 
 
+def _basket_item_queryset(user):
+    """
+    Позиция корзины пользователя одним запросом (без отдельного get_or_create корзины).
+    """
+    return OrderItem.objects.select_related("product", "shop").filter(
+        order__user=user,
+        order__status=Order.Status.BASKET,
+    )
+
+
+def _basket_summary(basket_id: int) -> dict:
+    """
+    Агрегаты корзины одним запросом: число позиций, сумма количеств, стоимость
+    и сколько позиций из выключенных магазинов (checkout их не пропустит).
+    Пока заказ не оформлен, unit_price пустой — берём текущую цену предложения позиции.
+    """
+    line_total = ExpressionWrapper(
+        F("quantity") * Coalesce("unit_price", "product_info__price", Value(Decimal("0.00"))),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+    totals = (
+        OrderItem.objects.filter(order_id=basket_id)
+        .annotate(line_total=line_total)
+        .aggregate(
+            lines=Count("id"),
+            quantity=Sum("quantity"),
+            total=Sum("line_total"),
+            unavailable=Count("id", filter=Q(shop__state=False)),
+        )
+    )
+    return {
+        "lines": totals["lines"],
+        "unavailable": totals["unavailable"],
+        "quantity": totals["quantity"] or 0,
+        "total": totals["total"] or Decimal("0.00"),
+    }
+
+
+def _basket_response_mode(request, allowed=BASKET_RESPONSE_MODES):
+    mode = request.query_params.get("response") or "full"
+    return mode if mode in allowed else None
+
+
+def _bad_response_mode(allowed=BASKET_RESPONSE_MODES) -> Response:
+    return Response(
+        {"detail": f"response must be one of: {', '.join(allowed)}"},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
+
+def _basket_mutation_response(user, mode: str, basket_id: int, *, item=None, deleted_item_id=None) -> Response:
+    """
+    full    -> перечитываем корзину целиком (как раньше)
+    summary -> только агрегаты
+    delta   -> изменённая позиция + агрегаты
+    """
+    if mode == "full":
+        basket = _basket_queryset(user).get()
+        return Response(BasketSerializer(basket).data, status=status.HTTP_200_OK)
+
+    data = {
+        "id": basket_id,
+        "status": Order.Status.BASKET,
+        "summary": BasketSummarySerializer(_basket_summary(basket_id)).data,
+    }
+    if mode == "delta":
+        data["item"] = BasketItemSerializer(item).data if item is not None else None
+        if deleted_item_id is not None:
+            data["deleted_item_id"] = deleted_item_id
+    return Response(data, status=status.HTTP_200_OK)
+
+
 class BasketAPIView(APIView):
     """
-    GET /api/basket/
+    GET /api/basket/?response=full|summary
     """
     permission_classes = [IsAuthenticated, IsClient]
+    throttle_classes = [BasketWriteThrottle]
 
-    @extend_schema(responses={200: OpenApiResponse(response=BasketSerializer)})
+    @extend_schema(
+        parameters=[BASKET_GET_RESPONSE_PARAMETER],
+        responses={200: OpenApiResponse(response=BasketSerializer)},
+    )
     def get(self, request, *args, **kwargs):
-        _get_or_create_basket(request.user)
-        basket = _basket_queryset(request.user).get()
+        mode = _basket_response_mode(request, BASKET_GET_RESPONSE_MODES)
+        if mode is None:
+            return _bad_response_mode(BASKET_GET_RESPONSE_MODES)
+
+        if mode == "summary":
+            basket = _get_or_create_basket(request.user)
+            return _basket_mutation_response(request.user, mode, basket.id)
+
+        # Один проход: читаем корзину с items, создаём только если её ещё нет
+        basket = _basket_queryset(request.user).first()
+        if basket is None:
+            basket = _get_or_create_basket(request.user)
         return Response(BasketSerializer(basket).data, status=status.HTTP_200_OK)
 
 
 class BasketItemsAPIView(APIView):
     """
-    POST /api/basket/items/
+    POST /api/basket/items/?response=full|summary|delta
     body: {"product_info_id": 123, "quantity": 2}
     """
     permission_classes = [IsAuthenticated, IsClient]
+    throttle_classes = [BasketWriteThrottle]
 
     @extend_schema(
         request=BasketItemAddSerializer,
-        responses={200: OpenApiResponse(response=BasketSerializer), 400: OpenApiResponse(description="Validation error")},
+        parameters=[BASKET_RESPONSE_PARAMETER],
+        responses={
+            200: OpenApiResponse(response=BasketSerializer),
+            400: OpenApiResponse(description="Validation error"),
+            409: OpenApiResponse(description="Product from this shop is already in the basket at another offer"),
+        },
     )
     def post(self, request, *args, **kwargs):
+        mode = _basket_response_mode(request)
+        if mode is None:
+            return _bad_response_mode()
+
         serializer = BasketItemAddSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
@@ -77,7 +213,7 @@ class BasketItemsAPIView(APIView):
         if not product_info:
             return Response({"detail": "ProductInfo not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if not product_info.shop.state:
+        if not product_info.shop_enabled:
             return Response({"detail": "Shop is disabled"}, status=status.HTTP_409_CONFLICT)
 
         if product_info.quantity <= 0:
@@ -91,63 +227,86 @@ class BasketItemsAPIView(APIView):
                 product=product_info.product,
                 shop=product_info.shop,
                 defaults={
+                    "product_info": product_info,
                     "quantity": qty,
                 },
             )
             if not created:
+                # Позиция — одна на (товар, магазин) и оценивается по своему предложению:
+                # другое предложение переоценило бы уже добавленное количество
+                if item.product_info_id not in (None, product_info.id):
+                    return Response(
+                        {
+                            "detail": "Basket already has this product from this shop at another offer",
+                            "item_id": item.id,
+                        },
+                        status=status.HTTP_409_CONFLICT,
+                    )
                 item.quantity += qty
-                item.save(update_fields=["quantity"])
+                item.product_info = product_info
+                item.save(update_fields=["quantity", "product_info"])
 
-        basket = _basket_queryset(request.user).get()
-        return Response(BasketSerializer(basket).data, status=status.HTTP_200_OK)
+        # product/shop уже загружены — сериализация позиции без лишних запросов
+        item.product = product_info.product
+        item.shop = product_info.shop
+        return _basket_mutation_response(request.user, mode, basket.id, item=item)
 
 
 class BasketItemDetailAPIView(APIView):
     """
-    PATCH /api/basket/items/{item_id}/
-    DELETE /api/basket/items/{item_id}/
+    PATCH /api/basket/items/{item_id}/?response=full|summary|delta
+    DELETE /api/basket/items/{item_id}/?response=full|summary|delta
     """
     permission_classes = [IsAuthenticated, IsClient]
+    throttle_classes = [BasketWriteThrottle]
 
     @extend_schema(
         request=BasketItemUpdateSerializer,
+        parameters=[BASKET_RESPONSE_PARAMETER],
         responses={200: OpenApiResponse(response=BasketSerializer)},
     )
     def patch(self, request, item_id: int, *args, **kwargs):
+        mode = _basket_response_mode(request)
+        if mode is None:
+            return _bad_response_mode()
+
         serializer = BasketItemUpdateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         qty = serializer.validated_data["quantity"]
 
-        basket = _get_or_create_basket(request.user)
-
-        item = OrderItem.objects.filter(order=basket, id=item_id).first()
+        item = _basket_item_queryset(request.user).filter(id=item_id).first()
         if not item:
             return Response({"detail": "Item not found in basket"}, status=status.HTTP_404_NOT_FOUND)
 
         item.quantity = qty
         item.save(update_fields=["quantity"])
 
-        basket = _basket_queryset(request.user).get()
-        return Response(BasketSerializer(basket).data, status=status.HTTP_200_OK)
+        return _basket_mutation_response(request.user, mode, item.order_id, item=item)
 
-    @extend_schema(responses={200: OpenApiResponse(response=BasketSerializer)})
+    @extend_schema(
+        parameters=[BASKET_RESPONSE_PARAMETER],
+        responses={200: OpenApiResponse(response=BasketSerializer)},
+    )
     def delete(self, request, item_id: int, *args, **kwargs):
-        basket = _get_or_create_basket(request.user)
+        mode = _basket_response_mode(request)
+        if mode is None:
+            return _bad_response_mode()
 
-        item = OrderItem.objects.filter(order=basket, id=item_id).first()
+        item = _basket_item_queryset(request.user).filter(id=item_id).first()
         if not item:
             return Response({"detail": "Item not found in basket"}, status=status.HTTP_404_NOT_FOUND)
 
+        basket_id = item.order_id
         item.delete()
 
-        basket = _basket_queryset(request.user).get()
-        return Response(BasketSerializer(basket).data, status=status.HTTP_200_OK)
+        return _basket_mutation_response(request.user, mode, basket_id, deleted_item_id=item_id)
 
 class BasketCheckoutAPIView(APIView):
     """
     POST /api/basket/checkout/
     """
     permission_classes = [IsAuthenticated, IsClient]
+    throttle_classes = [BasketWriteThrottle]
 
     @extend_schema(
         responses={
@@ -180,60 +339,76 @@ class BasketCheckoutAPIView(APIView):
             if not items:
                 return Response({"detail": "Basket is empty"}, status=status.HTTP_409_CONFLICT)
 
-            # Считываем и блокируем все ProductInfo, которые нужны
+            # Считываем и блокируем все ProductInfo, которые нужны. Магазины не джойним и не блокируем:
+            # их состояние — в shop_enabled, а выключение магазина обновляет эти же (уже заблокированные) строки
             product_ids = [i.product_id for i in items]
             shop_ids = [i.shop_id for i in items]
 
-            infos = (
+            infos = list(
                 ProductInfo.objects.select_for_update()
-                .select_related("shop", "product")
                 .filter(product_id__in=product_ids, shop_id__in=shop_ids)
+                .order_by("id")
             )
-
-            info_map = {(pi.product_id, pi.shop_id): pi for pi in infos}
+            infos_by_id = {pi.id: pi for pi in infos}
+            infos_by_position: dict[tuple[int, int], ProductInfo] = {}
+            for pi in infos:
+                infos_by_position.setdefault((pi.product_id, pi.shop_id), pi)
+
+            # Предложение позиции; у старых позиций без product_info — первое предложение (product, shop)
+            info_map = {
+                item.id: infos_by_id.get(item.product_info_id) or infos_by_position.get((item.product_id, item.shop_id))
+                for item in items
+            }
 
             # Валидация перед списанием
             for item in items:
-                pi = info_map.get((item.product_id, item.shop_id))
+                pi = info_map[item.id]
                 if not pi:
                     return Response(
                         {"detail": f"ProductInfo not found for product={item.product_id} shop={item.shop_id}"},
                         status=status.HTTP_409_CONFLICT,
                     )
 
-                if not pi.shop.state:
-                    return Response(
-                        {"detail": f"Shop '{pi.shop.name}' is disabled"},
-                        status=status.HTTP_409_CONFLICT,
-                    )
+            # Позиции выключенных магазинов — все сразу, чтобы клиент убрал их за один заход
+            disabled = [item for item in items if not info_map[item.id].shop_enabled]
+            if disabled:
+                shop_names = ", ".join(f"'{name}'" for name in sorted({item.shop.name for item in disabled}))
+                return Response(
+                    {"detail": f"Shop is disabled: {shop_names}", "unavailable_item_ids": [item.id for item in disabled]},
+                    status=status.HTTP_409_CONFLICT,
+                )
 
+            for item in items:
+                pi = info_map[item.id]
                 if pi.quantity < item.quantity:
                     return Response(
                         {"detail": f"Not enough stock for '{pi.name}' (have {pi.quantity}, need {item.quantity})"},
                         status=status.HTTP_409_CONFLICT,
                     )
 
-            # Списание и фиксация цен
+            # Списание и фиксация цен — по одному UPDATE на таблицу, а не на каждую позицию
+            now = timezone.now()
+            touched_infos = []
             for item in items:
-                pi = info_map[(item.product_id, item.shop_id)]
+                pi = info_map[item.id]
 
                 item.unit_price = pi.price
                 item.unit_price_rrc = pi.price_rrc
-                item.save(update_fields=["unit_price", "unit_price_rrc"])
+                item.updated_at = now
 
                 pi.quantity -= item.quantity
-                pi.save(update_fields=["quantity"])
+                pi.updated_at = now
+                touched_infos.append(pi)
+
+            OrderItem.objects.bulk_update(items, ["unit_price", "unit_price_rrc", "updated_at"])
+            ProductInfo.objects.bulk_update(touched_infos, ["quantity", "updated_at"])
+            # Остатки изменились: bulk_update не шлёт сигналы — сбрасываем кэш каталога явно
+            schedule_bump()
 
             basket.status = Order.Status.NEW
-            basket.save(update_fields=["status"])
+            finalize_order(basket, items)
 
-        # Возвращаем уже оформленный заказ
-        basket = (
-            Order.objects.filter(id=basket.id)
-            .prefetch_related(Prefetch("items", queryset=OrderItem.objects.select_related("product", "shop")))
-            .first()
-        )
-        # Перечитаем заказ уже в статусе NEW вместе с items для письма
+        # Перечитаем заказ уже в статусе NEW вместе с items — для ответа
         order = (
             Order.objects.filter(id=basket.id)
             .prefetch_related(Prefetch("items", queryset=OrderItem.objects.select_related("product", "shop")))
@@ -241,37 +416,94 @@ class BasketCheckoutAPIView(APIView):
             .first()
         )
 
-        # Email notifications (sync, base part)
-        try:
-            send_order_email_to_customer(order)
-            send_order_email_to_admin(order)
-        except Exception as e:
-            # На базовой части можно не падать из-за email.
-            # Для продакшена — логирование + celery. To be Continued in next commits:)
-            pass
-        return Response(BasketSerializer(basket).data, status=status.HTTP_200_OK)
-
+        # Письма — в очередь notifications (заказ уже закоммичен); celery грузим только при оформлении
+        from apps.orders.tasks import ORDER_EMAIL_RECIPIENTS, send_order_email
+
+        for recipient in ORDER_EMAIL_RECIPIENTS:
+            try:
+                send_order_email.delay(order.id, recipient)
+            except Exception:
+                # Заказ оформлен — из-за недоступного брокера ответ не роняем
+                logger.exception("Failed to enqueue %s email for order %s", recipient, order.id)
+        return Response(BasketSerializer(order).data, status=status.HTTP_200_OK)
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name="status", required=False, type=str, description="Order status (new/confirmed/...)"),
+        OpenApiParameter(name="date_from", required=False, type=str, description="YYYY-MM-DD, inclusive"),
+        OpenApiParameter(name="date_to", required=False, type=str, description="YYYY-MM-DD, inclusive"),
+        OpenApiParameter(name="limit", required=False, type=int, description=f"Page size (max {MAX_PAGE_SIZE})"),
+        OpenApiParameter(name="cursor", required=False, type=str, description="next_cursor from previous page"),
+        OpenApiParameter(name="include_items", required=False, type=int, description="0 -> orders with totals only"),
+    ],
+)
 class ClientOrdersAPIView(APIView):
     """
     GET /api/orders/
-    Returns orders of current user (excluding basket).
+    Returns orders of current user (excluding basket), newest first, keyset-paginated by (dt, id).
     """
     permission_classes = [IsAuthenticated, IsClient]
 
     @extend_schema(responses={200: OpenApiResponse(description="List of orders")})
     def get(self, request, *args, **kwargs):
-        qs = (
-            Order.objects.filter(user=request.user)
-            .exclude(status=Order.Status.BASKET)
-            .prefetch_related(Prefetch("items", queryset=OrderItem.objects.select_related("product", "shop")))
-            .order_by("-dt")
-        )
-        data = [
-            {
+        params = request.query_params
+
+        try:
+            limit = parse_limit(params.get("limit"))
+            cursor = decode_cursor(params["cursor"]) if params.get("cursor") else None
+            dt_from, dt_to = day_range(params.get("date_from"), params.get("date_to"))
+        except ValueError as e:
+            return Response({"Status": False, "data": None, "errors": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        include_items = params.get("include_items", "1") != "0"
+
+        qs = Order.objects.filter(user=request.user)
+
+        # Фильтр по статусу попадает в индекс (user, status)
+        status_param = params.get("status")
+        if status_param:
+            if status_param not in Order.Status.values or status_param == Order.Status.BASKET:
+                return Response(
+                    {"Status": False, "data": None, "errors": "Unknown order status"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            qs = qs.filter(status=status_param)
+        else:
+            qs = qs.exclude(status=Order.Status.BASKET)
+
+        if dt_from:
+            qs = qs.filter(dt__gte=dt_from)
+        if dt_to:
+            qs = qs.filter(dt__lt=dt_to)
+        if cursor:
+            qs = qs.filter(keyset_filter(cursor))
+
+        # Итоги зафиксированы в самом заказе при оформлении — агрегировать позиции не нужно
+        qs = qs.order_by("-dt", "-id")
+
+        if include_items:
+            qs = qs.prefetch_related(
+                Prefetch("items", queryset=OrderItem.objects.select_related("product", "shop"))
+            )
+
+        orders = list(qs[: limit + 1])
+        has_next = len(orders) > limit
+        orders = orders[:limit]
+
+        data = []
+        for o in orders:
+            row = {
                 "id": o.id,
                 "status": o.status,
                 "dt": o.dt,
-                "items": [
+                "totals": {
+                    "items": o.items_count,
+                    "quantity": o.quantity_total,
+                    "amount": str(o.amount_total) if o.amount_total is not None else None,
+                },
+            }
+            if include_items:
+                row["items"] = [
                     {
                         "id": i.id,
                         "product_id": i.product_id,
@@ -283,8 +515,11 @@ class ClientOrdersAPIView(APIView):
                         "unit_price_rrc": i.unit_price_rrc,
                     }
                     for i in o.items.all()
-                ],
-            }
-            for o in qs
-        ]
-        return Response({"Status": True, "data": {"orders": data}, "errors": None}, status=status.HTTP_200_OK)
\ No newline at end of file
+                ]
+            data.append(row)
+
+        next_cursor = encode_cursor(orders[-1].dt, orders[-1].id) if has_next else None
+        return Response(
+            {"Status": True, "data": {"orders": data, "next_cursor": next_cursor}, "errors": None},
+            status=status.HTTP_200_OK,
+        )
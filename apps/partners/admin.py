@@ -1,3 +1,13 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ShopImportSchedule
+
+
+@admin.register(ShopImportSchedule)
+class ShopImportScheduleAdmin(admin.ModelAdmin):
+    list_display = ("id", "shop", "enabled", "interval", "next_run_at", "last_run_at", "last_changed_at", "failures")
+    list_filter = ("enabled",)
+    list_select_related = ("shop",)
+    search_fields = ("shop__name", "url")
+    autocomplete_fields = ("shop",)
+    readonly_fields = ("etag", "last_modified", "content_hash", "last_error", "created_at", "updated_at")
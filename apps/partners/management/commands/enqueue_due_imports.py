@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.partners.models import ShopImportSchedule
+from apps.partners.services.schedule import enqueue_due
+
+
+class Command(BaseCommand):
+    help = (
+        "Enqueue scheduled price re-imports that are due (the same as the celery beat entry "
+        "enqueue-due-price-imports) - for cron when beat is not running. Without a broker the "
+        "imports run right here."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Default: settings.PRICE_REFRESH_BATCH")
+        parser.add_argument("--dry-run", action="store_true", help="Only list due shops")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            due = ShopImportSchedule.objects.filter(enabled=True, next_run_at__lte=timezone.now()).order_by("next_run_at")
+            for schedule in due[: options["limit"]]:
+                self.stdout.write(f"shop {schedule.shop_id}: {schedule.url} (every {schedule.interval}s)")
+            return
+
+        ids = enqueue_due(options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Enqueued {len(ids)} price refreshes"))
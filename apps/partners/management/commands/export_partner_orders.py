@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalog.models import Shop
+from apps.orders.services.listing import day_range
+from apps.partners.services.export import EXPORT_FORMATS, iter_export, order_lines_queryset, xlsx_available
+
+
+class Command(BaseCommand):
+    help = "Stream order lines of a shop to CSV/XLSX (optionally gzip) with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shop", type=int, required=True, help="Shop id")
+        parser.add_argument("--format", dest="file_format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--status", default=None)
+        parser.add_argument("--date-from", default=None, help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--date-to", default=None, help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--output", "-o", default="-", help="File path ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        if not Shop.objects.filter(id=options["shop"]).exists():
+            raise CommandError(f"Shop id={options['shop']} not found")
+        if options["file_format"] == "xlsx" and not xlsx_available():
+            raise CommandError("XLSX export requires openpyxl")
+
+        try:
+            dt_from, dt_to = day_range(options["date_from"], options["date_to"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        qs = order_lines_queryset(options["shop"], status=options["status"], dt_from=dt_from, dt_to=dt_to)
+        chunks = iter_export(qs, file_format=options["file_format"], gzip=options["gzip"])
+
+        if options["output"] == "-":
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            return
+
+        written = 0
+        with open(options["output"], "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}"))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.11 on 2026-10-19 00:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('catalog', '0003_remove_productinfo_uniq_product_shop_info_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopImportSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('enabled', models.BooleanField(default=True)),
+                ('interval', models.PositiveIntegerField(help_text='Текущий интервал проверки, сек')),
+                ('next_run_at', models.DateTimeField()),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_changed_at', models.DateTimeField(blank=True, null=True)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('failures', models.PositiveIntegerField(default=0, help_text='Ошибок подряд')),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('shop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='import_schedule', to='catalog.shop')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('enabled', True)), fields=['next_run_at'], name='import_schedule_due')],
+            },
+        ),
+    ]
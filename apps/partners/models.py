@@ -1,3 +1,41 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from apps.catalog.models import Shop
+
+
+class ShopImportSchedule(models.Model):
+    """
+    Расписание автоматического переимпорта прайса магазина (apps.partners.services.schedule).
+    Создаётся при первом успешном импорте. Интервал адаптивный: прайс не меняется — проверяем
+    всё реже (до PRICE_REFRESH_MAX_INTERVAL), меняется — всё чаще (до PRICE_REFRESH_MIN_INTERVAL).
+    """
+    shop = models.OneToOneField(Shop, on_delete=models.CASCADE, related_name="import_schedule")
+    # Последний импортированный url (Shop.url хранит только первый)
+    url = models.URLField(max_length=500)
+    enabled = models.BooleanField(default=True)
+
+    interval = models.PositiveIntegerField(help_text="Текущий интервал проверки, сек")
+    next_run_at = models.DateTimeField()
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_changed_at = models.DateTimeField(null=True, blank=True)
+
+    # Чем сверяем, изменился ли прайс: условный GET и sha256 содержимого
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+
+    failures = models.PositiveIntegerField(default=0, help_text="Ошибок подряд")
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Выборка «кого пора обновить»
+            models.Index(fields=["next_run_at"], condition=models.Q(enabled=True), name="import_schedule_due"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.shop_id}: every {self.interval}s, next {self.next_run_at:%Y-%m-%d %H:%M}"
@@ -1,3 +1,7 @@
+import re
+from decimal import Decimal
+
+from django.conf import settings
 from rest_framework import serializers
 
 
@@ -9,6 +13,13 @@ class PartnerStateSerializer(serializers.Serializer):
     state = serializers.BooleanField(required=True)
 
 
+class ShopsStateSerializer(serializers.Serializer):
+    shop_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=10_000
+    )
+    state = serializers.BooleanField(required=True)
+
+
 class PartnerShopCreateSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=255, required=True)
     url = serializers.URLField(required=False, allow_blank=True)
@@ -24,6 +35,86 @@ class PartnerShopPatchSerializer(serializers.Serializer):
         return attrs
 
 
+class OfferDeltaItemSerializer(serializers.Serializer):
+    external_id = serializers.IntegerField(min_value=0, max_value=2_147_483_647)
+    quantity = serializers.IntegerField(required=False, min_value=0, max_value=2_147_483_647)
+    price = serializers.DecimalField(max_digits=12, decimal_places=2, required=False, min_value=0)
+    price_rrc = serializers.DecimalField(
+        max_digits=12, decimal_places=2, required=False, allow_null=True, min_value=0
+    )
+
+    def validate(self, attrs):
+        if len(attrs) == 1:
+            raise serializers.ValidationError("Provide at least one field: quantity, price or price_rrc")
+        return attrs
+
+
+_MAX_INT = 2_147_483_647
+# Цена, которую можно взять без DecimalField: до 10 цифр целой части и 2 — дробной
+_PLAIN_PRICE = re.compile(r"\d{1,10}(?:\.\d{1,2})?")
+_CENT = Decimal("0.01")
+
+
+class OfferDeltaListField(serializers.ListField):
+    """
+    Список OfferDeltaItemSerializer, но типичный элемент (целые id/остаток, цена строкой
+    "1190.00" или целым) разбирается без полного прохода сериализатора — это в разы быстрее
+    на тысячах позиций. Всё остальное, включая ошибки, — через сам сериализатор, с его сообщениями.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(child=OfferDeltaItemSerializer(), **kwargs)
+
+    def run_child_validation(self, data):
+        # Слишком длинный список отклоняем до разбора элементов (валидатор max_length сработал бы после)
+        if self.max_length is not None and len(data) > self.max_length:
+            self.fail("max_length", max_length=self.max_length)
+        result = []
+        errors = {}
+        for index, item in enumerate(data):
+            value = _plain_offer_delta(item)
+            if value is None:
+                try:
+                    value = self.child.run_validation(item)
+                except serializers.ValidationError as e:
+                    errors[index] = e.detail
+                    continue
+            result.append(value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return result
+
+
+def _plain_offer_delta(item) -> dict | None:
+    if type(item) is not dict:
+        return None
+    external_id = item.get("external_id")
+    if type(external_id) is not int or not 0 <= external_id <= _MAX_INT:
+        return None
+    value = {"external_id": external_id}
+    if "quantity" in item:
+        quantity = item["quantity"]
+        if type(quantity) is not int or not 0 <= quantity <= _MAX_INT:
+            return None
+        value["quantity"] = quantity
+    for name in ("price", "price_rrc"):
+        if name not in item:
+            continue
+        price = item[name]
+        if price is None and name == "price_rrc":
+            value[name] = None
+        elif (type(price) is str and _PLAIN_PRICE.fullmatch(price)) or (type(price) is int and 0 <= price < 10**10):
+            value[name] = Decimal(price).quantize(_CENT)
+        else:
+            return None
+    return value if len(value) > 1 else None
+
+
+class OfferDeltaSerializer(serializers.Serializer):
+    # Длина проверяется до разбора элементов
+    offers = OfferDeltaListField(allow_empty=False, max_length=settings.PARTNER_OFFER_DELTA_MAX_ITEMS)
+
+
 class UnifiedResponseSerializer(serializers.Serializer):
     Status = serializers.BooleanField()
     data = serializers.DictField(required=False, allow_null=True)
@@ -42,13 +133,22 @@ class PartnerOrderItemOutSerializer(serializers.Serializer):
     total = serializers.DecimalField(max_digits=14, decimal_places=2, required=False, allow_null=True)
 
 
+class PartnerOrderTotalsOutSerializer(serializers.Serializer):
+    items = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
 class PartnerOrderOutSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     dt = serializers.DateTimeField()
     status = serializers.CharField()
     customer = serializers.DictField()
-    items = PartnerOrderItemOutSerializer(many=True)
+    totals = PartnerOrderTotalsOutSerializer()
+    items = PartnerOrderItemOutSerializer(many=True, required=False)
 
 
 class PartnerOrdersDataOutSerializer(serializers.Serializer):
-    orders = PartnerOrderOutSerializer(many=True)
\ No newline at end of file
+    orders = PartnerOrderOutSerializer(many=True)
+    next_cursor = serializers.CharField(allow_null=True)
+    next_since = serializers.CharField(allow_null=True)
\ No newline at end of file
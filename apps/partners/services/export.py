@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import csv
+import tempfile
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+from django.db.models import DecimalField, ExpressionWrapper, F
+
+from apps.orders.models import Order, OrderItem
+
+EXPORT_FORMATS = ("csv", "xlsx")
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+EXPORT_COLUMNS = (
+    "order_id",
+    "order_dt",
+    "order_status",
+    "customer_id",
+    "customer_username",
+    "customer_email",
+    "item_id",
+    "product_id",
+    "product_name",
+    "quantity",
+    "unit_price",
+    "unit_price_rrc",
+    "total",
+)
+
+# Начало текста, которое Excel/LibreOffice читают как формулу (CSV injection):
+# такие ячейки отдаём с ведущим апострофом — и в CSV, и в XLSX
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Строк на один отдаваемый кусок CSV и на один fetch из серверного курсора
+ROWS_PER_CHUNK = 500
+CURSOR_CHUNK_SIZE = 2000
+
+
+def order_lines_queryset(shop_id: int, *, status: str | None = None,
+                         dt_from: datetime | None = None, dt_to: datetime | None = None):
+    """
+    Позиции заказов магазина плоскими кортежами в порядке EXPORT_COLUMNS.
+    """
+    qs = OrderItem.objects.filter(shop_id=shop_id).exclude(order__status=Order.Status.BASKET)
+    if status:
+        qs = qs.filter(order__status=status)
+    if dt_from:
+        qs = qs.filter(order__dt__gte=dt_from)
+    if dt_to:
+        qs = qs.filter(order__dt__lt=dt_to)
+
+    line_total = ExpressionWrapper(
+        F("quantity") * F("unit_price"),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    return (
+        qs.annotate(total=line_total)
+        .order_by("order__dt", "order_id", "id")
+        .values_list(
+            "order_id",
+            "order__dt",
+            "order__status",
+            "order__user_id",
+            "order__user__username",
+            "order__user__email",
+            "id",
+            "product_id",
+            "product__name",
+            "quantity",
+            "unit_price",
+            "unit_price_rrc",
+            "total",
+        )
+    )
+
+
+def iter_rows(queryset) -> Iterator[tuple]:
+    """
+    Строки через серверный курсор (iterator) — в памяти только текущая пачка.
+    """
+    for row in queryset.iterator(chunk_size=CURSOR_CHUNK_SIZE):
+        yield tuple(_cell(value) for value in row)
+
+
+def _cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class _Echo:
+    """
+    Псевдо-буфер для csv.writer: write() просто возвращает строку.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterator[bytes]:
+    writer = csv.writer(_Echo())
+    # Заголовок уходит сразу, ещё до выполнения запроса
+    yield writer.writerow(EXPORT_COLUMNS).encode("utf-8")
+
+    buf: list[str] = []
+    for row in rows:
+        buf.append(writer.writerow(row))
+        if len(buf) >= ROWS_PER_CHUNK:
+            yield "".join(buf).encode("utf-8")
+            buf = []
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def iter_xlsx(rows: Iterable[tuple], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    XLSX в write-only режиме openpyxl: строки пишутся по одной, файл собирается
+    во временном файле (на диске, не в памяти) и отдаётся кусками.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("orders")
+    sheet.append(EXPORT_COLUMNS)
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def xlsx_available() -> bool:
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if first:
+            # Первый кусок (заголовок) выталкиваем сразу, чтобы загрузка началась без ожидания запроса
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(queryset, file_format: str = "csv", gzip: bool = False) -> Iterator[bytes]:
+    rows = iter_rows(queryset)
+    chunks = iter_xlsx(rows) if file_format == "xlsx" else iter_csv(rows)
+    return iter_gzip(chunks) if gzip else chunks
+
+
+def export_filename(shop_id: int, file_format: str, gzip: bool) -> str:
+    name = f"orders-shop{shop_id}-{datetime.now():%Y%m%d-%H%M%S}.{file_format}"
+    return f"{name}.gz" if gzip else name
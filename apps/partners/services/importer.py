@@ -1,44 +1,111 @@
 from __future__ import annotations
 
-from decimal import Decimal
-from typing import Any
+from typing import Any, Iterable
 
 import requests
 import yaml
-from django.db import transaction
-
-from apps.catalog.models import Category, Parameter, Product, ProductInfo, ProductParameter, Shop
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.catalog.cache import deferred_bump, schedule_bump
+from apps.catalog.models import Product, ProductInfo, ProductParameter, Shop
+from apps.catalog.services import lookups
+
+from .validation import PriceValidationError, validate_price
+
+# libyaml, если PyYAML собран с ней, — в разы быстрее чистого Python на больших прайсах
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Первый ключ pg_advisory_xact_lock(int, int): пространство блокировок импорта, второй — id магазина
+IMPORT_LOCK_NAMESPACE = 7301
+
+# Анти-join с массивом id из прайса вместо NOT IN (...) на тысячи параметров; только quantity > 0 —
+# уже обнулённые строки не переписываются (индекс productinfo_shop_quantity)
+ZERO_MISSING_SQL = """
+UPDATE {table} pi SET quantity = 0, updated_at = %(now)s
+WHERE pi.shop_id = %(shop_id)s
+  AND pi.quantity > 0
+  AND NOT EXISTS (
+      SELECT 1 FROM unnest(%(external_ids)s::bigint[]) AS seen (external_id)
+      WHERE seen.external_id = pi.external_id
+  )
+"""
+
+
+def fetch_price(url: str, headers: dict[str, str] | None = None) -> requests.Response:
+    resp = requests.get(url, timeout=20, headers=headers)
+    resp.raise_for_status()
+    return resp
+
+
+def try_lock_shop_import(shop_id: int) -> bool:
+    """
+    Блокировка импорта магазина до конца текущей транзакции: два импорта одного магазина
+    (ручной и по расписанию, два воркера) не идут одновременно. Не ждёт — False, если занято.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", [IMPORT_LOCK_NAMESPACE, shop_id])
+        return cursor.fetchone()[0]
+
+
+def zero_missing_offers(shop_id: int, external_ids: Iterable[int]) -> int:
+    """
+    Обнулить остаток предложений магазина, которых нет в external_ids (позиция пропала из прайса);
+    записи не удаляются. Возвращает число обнулённых.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            ZERO_MISSING_SQL.format(table=connection.ops.quote_name(ProductInfo._meta.db_table)),
+            {"shop_id": shop_id, "external_ids": list(external_ids), "now": timezone.now()},
+        )
+        zeroed = cursor.rowcount
+    if zeroed:
+        # Сырой UPDATE не шлёт сигналы — кэш каталога сбрасываем явно
+        schedule_bump()
+    return zeroed
 
 
 def import_price_from_url(*, user, url: str) -> dict[str, Any]:
     try:
-        resp = requests.get(url, timeout=20)
-        resp.raise_for_status()
+        resp = fetch_price(url)
     except Exception as e:
         return {"Status": False, "Error": f"Failed to fetch url: {e}", "http_status": 400}
 
-    try:
-        data = yaml.safe_load(resp.content)
-    except Exception as e:
-        return {"Status": False, "Error": f"Invalid YAML: {e}", "http_status": 400}
+    result = import_price_content(user=user, url=url, content=resp.content)
+    if result["Status"]:
+        # Магазин попадает в расписание автообновления (или обновляет в нём url и хэш)
+        from .schedule import record_manual_import
 
-    if not isinstance(data, dict) or "shop" not in data or "categories" not in data or "goods" not in data:
-        return {"Status": False, "Error": "YAML must contain keys: shop, categories, goods", "http_status": 400}
+        record_manual_import(result["shop_id"], url, resp)
+    return result
 
-    shop_name = data["shop"]
-    categories = data["categories"] or []
-    goods = data["goods"] or []
 
-    # В YAML категория у товара задаётся ID -> делаем маппинг id -> name
-    cat_id_to_name: dict[int, str] = {}
-    for c in categories:
-        try:
-            cat_id_to_name[int(c["id"])] = str(c["name"])
-        except Exception:
-            continue
+def import_price_content(*, user, url: str, content: bytes) -> dict[str, Any]:
+    """
+    Импорт уже скачанного прайса. При успехе — {"Status": True, "shop_id": ..., "stats": ...}.
+    Прайс сначала целиком проверяется (validate_price) — до транзакции и запросов к БД;
+    при ошибках — "Errors" со строками прайса.
+    """
+    try:
+        data = yaml.load(content, Loader=YAML_LOADER)
+    except Exception as e:
+        return {"Status": False, "Error": f"Invalid YAML: {e}", "http_status": 400}
 
-    with transaction.atomic():
-        shop, _ = Shop.objects.get_or_create(name=shop_name)
+    try:
+        price_list = validate_price(data, max_errors=settings.PRICE_IMPORT_MAX_ERRORS)
+    except PriceValidationError as e:
+        return {"Status": False, "Error": str(e), "Errors": e.errors, "http_status": 400}
+    # Дальше нужны только записи прайса — исходный документ отпускаем
+    del data
+
+    # Один сброс кэша каталога на импорт, а не на каждую сохранённую строку
+    with transaction.atomic(), deferred_bump():
+        # Строка магазина заблокирована до конца импорта: set_shops_state ждёт его,
+        # и новые предложения (shop_enabled из shop.state) не разойдутся с Shop.state
+        shop, _ = Shop.objects.select_for_update().get_or_create(name=price_list.shop)
+        if not try_lock_shop_import(shop.id):
+            return {"Status": False, "Error": "Import for this shop is already running", "http_status": 409}
         # Запрет импорта, если Shop выключен(state=False)
         if not shop.state:
             return {"Status": False, "Error": "Shop is disabled (state=false)", "http_status": 403}
@@ -50,74 +117,66 @@ def import_price_from_url(*, user, url: str) -> dict[str, Any]:
         elif shop.user_id != user.id:
             return {"Status": False, "Error": "This shop belongs to another supplier", "http_status": 403}
 
-        # Категории + связь с магазином
-        for _, cat_name in cat_id_to_name.items():
-            category_obj, _ = Category.objects.get_or_create(name=cat_name)
-            category_obj.shops.add(shop)
+        # Категории и параметры: id по имени — из кэша процесса, новые создаются одной пачкой
+        lookup_stats: dict[str, dict[str, int]] = {"category": {}, "parameter": {}}
+        category_ids = lookups.category_ids.resolve(price_list.categories.values(), lookup_stats["category"])
+        shop.categories.add(*category_ids.values())
+
+        parameter_ids: dict[str, int] = {}
+        if settings.CATALOG_PARAMS_EAV:
+            parameter_names = (name for record in price_list.goods for name in record.params)
+            parameter_ids = lookups.parameter_ids.resolve(parameter_names, lookup_stats["parameter"])
 
         imported_external_ids: set[int] = set()
 
         # Товары
-        for item in goods:
-            try:
-                external_id = int(item["id"])
-                cat_id = int(item["category"])
-                name = str(item["name"])
-                model = str(item.get("model", ""))
-
-                price = Decimal(str(item["price"]))
-                price_rrc = item.get("price_rrc")
-                price_rrc = Decimal(str(price_rrc)) if price_rrc is not None else None
-
-                quantity = int(item.get("quantity", 0))
-                params = item.get("parameters") or {}
-            except Exception as e:
-                return {"Status": False, "Error": f"Bad goods item: {e}", "http_status": 400}
-
-            category_name = cat_id_to_name.get(cat_id)
-            if not category_name:
-                return {"Status": False, "Error": f"Category id={cat_id} not found in YAML categories", "http_status": 400}
-
-            category_obj, _ = Category.objects.get_or_create(name=category_name)
-
-            product, _ = Product.objects.get_or_create(category=category_obj, name=name)
+        for record in price_list.goods:
+            product, _ = Product.objects.get_or_create(
+                category_id=category_ids[record.category], name=record.name
+            )
 
             product_info, created = ProductInfo.objects.get_or_create(
                 shop=shop,
-                external_id=external_id,
+                external_id=record.external_id,
                 defaults={
                     "product": product,
-                    "name": name,
-                    "model": model,
-                    "quantity": quantity,
-                    "price": price,
-                    "price_rrc": price_rrc,
+                    "name": record.name,
+                    "model": record.model,
+                    "quantity": record.quantity,
+                    "price": record.price,
+                    "price_rrc": record.price_rrc,
+                    "params": record.params,
+                    "shop_enabled": shop.state,
                 },
             )
             if not created:
                 # Обновление прайса
                 product_info.product = product
-                product_info.name = name
-                product_info.model = model
-                product_info.quantity = quantity
-                product_info.price = price
-                product_info.price_rrc = price_rrc
+                product_info.name = record.name
+                product_info.model = record.model
+                product_info.quantity = record.quantity
+                product_info.price = record.price
+                product_info.price_rrc = record.price_rrc
+                product_info.params = record.params
                 product_info.save()
 
-            imported_external_ids.add(external_id)
-
-            # Параметры товара
-            if isinstance(params, dict):
-                for p_name, p_value in params.items():
-                    parameter_obj, _ = Parameter.objects.get_or_create(name=str(p_name))
+            imported_external_ids.add(record.external_id)
 
+            # Параметры товара строками ProductParameter — каталог их уже не читает (ProductInfo.params)
+            if settings.CATALOG_PARAMS_EAV:
+                for p_name, p_value in record.params.items():
                     ProductParameter.objects.update_or_create(
                         product_info=product_info,
-                        parameter=parameter_obj,
-                        defaults={"value": str(p_value)},
+                        parameter_id=parameter_ids[p_name],
+                        defaults={"value": p_value},
                     )
 
         # Если позиция исчезла из прайса — обнуляем остаток, но НЕ удаляем запись
-        ProductInfo.objects.filter(shop=shop).exclude(external_id__in=imported_external_ids).update(quantity=0)
-
-    return {"Status": True}
\ No newline at end of file
+        zeroed = zero_missing_offers(shop.id, imported_external_ids)
+        # Категории магазина (m2m) сигналов не шлют — кэш каталога сбрасываем явно
+        schedule_bump()
+
+    stats = {"goods": len(imported_external_ids), "zeroed": zeroed}
+    for table, counts in lookup_stats.items():
+        stats[table] = {**counts, "hit_rate": lookups.hit_rate(counts)}
+    return {"Status": True, "shop_id": shop.id, "stats": stats}
\ No newline at end of file
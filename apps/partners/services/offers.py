@@ -0,0 +1,95 @@
+"""
+Точечное обновление остатков и цен предложений магазина (POST /api/partner/offers/delta/):
+без перезаливки всего прайса — категории, товары и параметры не трогаются.
+
+Все изменения применяются одним UPDATE ... FROM unnest(...) по (shop_id, external_id) —
+это уникальный индекс uniq_shop_external_id. Строки, где значения не поменялись, не
+переписываются (нет лишних версий строк и WAL); неизвестные external_id возвращаются тем же запросом.
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.catalog.cache import schedule_bump
+from apps.catalog.models import ProductInfo
+
+from .importer import try_lock_shop_import
+
+DELTA_SQL = """
+WITH delta AS (
+    SELECT *
+    FROM unnest(%(external_ids)s::bigint[], %(quantities)s::bigint[], %(prices)s::numeric[],
+                %(prices_rrc)s::numeric[], %(set_prices_rrc)s::boolean[])
+        AS d (external_id, quantity, price, price_rrc, set_price_rrc)
+),
+matched AS (
+    SELECT pi.id, delta.*
+    FROM delta
+    JOIN {table} pi ON pi.shop_id = %(shop_id)s AND pi.external_id = delta.external_id
+),
+updated AS (
+    UPDATE {table} pi SET
+        quantity = COALESCE(m.quantity, pi.quantity),
+        price = COALESCE(m.price, pi.price),
+        price_rrc = CASE WHEN m.set_price_rrc THEN m.price_rrc ELSE pi.price_rrc END,
+        updated_at = %(now)s
+    FROM matched m
+    WHERE pi.id = m.id
+      AND (pi.quantity IS DISTINCT FROM COALESCE(m.quantity, pi.quantity)
+           OR pi.price IS DISTINCT FROM COALESCE(m.price, pi.price)
+           OR (m.set_price_rrc AND pi.price_rrc IS DISTINCT FROM m.price_rrc))
+    RETURNING pi.id
+)
+SELECT
+    (SELECT count(*) FROM matched),
+    (SELECT count(*) FROM updated),
+    ARRAY(
+        SELECT external_id FROM delta
+        WHERE NOT EXISTS (SELECT 1 FROM matched WHERE matched.external_id = delta.external_id)
+        ORDER BY external_id
+    )
+"""
+
+
+def apply_offer_deltas(shop_id: int, deltas: Iterable[dict]) -> dict[str, Any]:
+    """
+    deltas — [{"external_id", "quantity"?, "price"?, "price_rrc"?}]; отсутствующее поле не меняется,
+    price_rrc=None — сбросить РРЦ. Повтор external_id в одном запросе — действует последний.
+    """
+    rows: dict[int, dict] = {}
+    received = 0
+    for delta in deltas:
+        rows[delta["external_id"]] = delta
+        received += 1
+
+    params = {
+        "shop_id": shop_id,
+        "now": timezone.now(),
+        "external_ids": list(rows),
+        "quantities": [row.get("quantity") for row in rows.values()],
+        "prices": [row.get("price") for row in rows.values()],
+        "prices_rrc": [row.get("price_rrc") for row in rows.values()],
+        "set_prices_rrc": ["price_rrc" in row for row in rows.values()],
+    }
+
+    with transaction.atomic():
+        # Не смешиваем с идущим импортом этого магазина: он может перезаписать эти же строки
+        if not try_lock_shop_import(shop_id):
+            return {"Status": False, "Error": "Import for this shop is already running", "http_status": 409}
+        with connection.cursor() as cursor:
+            cursor.execute(DELTA_SQL.format(table=connection.ops.quote_name(ProductInfo._meta.db_table)), params)
+            matched, updated, unknown = cursor.fetchone()
+        if updated:
+            # Сырой UPDATE не шлёт сигналы — кэш каталога сбрасываем явно
+            schedule_bump()
+
+    return {
+        "Status": True,
+        "received": received,
+        "matched": matched,
+        "updated": updated,
+        "unknown": unknown,
+    }
@@ -0,0 +1,178 @@
+"""
+Автообновление прайсов по расписанию (ShopImportSchedule).
+
+Планировщик (задача enqueue_due_imports по celery beat или manage.py enqueue_due_imports)
+забирает магазины, которым пора обновиться, и ставит refresh_shop_price в очередь imports.
+Задача скачивает прайс условным GET; если он не изменился (304 или тот же sha256),
+импорт не запускается, а интервал проверки растёт. Изменился — импортируем, интервал
+уменьшается. Следующий запуск сдвигается на случайные ±PRICE_REFRESH_JITTER от интервала,
+чтобы магазины, добавленные одновременно, не ходили за прайсами одной пачкой.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.partners.models import ShopImportSchedule
+
+
+def jittered(seconds: float, rnd: random.Random | None = None) -> timedelta:
+    jitter = settings.PRICE_REFRESH_JITTER
+    return timedelta(seconds=seconds * (rnd or random).uniform(1 - jitter, 1 + jitter))
+
+
+def next_interval(interval: int, changed: bool) -> int:
+    """
+    Прайс изменился — проверяем вдвое чаще, нет — вдвое реже (в пределах MIN..MAX).
+    """
+    interval = interval // 2 if changed else interval * 2
+    return max(settings.PRICE_REFRESH_MIN_INTERVAL, min(settings.PRICE_REFRESH_MAX_INTERVAL, interval))
+
+
+def failure_delay(failures: int) -> int:
+    # Ошибка (сеть, 5xx, битый YAML) — экспоненциальная пауза от минимального интервала
+    return min(settings.PRICE_REFRESH_MAX_INTERVAL, settings.PRICE_REFRESH_MIN_INTERVAL * 2 ** min(failures, 16))
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _validators(resp) -> dict[str, str]:
+    return {
+        "etag": resp.headers.get("ETag", "")[:255],
+        "last_modified": resp.headers.get("Last-Modified", "")[:64],
+    }
+
+
+def record_manual_import(shop_id: int, url: str, resp) -> None:
+    """
+    После ручного импорта (POST /api/partner/update/): магазин встаёт в расписание
+    с минимальным интервалом, сравнивать дальше будем с только что загруженным прайсом.
+    """
+    now = timezone.now()
+    interval = settings.PRICE_REFRESH_MIN_INTERVAL
+    ShopImportSchedule.objects.update_or_create(
+        shop_id=shop_id,
+        defaults={
+            "url": url,
+            "interval": interval,
+            "next_run_at": now + jittered(interval),
+            "last_run_at": now,
+            "last_changed_at": now,
+            "content_hash": content_hash(resp.content),
+            "failures": 0,
+            "last_error": "",
+            **_validators(resp),
+        },
+    )
+
+
+def claim_due(limit: int | None = None, now=None) -> list[int]:
+    """
+    id расписаний, которым пора обновиться. Они сразу сдвигаются на время жизни задачи импорта:
+    пока задача в очереди или выполняется, повторно их не заберут; если воркер её потерял —
+    заберут снова после этой паузы. Параллельные планировщики не мешают друг другу (SKIP LOCKED).
+    """
+    now = now or timezone.now()
+    limit = limit or settings.PRICE_REFRESH_BATCH
+    lease = timedelta(seconds=settings.IMPORT_TASK_TIME_LIMIT * 2)
+    with transaction.atomic():
+        ids = list(
+            ShopImportSchedule.objects.select_for_update(skip_locked=True)
+            .filter(enabled=True, next_run_at__lte=now)
+            .order_by("next_run_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        if ids:
+            ShopImportSchedule.objects.filter(id__in=ids).update(next_run_at=now + lease)
+    return ids
+
+
+def enqueue_due(limit: int | None = None) -> list[int]:
+    from apps.partners.tasks import refresh_shop_price
+
+    ids = claim_due(limit)
+    for schedule_id in ids:
+        refresh_shop_price.delay(schedule_id)
+    return ids
+
+
+def refresh(schedule_id: int) -> dict[str, Any]:
+    """
+    Одна проверка прайса магазина: скачать (условно), сравнить, при изменении — импортировать.
+    """
+    from apps.partners.services.importer import fetch_price, import_price_content
+
+    schedule = ShopImportSchedule.objects.select_related("shop__user").filter(pk=schedule_id).first()
+    if schedule is None or not schedule.enabled:
+        return {"Status": False, "Error": "Schedule not found or disabled"}
+    shop = schedule.shop
+    if shop.user is None or not shop.state:
+        # Нет владельца или магазин выключен — импорт всё равно будет отклонён
+        return _failed(schedule, "Shop has no supplier or is disabled")
+
+    headers = {}
+    if schedule.etag:
+        headers["If-None-Match"] = schedule.etag
+    if schedule.last_modified:
+        headers["If-Modified-Since"] = schedule.last_modified
+    try:
+        resp = fetch_price(schedule.url, headers=headers)
+    except Exception as e:
+        return _failed(schedule, f"Failed to fetch url: {e}")
+
+    if resp.status_code == 304 or content_hash(resp.content) == schedule.content_hash:
+        return _finished(schedule, changed=False, resp=resp)
+
+    result = import_price_content(user=shop.user, url=schedule.url, content=resp.content)
+    if result["Status"]:
+        return _finished(schedule, changed=True, resp=resp)
+    if result.get("http_status") == 409:
+        # Магазин сейчас импортируется (вручную) — проверим снова через минимальный интервал
+        _save(schedule, next_run_at=timezone.now() + jittered(settings.PRICE_REFRESH_MIN_INTERVAL))
+        return {**result, "changed": False}
+    return _failed(schedule, result.get("Error") or "Import failed")
+
+
+def _finished(schedule: ShopImportSchedule, *, changed: bool, resp) -> dict[str, Any]:
+    now = timezone.now()
+    interval = next_interval(schedule.interval, changed)
+    fields = {
+        "interval": interval,
+        "next_run_at": now + jittered(interval),
+        "last_run_at": now,
+        "failures": 0,
+        "last_error": "",
+    }
+    if resp.status_code != 304:
+        fields.update(content_hash=content_hash(resp.content), **_validators(resp))
+    if changed:
+        fields["last_changed_at"] = now
+    _save(schedule, **fields)
+    return {"Status": True, "changed": changed, "interval": interval}
+
+
+def _failed(schedule: ShopImportSchedule, error: str) -> dict[str, Any]:
+    now = timezone.now()
+    failures = schedule.failures + 1
+    _save(
+        schedule,
+        failures=failures,
+        last_error=error[:2000],
+        last_run_at=now,
+        next_run_at=now + jittered(failure_delay(failures)),
+    )
+    return {"Status": False, "Error": error, "changed": False}
+
+
+def _save(schedule: ShopImportSchedule, **fields) -> None:
+    for name, value in fields.items():
+        setattr(schedule, name, value)
+    schedule.save(update_fields=[*fields, "updated_at"])
@@ -0,0 +1,217 @@
+"""
+Проверка прайса поставщика целиком — до транзакции импорта, блокировки магазина и первого запроса к БД.
+
+Один проход по документу: все ошибки (до PRICE_IMPORT_MAX_ERRORS, с номерами строк) собираются
+сразу, а не по первой на импорт, и битая строка в конце прайса не откатывает уже записанное.
+Заодно значения приводятся к типам модели (int, Decimal, str) — импорт пишет готовые
+GoodsRecord и сам ничего не разбирает.
+
+Ограничения — те же, что у полей ProductInfo / Category / Parameter: превышение длины или
+диапазона иначе всплыло бы ошибкой БД посреди импорта.
+"""
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+from typing import Any, NamedTuple
+
+MAX_INT = 2_147_483_647
+MAX_PRICE = Decimal("9999999999.99")
+_CENT = Decimal("0.01")
+_TEXT_TYPES = (str, int, float, Decimal)
+
+
+class GoodsRecord(NamedTuple):
+    external_id: int
+    category: str
+    name: str
+    model: str
+    price: Decimal
+    price_rrc: Decimal | None
+    quantity: int
+    params: dict[str, str]
+
+
+class PriceList(NamedTuple):
+    shop: str
+    categories: dict[int, str]
+    goods: list[GoodsRecord]
+
+
+class PriceValidationError(Exception):
+    """
+    errors — [{"section", "row", "field", "message"}], не больше лимита; total — сколько ошибок всего.
+    """
+
+    def __init__(self, errors: list[dict[str, Any]], total: int):
+        self.errors = errors
+        self.total = total
+        shown = f", first {len(errors)} shown" if total > len(errors) else ""
+        super().__init__(f"Price list has {total} error(s){shown}")
+
+
+def _integer(value) -> int:
+    if type(value) is str and value.strip().isdecimal():
+        value = int(value)
+    elif type(value) is float and value.is_integer():
+        value = int(value)
+    elif type(value) is not int:
+        raise ValueError("must be an integer")
+    if not 0 <= value <= MAX_INT:
+        raise ValueError(f"must be between 0 and {MAX_INT}")
+    return value
+
+
+def _text(value, max_length: int, *, blank: bool = False) -> str:
+    # YAML отдаёт числа числами: name: 1234 — допустимое название
+    if value is None or type(value) is bool or not isinstance(value, _TEXT_TYPES):
+        raise ValueError("must be a string")
+    value = value if type(value) is str else str(value)
+    if not blank and not value.strip():
+        raise ValueError("must not be blank")
+    if len(value) > max_length:
+        raise ValueError(f"must be at most {max_length} characters")
+    return value
+
+
+def _price(value) -> Decimal:
+    if type(value) is bool or not isinstance(value, _TEXT_TYPES):
+        raise ValueError("must be a number")
+    try:
+        value = Decimal(value if type(value) is str else str(value))
+        if not value.is_finite():
+            raise InvalidOperation
+        value = value.quantize(_CENT)
+    except InvalidOperation:
+        raise ValueError("must be a number") from None
+    if not Decimal(0) <= value <= MAX_PRICE:
+        raise ValueError(f"must be between 0 and {MAX_PRICE}")
+    return value
+
+
+def _params(value) -> dict[str, str]:
+    if value is None:
+        return {}
+    if type(value) is not dict:
+        raise ValueError("must be a mapping of name to value")
+    params = {}
+    for name, param_value in value.items():
+        try:
+            params[_text(name, 255)] = _text(param_value, 255, blank=True)
+        except ValueError as e:
+            raise ValueError(f"{name!r}: {e}") from None
+    return params
+
+
+_MISSING = object()
+
+
+def _required(parse):
+    def check(value):
+        if value is _MISSING:
+            raise ValueError("is required")
+        return parse(value)
+    return check
+
+
+# (поле, значение по умолчанию, разбор); _MISSING — поле обязательно
+_GOODS_FIELDS = (
+    ("id", _MISSING, _required(_integer)),
+    ("category", _MISSING, _required(_integer)),
+    ("name", _MISSING, _required(lambda v: _text(v, 255))),
+    ("model", "", lambda v: _text(v, 80, blank=True)),
+    ("price", _MISSING, _required(_price)),
+    ("price_rrc", None, lambda v: None if v is None else _price(v)),
+    ("quantity", 0, _integer),
+    ("parameters", None, _params),
+)
+_CATEGORY_FIELDS = (
+    ("id", _MISSING, _required(_integer)),
+    ("name", _MISSING, _required(lambda v: _text(v, 255))),
+)
+
+
+class _Errors:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.items: list[dict[str, Any]] = []
+        self.total = 0
+
+    def add(self, section: str, row: int | None, field: str | None, message: str) -> None:
+        self.total += 1
+        if len(self.items) < self.limit:
+            self.items.append({"section": section, "row": row, "field": field, "message": message})
+
+    def parse_row(self, section: str, row: int, item, fields) -> dict[str, Any] | None:
+        """
+        Все поля строки: значения или None, если в строке есть ошибки (все они записаны).
+        """
+        if type(item) is not dict:
+            self.add(section, row, None, "must be a mapping")
+            return None
+        values = {}
+        valid = True
+        for field, default, parse in fields:
+            try:
+                values[field] = parse(item.get(field, default))
+            except ValueError as e:
+                self.add(section, row, field, str(e))
+                valid = False
+        return values if valid else None
+
+    def raise_if_any(self) -> None:
+        if self.total:
+            raise PriceValidationError(self.items, self.total)
+
+
+def validate_price(data, max_errors: int = 50) -> PriceList:
+    """
+    Разобранный YAML прайса -> PriceList. Ошибки — PriceValidationError со всеми найденными.
+    """
+    errors = _Errors(max_errors)
+    if not isinstance(data, dict) or "shop" not in data or "categories" not in data or "goods" not in data:
+        errors.add("price", None, None, "YAML must contain keys: shop, categories, goods")
+        errors.raise_if_any()
+
+    try:
+        shop = _text(data["shop"], 255)
+    except ValueError as e:
+        errors.add("price", None, "shop", str(e))
+    categories_raw = data["categories"] or []
+    goods_raw = data["goods"] or []
+    for section, value in (("categories", categories_raw), ("goods", goods_raw)):
+        if type(value) is not list:
+            errors.add("price", None, section, "must be a list")
+    errors.raise_if_any()
+
+    # В YAML категория у товара задаётся ID -> маппинг id -> name
+    categories: dict[int, str] = {}
+    for row, item in enumerate(categories_raw):
+        values = errors.parse_row("categories", row, item, _CATEGORY_FIELDS)
+        if values is not None:
+            categories[values["id"]] = values["name"]
+
+    goods = []
+    for row, item in enumerate(goods_raw):
+        values = errors.parse_row("goods", row, item, _GOODS_FIELDS)
+        if values is None:
+            continue
+        category = categories.get(values["category"])
+        if category is None:
+            errors.add("goods", row, "category", f"id={values['category']} not found in YAML categories")
+            continue
+        if errors.total:
+            # Импорта уже не будет — записи не собираем, только проверяем остальное
+            continue
+        goods.append(GoodsRecord(
+            external_id=values["id"],
+            category=category,
+            name=values["name"],
+            model=values["model"],
+            price=values["price"],
+            price_rrc=values["price_rrc"],
+            quantity=values["quantity"],
+            params=values["parameters"],
+        ))
+
+    errors.raise_if_any()
+    return PriceList(shop=shop, categories=categories, goods=goods)
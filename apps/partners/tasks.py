@@ -0,0 +1,55 @@
+"""
+Фоновые задачи поставщиков (очередь imports, воркер с профилем imports — см. config/celery.py).
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from config.celery import app
+
+
+IMPORT_TASK_OPTIONS = {
+    # Подтверждаем после выполнения: если воркер упал посреди импорта, прайс вернётся в очередь.
+    # Импорт идемпотентен (upsert по external_id), повтор безопасен.
+    "acks_late": True,
+    "reject_on_worker_lost": True,
+    "soft_time_limit": settings.IMPORT_TASK_SOFT_TIME_LIMIT,
+    "time_limit": settings.IMPORT_TASK_TIME_LIMIT,
+}
+
+
+@app.task(ignore_result=False, **IMPORT_TASK_OPTIONS)
+def import_price(user_id: int, url: str) -> dict[str, Any]:
+    """
+    Импорт прайса поставщика по url — то же, что POST /api/partner/update/.
+    Результат — словарь import_price_from_url (Status, Error, http_status).
+    """
+    from apps.partners.services.importer import import_price_from_url
+
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is None:
+        return {"Status": False, "Error": "User not found", "http_status": 404}
+    return import_price_from_url(user=user, url=url)
+
+
+@app.task(**IMPORT_TASK_OPTIONS)
+def refresh_shop_price(schedule_id: int) -> dict[str, Any]:
+    """
+    Плановая проверка прайса магазина: импорт — только если прайс изменился.
+    """
+    from apps.partners.services.schedule import refresh
+
+    return refresh(schedule_id)
+
+
+@app.task
+def enqueue_due_imports() -> int:
+    """
+    Планировщик (celery beat, CELERY_BEAT_SCHEDULE): ставит в очередь магазины, которым пора обновиться.
+    """
+    from apps.partners.services.schedule import enqueue_due
+
+    return len(enqueue_due())
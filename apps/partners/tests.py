@@ -1,3 +1,678 @@
-from django.test import TestCase
+import csv
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import yaml
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.catalog import cache as catalog_cache
+from apps.catalog.models import ProductInfo, ProductParameter, Shop
+from apps.catalog.services.lookups import LOOKUP_CACHES
+from apps.common.testing import QueryBudgetTestCase, make_offers, make_order, make_shop, make_user
+from apps.orders.models import Order, ShopOrder
+from apps.orders.services.analytics import check_sales_rollups
+from apps.orders.services.fulfilment import set_order_status
+from apps.partners.models import ShopImportSchedule
+from apps.partners.serializers import OfferDeltaItemSerializer, OfferDeltaListField
+from apps.partners.services.importer import (
+    IMPORT_LOCK_NAMESPACE,
+    import_price_content,
+    import_price_from_url,
+    zero_missing_offers,
+)
+from apps.partners.services.schedule import content_hash, enqueue_due, refresh
+from apps.partners.services.validation import GoodsRecord, PriceValidationError, validate_price
+from apps.users.models import UserProfile
+
+
+def price_yaml(shop_name: str, count: int, params_per_good: int = 3) -> bytes:
+    """
+    Прайс поставщика в формате /api/partner/update/ на count товаров.
+    """
+    data = {
+        "shop": shop_name,
+        "categories": [{"id": 1, "name": "Смартфоны"}, {"id": 2, "name": "Аксессуары"}],
+        "goods": [
+            {
+                "id": i,
+                "category": 1 + i % 2,
+                "model": f"model/{i}",
+                "name": f"Товар {i}",
+                "price": 1000 + i,
+                "price_rrc": 1200 + i,
+                "quantity": 10,
+                "parameters": {f"Параметр {p}": f"{i}-{p}" for p in range(params_per_good)},
+            }
+            for i in range(1, count + 1)
+        ],
+    }
+    return yaml.safe_dump(data, allow_unicode=True).encode("utf-8")
+
+
+class PartnersQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Бюджеты — для первого запроса пользователя, включая чтение роли (профиль потом кэшируется).
+    """
+
+    def setUp(self):
+        self.supplier = make_user(role=UserProfile.Role.SUPPLIER)
+        self.api = APIClient()
+        self.api.force_authenticate(self.supplier)
+        self.shop = make_shop(self.supplier)
+        self.other_shop = make_shop(make_user(role=UserProfile.Role.SUPPLIER))
+        self.offers = make_offers(self.shop, 5)
+        self.other_offers = make_offers(self.other_shop, 5)
+        self.customer = make_user()
+
+    def seed_orders(self, scale):
+        """
+        scale заказов, в каждом позиции этого и чужого магазина.
+        """
+        for _ in range(scale - Order.objects.filter(user=self.customer).count()):
+            make_order(self.customer, self.offers + self.other_offers)
+
+    def test_state(self):
+        # Магазин и его предложения — по одному UPDATE (+ savepoint)
+        self.assertQueryBudget(6, self.api.post, "/api/partner/state/", {"state": False}, format="json")
+        self.assertFalse(ProductInfo.objects.filter(shop=self.shop, shop_enabled=True).exists())
+        self.assertFalse(ProductInfo.objects.filter(shop=self.other_shop, shop_enabled=False).exists())
+
+    def test_shops_state(self):
+        shop_ids = [self.shop.id, self.other_shop.id]
+        response = self.api.post("/api/partner/shops/state/", {"shop_ids": shop_ids, "state": False}, format="json")
+        self.assertEqual(response.status_code, 403)
+
+        # Настоящий Bearer-токен, а не force_authenticate: IsAdminUser должен видеть is_staff
+        # и у пользователя из БД, и у собранного из claims
+        admin = make_user(is_staff=True)
+        admin_api = APIClient()
+        login = admin_api.post("/api/auth/login/", {"username": admin.username, "password": "pw123456"}, format="json")
+        admin_api.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+        for trust_claims, state, budget in ((False, False, 5), (True, True, 7), (True, False, 4)):
+            with self.subTest(trust_claims=trust_claims, state=state), self.settings(AUTH_TRUST_TOKEN_CLAIMS=trust_claims):
+                response = self.assertQueryBudget(
+                    budget, admin_api.post, "/api/partner/shops/state/",
+                    {"shop_ids": shop_ids, "state": state}, format="json",
+                )
+                self.assertEqual(response.data["data"], {"state": state, "changed": 2})
+                self.assertFalse(Shop.objects.filter(id__in=shop_ids).exclude(state=state).exists())
+                self.assertFalse(ProductInfo.objects.filter(shop_id__in=shop_ids).exclude(shop_enabled=state).exists())
+
+        response = admin_api.post("/api/partner/shops/state/", {"shop_ids": [], "state": True}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_shop(self):
+        self.assertQueryBudget(2, self.api.get, "/api/partner/shop/")
+        self.assertQueryBudget(
+            5, self.api.patch, "/api/partner/shop/", {"url": "https://example.com/price.yaml"}, format="json"
+        )
+
+    def test_orders(self):
+        for query, budget in (({"limit": 200}, 4), ({"since": "2000-01-01T00:00:00Z", "limit": 200}, 4)):
+            with self.subTest(query=query):
+                self.assertBudgetAtScales(
+                    budget, self.seed_orders, lambda: (self.api.get, ("/api/partner/orders/",), {"data": query})
+                )
+
+    def test_orders_export(self):
+        for query in ({}, {"gzip": 1}):
+            with self.subTest(query=query):
+
+                def make_request():
+                    return self.api.get, ("/api/partner/orders/export/",), {"data": query}
+
+                for scale in self.SCALES:
+                    self.seed_orders(scale)
+                    # Запросы выполняются при чтении потока — считаем их вместе с ним
+                    self.assertQueryBudget(3, lambda: self._consume(*make_request()))
+
+    def _consume(self, request, args, kwargs):
+        response = request(*args, **kwargs)
+        b"".join(response.streaming_content)
+        return response
+
+    def test_analytics(self):
+        for query in ({}, {"group_by": "product"}, {"group_by": "category", "granularity": "month"}):
+            with self.subTest(query=query):
+                self.assertBudgetAtScales(
+                    3, self.seed_orders, lambda: (self.api.get, ("/api/partner/analytics/",), {"data": query})
+                )
+
+    def test_offers_delta(self):
+        def seed(scale):
+            self.offers += make_offers(self.shop, scale - len(self.offers))
+
+        def make_request():
+            offers = [{"external_id": o.external_id, "quantity": 7, "price": "99.50"} for o in self.offers]
+            return self.api.post, ("/api/partner/offers/delta/",), {"data": {"offers": offers}, "format": "json"}
+
+        # Профиль, магазин, блокировка, один UPDATE (+ savepoint)
+        self.assertBudgetAtScales(7, seed, make_request)
+
+    def test_update(self):
+        """
+        Импорт пока делает запросы на каждый товар — бюджет линейный, но с фиксированной ценой товара.
+        Постоянная часть включает блокировку магазина и запись расписания автообновления.
+        """
+        for scale in self.SCALES:
+            with self.subTest(scale=scale):
+                response = mock.Mock(content=price_yaml(self.shop.name, scale), headers={}, status_code=200)
+                with mock.patch("apps.partners.services.importer.requests.get", return_value=response):
+                    self.assertQueryBudget(
+                        35 + 25 * scale,
+                        self.api.post, "/api/partner/update/", {"url": "https://example.com/price.yaml"},
+                        format="json",
+                    )
+
+
+@override_settings(PARTNER_ORDERS_SINCE_DELAY=0)
+class PartnerOrdersFeedTests(QueryBudgetTestCase):
+    """
+    GET /api/partner/orders/: лента по курсору (новые сверху) и инкрементальный опрос по since.
+    """
+
+    def setUp(self):
+        self.supplier = make_user(role=UserProfile.Role.SUPPLIER)
+        self.api = APIClient()
+        self.api.force_authenticate(self.supplier)
+        self.shop = make_shop(self.supplier)
+        offers = make_offers(self.shop, 2)
+        other_offers = make_offers(make_shop(), 1)
+        customer = make_user()
+        self.orders = [make_order(customer, offers + other_offers) for _ in range(5)]
+        make_order(customer, other_offers)
+        # Два заказа с одинаковым dt — порядок между ними задаёт id
+        ShopOrder.objects.filter(order__in=self.orders[:2]).update(dt=self.orders[0].dt)
+        self.ids = [order.id for order in self.orders]
+
+    def page(self, **query):
+        response = self.assertQueryBudget(4, self.api.get, "/api/partner/orders/", query)
+        return response.data["data"]
+
+    def test_cursor(self):
+        ids, cursor = [], None
+        while True:
+            data = self.page(limit=2, **({"cursor": cursor} if cursor else {}))
+            self.assertIsNone(data["next_since"])
+            ids += [row["id"] for row in data["orders"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(ids, self.ids[::-1])
+
+        [row] = self.page(limit=1)["orders"]
+        self.assertEqual(row["totals"], {"items": 2, "quantity": 4, "amount": "400.00"})
+        self.assertEqual(len(row["items"]), 2)
+
+    def test_since(self):
+        ids, since = [], "2000-01-01T00:00:00Z"
+        while True:
+            data = self.page(limit=2, since=since)
+            self.assertIsNone(data["next_cursor"])
+            if not data["orders"]:
+                # Пустой опрос возвращает тот же курсор
+                self.assertEqual(data["next_since"], since)
+                break
+            ids += [row["id"] for row in data["orders"]]
+            since = data["next_since"]
+        self.assertEqual(sorted(ids), sorted(self.ids))
+        self.assertEqual(len(ids), len(set(ids)))
+
+        # Смена статуса — заказ снова в ленте, и только он
+        set_order_status(self.orders[2], Order.Status.CONFIRMED)
+        data = self.page(since=since)
+        self.assertEqual([(row["id"], row["status"]) for row in data["orders"]], [(self.ids[2], "confirmed")])
+        self.assertEqual(self.page(since=data["next_since"])["orders"], [])
+
+    @override_settings(PARTNER_ORDERS_SINCE_DELAY=60)
+    def test_since_returns_settled_changes_only(self):
+        now = timezone.now()
+        for i, order in enumerate(self.orders[:4]):
+            ShopOrder.objects.filter(order=order).update(updated_at=now - timedelta(seconds=200 - i * 10))
+        # Только что изменённый заказ: его транзакция могла ещё не закоммититься
+        ShopOrder.objects.filter(order=self.orders[4]).update(updated_at=now)
+
+        data = self.page(since="2000-01-01T00:00:00Z")
+        self.assertEqual([row["id"] for row in data["orders"]], self.ids[:4])
+        self.assertEqual(self.page(since=data["next_since"])["orders"], [])
+
+        ShopOrder.objects.filter(order=self.orders[4]).update(updated_at=now - timedelta(seconds=61))
+        self.assertEqual([row["id"] for row in self.page(since=data["next_since"])["orders"]], [self.ids[4]])
+
+    def test_bad_params(self):
+        for query in ({"cursor": "nope"}, {"since": "yesterday"}, {"limit": "x"}):
+            with self.subTest(query=query):
+                response = self.api.get("/api/partner/orders/", query)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.data["Status"])
+
+
+@override_settings(THROTTLE_BUCKETS={}, DATABASE_REPLICAS=[])
+class PartnerOrdersExportTests(TestCase):
+    def test_formula_cells_escaped(self):
+        supplier = make_user(role=UserProfile.Role.SUPPLIER)
+        offer = make_offers(make_shop(supplier), 1)[0]
+        offer.product.name = '=HYPERLINK("https://example.com","x")'
+        offer.product.save(update_fields=["name"])
+        customer = make_user()
+        customer.username = "@cmd"
+        customer.save(update_fields=["username"])
+        make_order(customer, [offer])
+
+        api = APIClient()
+        api.force_authenticate(supplier)
+        response = api.get("/api/partner/orders/export/")
+        rows = list(csv.DictReader(b"".join(response.streaming_content).decode("utf-8").splitlines()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["product_name"], '\'=HYPERLINK("https://example.com","x")')
+        self.assertEqual(rows[0]["customer_username"], "'@cmd")
+        self.assertEqual(rows[0]["customer_email"], customer.email)
+        self.assertEqual(rows[0]["unit_price"], "100.00")
+
+
+@override_settings(THROTTLE_BUCKETS={}, DATABASE_REPLICAS=[])
+class PartnerAnalyticsTests(TestCase):
+    def setUp(self):
+        self.supplier = make_user(role=UserProfile.Role.SUPPLIER)
+        self.api = APIClient()
+        self.api.force_authenticate(self.supplier)
+        self.shop = make_shop(self.supplier)
+        self.offers = make_offers(self.shop, 2)
+        other_offers = make_offers(make_shop(), 1)
+        customer = make_user()
+        self.orders = [
+            make_order(customer, self.offers + other_offers),
+            make_order(customer, self.offers[:1], quantity=3),
+            make_order(customer, self.offers[1:]),
+            make_order(customer, self.offers, status=Order.Status.BASKET),
+        ]
+        set_order_status(self.orders[2], Order.Status.CANCELED)
+
+    def rows(self, **query):
+        response = self.api.get("/api/partner/analytics/", query)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["data"]["rows"]
+
+    def test_totals(self):
+        today = timezone.localdate().isoformat()
+        self.assertEqual(
+            self.rows(),
+            [{"period": today, "quantity": 7, "revenue": "700.00"}],
+        )
+        by_product = {row["product_id"]: row for row in self.rows(group_by="product")}
+        self.assertEqual(
+            [(row["quantity"], row["revenue"], row["orders_count"]) for row in
+             (by_product[self.offers[0].product_id], by_product[self.offers[1].product_id])],
+            [(5, "500.00", 2), (2, "200.00", 1)],
+        )
+        [month] = self.rows(group_by="category", granularity="month")
+        self.assertEqual(month["period"], timezone.localdate().replace(day=1).isoformat())
+        self.assertEqual(month["category_id"], self.offers[0].product.category_id)
+        self.assertEqual(check_sales_rollups(self.shop.id), [])
+
+    def test_cancel_and_restore(self):
+        set_order_status(self.orders[1], Order.Status.CANCELED)
+        self.assertEqual([row["orders_count"] for row in self.rows(group_by="product")], [1, 1])
+        set_order_status(self.orders[1], Order.Status.NEW)
+        set_order_status(self.orders[2], Order.Status.NEW)
+        self.assertEqual(self.rows()[0]["quantity"], 9)
+        self.assertEqual(sorted(row["orders_count"] for row in self.rows(group_by="product")), [2, 2])
+        self.assertEqual(check_sales_rollups(self.shop.id), [])
+
+    def test_period_and_params(self):
+        self.assertEqual(self.rows(date_from="2000-01-01", date_to="2000-01-31"), [])
+        for query in (
+            {"granularity": "year"},
+            {"group_by": "shop"},
+            {"date_from": "yesterday"},
+            {"date_from": "2026-02-01", "date_to": "2026-01-31"},
+            {"date_from": "2020-01-01", "date_to": "2026-01-01"},
+        ):
+            with self.subTest(query=query):
+                response = self.api.get("/api/partner/analytics/", query)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.data["Status"])
+
+
+@override_settings(PRICE_REFRESH_MIN_INTERVAL=600, PRICE_REFRESH_MAX_INTERVAL=9600, PRICE_REFRESH_JITTER=0.1)
+class PriceRefreshScheduleTests(TestCase):
+    URL = "https://example.com/price.yaml"
+
+    def setUp(self):
+        self.supplier = make_user(role=UserProfile.Role.SUPPLIER)
+        self.shop = make_shop(self.supplier)
+        self.content = price_yaml(self.shop.name, 3)
+
+    def fetch(self, content=None, status_code=200, headers=None):
+        response = mock.Mock(
+            content=self.content if content is None else content, status_code=status_code, headers=headers or {}
+        )
+        return mock.patch("apps.partners.services.importer.requests.get", return_value=response)
+
+    def make_schedule(self, **kwargs) -> ShopImportSchedule:
+        kwargs.setdefault("shop", self.shop)
+        kwargs.setdefault("interval", 2400)
+        kwargs.setdefault("next_run_at", timezone.now() - timedelta(seconds=1))
+        kwargs.setdefault("content_hash", content_hash(self.content))
+        return ShopImportSchedule.objects.create(url=self.URL, **kwargs)
+
+    def assertNextRunIn(self, schedule, seconds):
+        delay = (schedule.next_run_at - timezone.now()).total_seconds()
+        self.assertTrue(seconds * 0.9 - 5 <= delay <= seconds * 1.1, delay)
+
+    def test_manual_import_creates_schedule(self):
+        api = APIClient()
+        api.force_authenticate(self.supplier)
+        with self.fetch(headers={"ETag": '"v1"'}):
+            response = api.post("/api/partner/update/", {"url": self.URL}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+
+        schedule = ShopImportSchedule.objects.get(shop=self.shop)
+        self.assertEqual((schedule.url, schedule.interval, schedule.etag), (self.URL, 600, '"v1"'))
+        self.assertEqual(schedule.content_hash, content_hash(self.content))
+        self.assertNextRunIn(schedule, 600)
+
+    def test_unchanged_price_backs_off(self):
+        schedule = self.make_schedule(etag='"v1"')
+        with self.fetch() as get, mock.patch("apps.partners.services.importer.import_price_content") as do_import:
+            result = refresh(schedule.id)
+        do_import.assert_not_called()
+        self.assertEqual(get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+        self.assertEqual(result, {"Status": True, "changed": False, "interval": 4800})
+
+        schedule.refresh_from_db()
+        self.assertNextRunIn(schedule, 4800)
+        # Не дольше PRICE_REFRESH_MAX_INTERVAL, и 304 — тоже «не изменился»
+        for _ in range(3):
+            with self.fetch(content=b"", status_code=304):
+                refresh(schedule.id)
+        schedule.refresh_from_db()
+        self.assertEqual((schedule.interval, schedule.content_hash), (9600, content_hash(self.content)))
+
+    def test_changed_price_is_imported_and_checked_sooner(self):
+        schedule = self.make_schedule(content_hash="old")
+        with self.fetch():
+            result = refresh(schedule.id)
+        self.assertEqual(result, {"Status": True, "changed": True, "interval": 1200})
+        self.assertEqual(ProductInfo.objects.filter(shop=self.shop).count(), 3)
+
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.content_hash, content_hash(self.content))
+        self.assertIsNotNone(schedule.last_changed_at)
+        self.assertNextRunIn(schedule, 1200)
+
+    def test_fetch_failure_backs_off(self):
+        schedule = self.make_schedule(failures=1)
+        with mock.patch("apps.partners.services.importer.requests.get", side_effect=OSError("timeout")):
+            result = refresh(schedule.id)
+        self.assertFalse(result["Status"])
+
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.failures, 2)
+        self.assertIn("timeout", schedule.last_error)
+        self.assertNextRunIn(schedule, 600 * 4)
+
+    def test_claim_due(self):
+        due = self.make_schedule()
+        self.make_schedule(shop=make_shop(), next_run_at=timezone.now() + timedelta(hours=1))
+        self.make_schedule(shop=make_shop(), enabled=False)
+
+        with mock.patch("apps.partners.tasks.refresh_shop_price.delay") as delay:
+            self.assertEqual(enqueue_due(), [due.id])
+            # Пока задача не отработала, расписание повторно не забирается
+            self.assertEqual(enqueue_due(), [])
+        delay.assert_called_once_with(due.id)
+
+    def test_concurrent_import_of_the_same_shop_is_rejected(self):
+        # Блокировку держит другое соединение (второй воркер)
+        other = connection.copy()
+        try:
+            with other.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_lock(%s, %s)", [IMPORT_LOCK_NAMESPACE, self.shop.id])
+            with self.fetch():
+                result = import_price_from_url(user=self.supplier, url=self.URL)
+        finally:
+            other.close()
+        self.assertEqual(result["http_status"], 409)
+        self.assertFalse(ProductInfo.objects.filter(shop=self.shop).exists())
+
+        with self.fetch():
+            self.assertTrue(import_price_from_url(user=self.supplier, url=self.URL)["Status"])
+
+
+class ImportParamsTests(TestCase):
+    URL = "https://example.com/price.yaml"
+
+    def setUp(self):
+        self.supplier = make_user(role=UserProfile.Role.SUPPLIER)
+        self.shop = make_shop(self.supplier)
+
+    def test_params_column(self):
+        result = import_price_content(user=self.supplier, url=self.URL, content=price_yaml(self.shop.name, 2))
+        self.assertTrue(result["Status"], result)
+        offer = ProductInfo.objects.get(shop=self.shop, external_id=1)
+        self.assertEqual(offer.params, {"Параметр 0": "1-0", "Параметр 1": "1-1", "Параметр 2": "1-2"})
+        self.assertEqual(ProductParameter.objects.filter(product_info__shop=self.shop).count(), 6)
+
+        # Повторный импорт с другими параметрами перезаписывает колонку целиком
+        import_price_content(user=self.supplier, url=self.URL, content=price_yaml(self.shop.name, 2, params_per_good=1))
+        offer.refresh_from_db()
+        self.assertEqual(offer.params, {"Параметр 0": "1-0"})
+
+    def test_lookup_stats(self):
+        for lookup_cache in LOOKUP_CACHES.values():
+            self.addCleanup(lookup_cache.clear)
+        content = price_yaml(self.shop.name, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_price_content(user=self.supplier, url=self.URL, content=content)
+        self.assertEqual(result["stats"]["goods"], 3)
+        self.assertEqual(result["stats"]["category"], {"hits": 0, "misses": 2, "created": 2, "hit_rate": 0.0})
+        self.assertEqual(result["stats"]["parameter"]["created"], 3)
+
+        result = import_price_content(user=self.supplier, url=self.URL, content=content)
+        self.assertEqual(result["stats"]["category"]["hit_rate"], 1.0)
+        self.assertEqual(result["stats"]["parameter"], {"hits": 3, "misses": 0, "created": 0, "hit_rate": 1.0})
+
+    def test_catalog_cache_bumped_once_per_import(self):
+        # Импорт создаёт и меняет десятки строк каталога (часть — в savepoint-ах get_or_create)
+        with mock.patch.object(catalog_cache, "bump_version") as bump, self.captureOnCommitCallbacks(execute=True):
+            result = import_price_content(user=self.supplier, url=self.URL, content=price_yaml(self.shop.name, 20))
+        self.assertTrue(result["Status"], result)
+        bump.assert_called_once_with()
+
+    def test_zero_missing_offers(self):
+        offers = make_offers(self.shop, 4)
+        other = make_offers(make_shop(), 2)
+        ProductInfo.objects.filter(pk=offers[3].pk).update(quantity=0)
+
+        version = catalog_cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            self.assertEqual(zero_missing_offers(self.shop.id, [offers[0].external_id]), 2)
+        self.assertGreater(catalog_cache.get_version(), version)
+        self.assertEqual(
+            dict(ProductInfo.objects.filter(shop=self.shop).values_list("pk", "quantity")),
+            {offers[0].pk: 1000, offers[1].pk: 0, offers[2].pk: 0, offers[3].pk: 0},
+        )
+        self.assertEqual(ProductInfo.objects.filter(pk__in=[o.pk for o in other], quantity=1000).count(), 2)
+
+        # Обнулять нечего — ни записи, ни сброса кэша
+        version = catalog_cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            self.assertEqual(zero_missing_offers(self.shop.id, [offers[0].external_id]), 0)
+        self.assertEqual(catalog_cache.get_version(), version)
+        # Пустой прайс обнуляет всё
+        self.assertEqual(zero_missing_offers(self.shop.id, []), 1)
+
+    def test_import_reports_zeroed(self):
+        import_price_content(user=self.supplier, url=self.URL, content=price_yaml(self.shop.name, 5))
+        result = import_price_content(user=self.supplier, url=self.URL, content=price_yaml(self.shop.name, 3))
+        self.assertEqual(result["stats"]["zeroed"], 2)
+        self.assertEqual(
+            sorted(ProductInfo.objects.filter(shop=self.shop, quantity=0).values_list("external_id", flat=True)),
+            [4, 5],
+        )
+
+    @override_settings(CATALOG_PARAMS_EAV=False)
+    def test_without_eav(self):
+        import_price_content(user=self.supplier, url=self.URL, content=price_yaml(self.shop.name, 2))
+        self.assertEqual(ProductInfo.objects.get(shop=self.shop, external_id=2).params["Параметр 1"], "2-1")
+        self.assertFalse(ProductParameter.objects.exists())
+
+
+class PriceValidationTests(TestCase):
+    def price(self, count=3):
+        return yaml.safe_load(price_yaml("Магазин", count))
+
+    def test_records(self):
+        data = self.price(1)
+        data["goods"][0].update(id="7", name=123, price=10.5, price_rrc=None, parameters={"Вес": 200})
+        del data["goods"][0]["quantity"], data["goods"][0]["model"]
+        price_list = validate_price(data)
+        self.assertEqual(price_list.shop, "Магазин")
+        self.assertEqual(price_list.categories, {1: "Смартфоны", 2: "Аксессуары"})
+        self.assertEqual(price_list.goods, [GoodsRecord(
+            external_id=7, category="Аксессуары", name="123", model="", price=Decimal("10.50"),
+            price_rrc=None, quantity=0, params={"Вес": "200"},
+        )])
+
+    def test_collects_all_errors(self):
+        data = self.price(5)
+        data["goods"][1]["price"] = "abc"
+        data["goods"][1]["id"] = -1
+        data["goods"][3]["category"] = 99
+        data["goods"][4]["model"] = "x" * 81
+        data["goods"].append("oops")
+        with self.assertRaises(PriceValidationError) as ctx:
+            validate_price(data)
+        self.assertEqual(ctx.exception.total, 5)
+        self.assertEqual(
+            [(e["section"], e["row"], e["field"]) for e in ctx.exception.errors],
+            [("goods", 1, "id"), ("goods", 1, "price"), ("goods", 3, "category"), ("goods", 4, "model"),
+             ("goods", 5, None)],
+        )
+
+        with self.assertRaises(PriceValidationError) as ctx:
+            validate_price(data, max_errors=2)
+        self.assertEqual((ctx.exception.total, len(ctx.exception.errors)), (5, 2))
+        self.assertEqual(str(ctx.exception), "Price list has 5 error(s), first 2 shown")
+
+    def test_document_errors(self):
+        for data, field in (([], None), ({"shop": "", "categories": [], "goods": []}, "shop"),
+                            ({"shop": "S", "categories": "x", "goods": None}, "categories")):
+            with self.subTest(data=data):
+                with self.assertRaises(PriceValidationError) as ctx:
+                    validate_price(data)
+                self.assertEqual(ctx.exception.errors[0]["field"], field)
+        for price in ("NaN", "Infinity", True, "1e20", -1):
+            with self.subTest(price=price), self.assertRaises(PriceValidationError):
+                data = self.price(1)
+                data["goods"][0]["price"] = price
+                validate_price(data)
+
+    @override_settings(PRICE_IMPORT_MAX_ERRORS=1)
+    def test_import_rejected_before_db(self):
+        supplier = make_user(role=UserProfile.Role.SUPPLIER)
+        data = self.price(100)
+        data["goods"][-1]["price"] = "bad"
+        data["goods"][-2]["price"] = "bad"
+        content = yaml.safe_dump(data, allow_unicode=True).encode("utf-8")
+        with self.assertNumQueries(0):
+            result = import_price_content(user=supplier, url="https://example.com/p.yaml", content=content)
+        self.assertEqual(result["Errors"], [{"section": "goods", "row": 98, "field": "price", "message": "must be a number"}])
+        self.assertEqual(result["http_status"], 400)
+
+        api = APIClient()
+        api.force_authenticate(supplier)
+        response = mock.Mock(content=content, headers={}, status_code=200)
+        with mock.patch("apps.partners.services.importer.requests.get", return_value=response):
+            response = api.post("/api/partner/update/", {"url": "https://example.com/p.yaml"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["errors"]["detail"], "Price list has 2 error(s), first 1 shown")
+        self.assertEqual(response.data["errors"]["rows"][0]["row"], 98)
+        self.assertFalse(Shop.objects.filter(name="Магазин").exists())
+
+
+class OfferDeltaTests(TestCase):
+    def setUp(self):
+        self.supplier = make_user(role=UserProfile.Role.SUPPLIER)
+        self.api = APIClient()
+        self.api.force_authenticate(self.supplier)
+        self.shop = make_shop(self.supplier)
+        self.offers = make_offers(self.shop, 3)
+        self.other = make_offers(make_shop(), 1)[0]
+
+    def post(self, offers):
+        return self.api.post("/api/partner/offers/delta/", {"offers": offers}, format="json")
+
+    def test_apply(self):
+        a, b, c = self.offers
+        with self.captureOnCommitCallbacks(execute=True):
+            version = catalog_cache.get_version()
+            response = self.post([
+                {"external_id": a.external_id, "quantity": 0},
+                {"external_id": b.external_id, "price": "150.5", "price_rrc": None},
+                {"external_id": b.external_id, "price": 151},  # повтор — действует последний
+                {"external_id": c.external_id, "quantity": c.quantity, "price": str(c.price)},  # без изменений
+                {"external_id": self.other.external_id, "quantity": 1},  # чужое предложение
+                {"external_id": 999_999_999, "quantity": 1},
+            ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            response.data["data"],
+            {"received": 6, "matched": 3, "updated": 2,
+             "unknown": sorted([self.other.external_id, 999_999_999])},
+        )
+        self.assertGreater(catalog_cache.get_version(), version)
+
+        a.refresh_from_db(), b.refresh_from_db(), self.other.refresh_from_db()
+        self.assertEqual((a.quantity, a.price), (0, Decimal("100.00")))
+        # price_rrc из последней записи не передан — остался прежним
+        self.assertEqual((b.quantity, b.price, b.price_rrc), (self.offers[1].quantity, Decimal("151.00"), Decimal("120.00")))
+        self.assertNotEqual(self.other.quantity, 1)
+
+        response = self.post([{"external_id": b.external_id, "price_rrc": None}])
+        b.refresh_from_db()
+        self.assertEqual((response.data["data"]["updated"], b.price_rrc), (1, None))
+
+    def test_validation(self):
+        response = self.post([
+            {"external_id": self.offers[0].external_id, "price": "1.001"},
+            {"external_id": -1, "quantity": 1},
+            {"external_id": self.offers[1].external_id},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data["errors"]["offers"]), {0, 1, 2})
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_plain_items_match_serializer(self):
+        # Быстрый разбор типичных элементов даёт то же, что OfferDeltaItemSerializer
+        field = OfferDeltaListField()
+        items = [
+            {"external_id": 1, "quantity": 5},
+            {"external_id": 2, "price": "10", "price_rrc": None},
+            {"external_id": 3, "price": 7, "price_rrc": "8.5", "extra": "ignored"},
+            {"external_id": 4, "price": 7.25},  # float — через сериализатор
+        ]
+        expected = []
+        for item in items:
+            serializer = OfferDeltaItemSerializer(data=item)
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            expected.append(dict(serializer.validated_data))
+        self.assertEqual([dict(value) for value in field.run_validation(items)], expected)
+
+    def test_disabled_shop_and_running_import(self):
+        offers = [{"external_id": self.offers[0].external_id, "quantity": 1}]
+        other = connection.copy()
+        try:
+            with other.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_lock(%s, %s)", [IMPORT_LOCK_NAMESPACE, self.shop.id])
+            self.assertEqual(self.post(offers).status_code, 409)
+        finally:
+            other.close()
+
+        Shop.objects.filter(pk=self.shop.pk).update(state=False)
+        self.assertEqual(self.post(offers).status_code, 403)
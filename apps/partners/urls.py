@@ -1,8 +1,14 @@
 from django.urls import path
-from .views import PartnerUpdateAPIView, PartnerStateAPIView, PartnerShopAPIView, PartnerOrdersAPIView
+from .views import PartnerUpdateAPIView, PartnerStateAPIView, PartnerShopAPIView, PartnerOrdersAPIView, \
+    PartnerAnalyticsAPIView, PartnerOrdersExportAPIView, PartnerOfferDeltaAPIView, ShopsStateAPIView
+
 urlpatterns = [
     path("update/", PartnerUpdateAPIView.as_view(), name="partner-update"),
+    path("offers/delta/", PartnerOfferDeltaAPIView.as_view(), name="partner-offers-delta"),
     path("state/", PartnerStateAPIView.as_view(), name="partner-state"),
+    path("shops/state/", ShopsStateAPIView.as_view(), name="partner-shops-state"),
     path("shop/", PartnerShopAPIView.as_view(), name="partner-shop"),
     path("orders/", PartnerOrdersAPIView.as_view(), name="partner-orders"),
+    path("orders/export/", PartnerOrdersExportAPIView.as_view(), name="partner-orders-export"),
+    path("analytics/", PartnerAnalyticsAPIView.as_view(), name="partner-analytics"),
 ]
\ No newline at end of file
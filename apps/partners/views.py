@@ -1,28 +1,54 @@
 # apps/partners/views.py
 
+from datetime import timedelta
 from decimal import Decimal
 
+from django.conf import settings
 from django.db import transaction
-from django.utils.dateparse import parse_date
-from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
+from django.http import StreamingHttpResponse
+from django.db.models import DateField, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter, OpenApiResponse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from apps.catalog.models import Shop
-from apps.orders.models import Order, OrderItem
+from apps.catalog.services.shops import set_shops_state
+from apps.orders.models import OrderItem, ProductSalesDaily, ShopOrder
+from apps.orders.services.listing import (
+    MAX_PAGE_SIZE,
+    day_range,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    parse_limit,
+)
 from apps.users.models import UserProfile
 from .serializers import (
+    OfferDeltaSerializer,
     PartnerUpdateSerializer,
     PartnerStateSerializer,
     PartnerShopCreateSerializer,
     PartnerShopPatchSerializer,
+    ShopsStateSerializer,
     UnifiedResponseSerializer,
 )
-from .services.importer import import_price_from_url
+from .services.export import (
+    CONTENT_TYPES,
+    EXPORT_FORMATS,
+    export_filename,
+    iter_export,
+    order_lines_queryset,
+    xlsx_available,
+)
+from .services.offers import apply_offer_deltas
 
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from apps.users.permissions import IsSupplier
+from apps.users.throttling import ImportThrottle, OfferDeltaThrottle
 
 def ok(data=None, http_status=status.HTTP_200_OK):
     return Response({"Status": True, "data": data, "errors": None}, status=http_status)
@@ -32,6 +58,21 @@ def fail(errors, http_status=status.HTTP_400_BAD_REQUEST):
     return Response({"Status": False, "data": None, "errors": errors}, status=http_status)
 
 
+def _money(value):
+    if value is None:
+        return None
+    return str(value.quantize(Decimal("0.01")))
+
+
+def supplier_shop_id(request):
+    """
+    id магазина поставщика: из JWT-claims без запроса к БД, иначе — из БД.
+    """
+    if hasattr(request.user, "token_shop_id"):
+        return request.user.token_shop_id
+    return Shop.objects.filter(user=request.user).values_list("id", flat=True).first()
+
+
 def check_supplier(request):
     if not request.user.is_authenticated:
         return fail("Log in required", status.HTTP_403_FORBIDDEN)
@@ -49,6 +90,7 @@ class PartnerUpdateAPIView(APIView):
     body: {"url": "https://.../price.yaml"}
     """
     permission_classes = [IsAuthenticated, IsSupplier]
+    throttle_classes = [ImportThrottle]
 
     @extend_schema(
         request=PartnerUpdateSerializer,
@@ -56,6 +98,7 @@ class PartnerUpdateAPIView(APIView):
             200: OpenApiResponse(response=UnifiedResponseSerializer, description="Import completed"),
             400: OpenApiResponse(response=UnifiedResponseSerializer, description="Validation/import error"),
             403: OpenApiResponse(response=UnifiedResponseSerializer, description="Forbidden"),
+            409: OpenApiResponse(response=UnifiedResponseSerializer, description="Import for this shop is already running"),
         },
         examples=[
             OpenApiExample(
@@ -68,6 +111,19 @@ class PartnerUpdateAPIView(APIView):
                 value={"Status": True, "data": {"imported": True}, "errors": None},
                 response_only=True,
             ),
+            OpenApiExample(
+                "Invalid price list",
+                value={
+                    "Status": False,
+                    "data": None,
+                    "errors": {
+                        "detail": "Price list has 1 error(s)",
+                        "rows": [{"section": "goods", "row": 12, "field": "price", "message": "must be a number"}],
+                    },
+                },
+                response_only=True,
+                status_codes=["400"],
+            ),
         ],
     )
     def post(self, request, *args, **kwargs):
@@ -81,14 +137,75 @@ class PartnerUpdateAPIView(APIView):
 
         url = serializer.validated_data["url"]
 
+        # requests/yaml импортера нужны только здесь — не грузим их при старте процесса
+        from .services.importer import import_price_from_url
+
         result = import_price_from_url(user=request.user, url=url)
         if not result.get("Status", False):
-            err = result.get("Error") or result.get("Errors") or "Import failed"
+            err = result.get("Error") or "Import failed"
+            if result.get("Errors"):
+                # Ошибки проверки прайса: строка, поле, сообщение
+                err = {"detail": err, "rows": result["Errors"]}
             return fail(err, result.get("http_status", status.HTTP_400_BAD_REQUEST))
 
         return ok({"imported": True}, status.HTTP_200_OK)
 
 
+class PartnerOfferDeltaAPIView(APIView):
+    """
+    POST /api/partner/offers/delta/
+    body: {"offers": [{"external_id": 4216292, "quantity": 12, "price": "1190.00"}, ...]}
+    Меняет только переданные поля существующих предложений магазина (по external_id из прайса).
+    """
+    permission_classes = [IsAuthenticated, IsSupplier]
+    throttle_classes = [OfferDeltaThrottle]
+
+    @extend_schema(
+        request=OfferDeltaSerializer,
+        responses={
+            200: OpenApiResponse(response=UnifiedResponseSerializer, description="Deltas applied"),
+            400: OpenApiResponse(response=UnifiedResponseSerializer, description="Validation error / no shop"),
+            403: OpenApiResponse(response=UnifiedResponseSerializer, description="Forbidden / shop disabled"),
+            409: OpenApiResponse(response=UnifiedResponseSerializer, description="Import for this shop is already running"),
+        },
+        examples=[
+            OpenApiExample(
+                "Request example",
+                value={"offers": [
+                    {"external_id": 4216292, "quantity": 12},
+                    {"external_id": 4216313, "price": "1190.00", "price_rrc": None},
+                ]},
+                request_only=True,
+            ),
+            OpenApiExample(
+                "Success response (unified)",
+                value={
+                    "Status": True,
+                    "data": {"received": 2, "matched": 1, "updated": 1, "unknown": [4216313]},
+                    "errors": None,
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = OfferDeltaSerializer(data=request.data)
+        if not serializer.is_valid():
+            return fail(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        shop_id = supplier_shop_id(request)
+        if shop_id is None:
+            return fail("No shop bound to this supplier yet", status.HTTP_400_BAD_REQUEST)
+        # Как и импорт: выключенный магазин прайс не обновляет
+        if not Shop.objects.filter(pk=shop_id, state=True).exists():
+            return fail("Shop is disabled (state=false)", status.HTTP_403_FORBIDDEN)
+
+        result = apply_offer_deltas(shop_id, serializer.validated_data["offers"])
+        if not result.pop("Status"):
+            return fail(result["Error"], result["http_status"])
+        return ok(result, status.HTTP_200_OK)
+
+
 class PartnerStateAPIView(APIView):
     """
     POST /api/partner/state/
@@ -124,14 +241,48 @@ class PartnerStateAPIView(APIView):
 
         state_value = serializer.validated_data["state"]
 
-        shop = Shop.objects.filter(user=request.user).first()
+        shop = Shop.objects.filter(user=request.user).only("id", "name").first()
         if not shop:
             return fail("No shop bound to this supplier yet", status.HTTP_400_BAD_REQUEST)
 
-        shop.state = state_value
-        shop.save(update_fields=["state"])
+        # Вместе с магазином включаются/выключаются его предложения в каталоге
+        set_shops_state([shop.id], state_value)
 
-        return ok({"shop": shop.name, "state": shop.state}, status.HTTP_200_OK)
+        return ok({"shop": shop.name, "state": state_value}, status.HTTP_200_OK)
+
+
+class ShopsStateAPIView(APIView):
+    """
+    POST /api/partner/shops/state/  (только staff)
+    body: {"shop_ids": [1, 2, 3], "state": true/false}
+    Включить или выключить сразу много магазинов: по одному UPDATE на магазины и их предложения.
+    """
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=ShopsStateSerializer,
+        responses={
+            200: OpenApiResponse(response=UnifiedResponseSerializer, description="State updated"),
+            400: OpenApiResponse(response=UnifiedResponseSerializer, description="Validation error"),
+            403: OpenApiResponse(response=UnifiedResponseSerializer, description="Forbidden"),
+        },
+        examples=[
+            OpenApiExample("Disable", value={"shop_ids": [1, 2], "state": False}, request_only=True),
+            OpenApiExample(
+                "Success response (unified)",
+                value={"Status": True, "data": {"state": False, "changed": 2}, "errors": None},
+                response_only=True,
+            ),
+        ],
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = ShopsStateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return fail(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        state_value = serializer.validated_data["state"]
+        changed = set_shops_state(serializer.validated_data["shop_ids"], state_value)
+        return ok({"state": state_value, "changed": changed}, status.HTTP_200_OK)
 
 
 class PartnerShopAPIView(APIView):
@@ -292,10 +443,41 @@ class PartnerShopAPIView(APIView):
         return ok({"shop": shop.name, "url": shop.url, "state": shop.state}, status.HTTP_200_OK)
 
 
+def _parse_since(raw):
+    """
+    since: next_since из прошлого ответа или ISO-дата/время (первый опрос).
+    """
+    dt = parse_datetime(raw)
+    if dt is not None:
+        if timezone.is_naive(dt):
+            dt = timezone.make_aware(dt)
+        return dt, 0
+    return decode_cursor(raw, "since")
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name="status", required=False, type=str, description="Order status"),
+        OpenApiParameter(name="date_from", required=False, type=str, description="YYYY-MM-DD, inclusive"),
+        OpenApiParameter(name="date_to", required=False, type=str, description="YYYY-MM-DD, inclusive"),
+        OpenApiParameter(name="limit", required=False, type=int, description=f"Page size (max {MAX_PAGE_SIZE})"),
+        OpenApiParameter(name="cursor", required=False, type=str, description="next_cursor from previous page"),
+        OpenApiParameter(
+            name="since",
+            required=False,
+            type=str,
+            description="Incremental polling: next_since from previous response or ISO datetime. "
+                        "Returns orders changed after it, oldest change first; changes younger than "
+                        "PARTNER_ORDERS_SINCE_DELAY seconds are returned on a later poll.",
+        ),
+        OpenApiParameter(name="include_items", required=False, type=int, description="0 -> orders with totals only"),
+    ],
+)
 class PartnerOrdersAPIView(APIView):
     """
     GET /api/partner/orders/
     Supplier sees only orders containing items from his shop.
+    Keyset-paginated by (dt, order id); reads one ShopOrder row per order with the shop subtotal.
     """
     permission_classes = [IsAuthenticated, IsSupplier]
 
@@ -317,6 +499,7 @@ class PartnerOrdersAPIView(APIView):
                                 "dt": "2026-02-24T18:20:00Z",
                                 "status": "new",
                                 "customer": {"id": 5, "username": "client1", "email": "client1@mail.com"},
+                                "totals": {"items": 1, "quantity": 2, "amount": "200.00"},
                                 "items": [
                                     {
                                         "id": 33,
@@ -329,7 +512,9 @@ class PartnerOrdersAPIView(APIView):
                                     }
                                 ],
                             }
-                        ]
+                        ],
+                        "next_cursor": None,
+                        "next_since": "MjAyNi0wMi0yNFQxODoyMDowMCswMDowMHwxMg",
                     },
                     "errors": None,
                 },
@@ -342,67 +527,279 @@ class PartnerOrdersAPIView(APIView):
         # if denied:
         #     return denied
 
-        shop = Shop.objects.filter(user=request.user).first()
-        if not shop:
+        shop_id = supplier_shop_id(request)
+        if not shop_id:
             return fail("No shop bound to this supplier yet", status.HTTP_400_BAD_REQUEST)
 
-        qs = (
-            OrderItem.objects.select_related("order", "order__user", "product")
-            .filter(shop=shop)
-            .exclude(order__status=Order.Status.BASKET)
-        )
+        params = request.query_params
+        try:
+            limit = parse_limit(params.get("limit"))
+            cursor = decode_cursor(params["cursor"]) if params.get("cursor") else None
+            since = _parse_since(params["since"]) if params.get("since") else None
+            dt_from, dt_to = day_range(params.get("date_from"), params.get("date_to"))
+        except ValueError as e:
+            return fail(str(e), status.HTTP_400_BAD_REQUEST)
+
+        include_items = params.get("include_items", "1") != "0"
 
-        status_param = request.query_params.get("status")
+        # Одна строка ShopOrder на (shop, order): итоги магазина уже посчитаны при оформлении
+        qs = ShopOrder.objects.filter(shop_id=shop_id).select_related("order", "order__user")
+
+        status_param = params.get("status")
         if status_param:
-            qs = qs.filter(order__status=status_param)
-
-        date_from = request.query_params.get("date_from")
-        if date_from:
-            df = parse_date(date_from)
-            if not df:
-                return fail("date_from must be YYYY-MM-DD", status.HTTP_400_BAD_REQUEST)
-            qs = qs.filter(order__dt__date__gte=df)
-
-        date_to = request.query_params.get("date_to")
-        if date_to:
-            dt_ = parse_date(date_to)
-            if not dt_:
-                return fail("date_to must be YYYY-MM-DD", status.HTTP_400_BAD_REQUEST)
-            qs = qs.filter(order__dt__date__lte=dt_)
-
-        orders_map = {}
-        for item in qs.order_by("-order__dt", "order_id", "id"):
-            order = item.order
-            key = order.id
-
-            if key not in orders_map:
-                orders_map[key] = {
-                    "id": order.id,
-                    "dt": order.dt.isoformat(),
-                    "status": order.status,
-                    "customer": {
-                        "id": order.user_id,
-                        "username": getattr(order.user, "username", ""),
-                        "email": getattr(order.user, "email", ""),
+            qs = qs.filter(status=status_param)
+
+        # Полуинтервал по самой колонке dt — работает индекс (shop, dt, order)
+        if dt_from:
+            qs = qs.filter(dt__gte=dt_from)
+        if dt_to:
+            qs = qs.filter(dt__lt=dt_to)
+
+        if since:
+            # Инкрементальный режим: по возрастанию (updated_at, id), индекс (shop, updated_at, id).
+            # updated_at ставится до коммита: транзакция, закоммиченная после опроса, может иметь
+            # метку раньше уже выданного курсора. Поэтому отдаём только изменения старше
+            # PARTNER_ORDERS_SINCE_DELAY — к этому времени они закоммичены, и курсор их не обгонит
+            settled = timezone.now() - timedelta(seconds=settings.PARTNER_ORDERS_SINCE_DELAY)
+            qs = qs.filter(keyset_filter(since, dt_field="updated_at", descending=False), updated_at__lte=settled)
+            qs = qs.order_by("updated_at", "id")
+        else:
+            if cursor:
+                qs = qs.filter(keyset_filter(cursor, pk_field="order_id"))
+            qs = qs.order_by("-dt", "-order_id")
+
+        shop_orders = list(qs[: limit + 1])
+        has_next = len(shop_orders) > limit
+        shop_orders = shop_orders[:limit]
+
+        items_by_order: dict[int, list] = {}
+        if include_items and shop_orders:
+            line_total = ExpressionWrapper(
+                F("quantity") * F("unit_price"),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            )
+            items = (
+                OrderItem.objects.filter(shop_id=shop_id, order_id__in=[so.order_id for so in shop_orders])
+                .select_related("product")
+                .annotate(total=line_total)
+                .order_by("order_id", "id")
+            )
+            for item in items:
+                items_by_order.setdefault(item.order_id, []).append(
+                    {
+                        "id": item.id,
+                        "product_id": item.product_id,
+                        "product_name": item.product.name,
+                        "quantity": item.quantity,
+                        "unit_price": _money(item.unit_price),
+                        "unit_price_rrc": _money(item.unit_price_rrc),
+                        "total": _money(item.total),
+                    }
+                )
+
+        data = []
+        for shop_order in shop_orders:
+            order = shop_order.order
+            row = {
+                "id": order.id,
+                "dt": order.dt.isoformat(),
+                "status": shop_order.status,
+                "customer": {
+                    "id": order.user_id,
+                    "username": getattr(order.user, "username", ""),
+                    "email": getattr(order.user, "email", ""),
+                },
+                "totals": {
+                    "items": shop_order.item_count,
+                    "quantity": shop_order.quantity_total,
+                    "amount": _money(shop_order.subtotal),
+                },
+            }
+            if include_items:
+                row["items"] = items_by_order.get(order.id, [])
+            data.append(row)
+
+        if since:
+            next_cursor = None
+            last = shop_orders[-1] if shop_orders else None
+            next_since = encode_cursor(last.updated_at, last.id) if last else encode_cursor(*since)
+        else:
+            last = shop_orders[-1] if has_next else None
+            next_cursor = encode_cursor(last.dt, last.order_id) if last else None
+            next_since = None
+
+        return ok(
+            {"orders": data, "next_cursor": next_cursor, "next_since": next_since},
+            status.HTTP_200_OK,
+        )
+
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name="status", required=False, type=str, description="Order status"),
+        OpenApiParameter(name="date_from", required=False, type=str, description="YYYY-MM-DD, inclusive"),
+        OpenApiParameter(name="date_to", required=False, type=str, description="YYYY-MM-DD, inclusive"),
+        OpenApiParameter(name="file_format", required=False, type=str, enum=list(EXPORT_FORMATS), description="csv (default) or xlsx"),
+        OpenApiParameter(name="gzip", required=False, type=int, description="1 -> gzip-compressed file (.gz)"),
+    ],
+)
+class PartnerOrdersExportAPIView(APIView):
+    """
+    GET /api/partner/orders/export/
+    Streams order lines of supplier's shop as CSV/XLSX (optionally gzip) from a server-side cursor.
+    """
+    permission_classes = [IsAuthenticated, IsSupplier]
+
+    @extend_schema(
+        responses={
+            (200, "text/csv"): OpenApiResponse(description="Order lines file"),
+            400: OpenApiResponse(response=UnifiedResponseSerializer, description="Bad request / no shop"),
+            403: OpenApiResponse(response=UnifiedResponseSerializer, description="Forbidden"),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        shop_id = supplier_shop_id(request)
+        if not shop_id:
+            return fail("No shop bound to this supplier yet", status.HTTP_400_BAD_REQUEST)
+
+        params = request.query_params
+        file_format = params.get("file_format") or "csv"
+        if file_format not in EXPORT_FORMATS:
+            return fail(f"file_format must be one of: {', '.join(EXPORT_FORMATS)}", status.HTTP_400_BAD_REQUEST)
+        if file_format == "xlsx" and not xlsx_available():
+            return fail("XLSX export is not available (openpyxl is not installed)", status.HTTP_400_BAD_REQUEST)
+        use_gzip = params.get("gzip") == "1"
+
+        try:
+            dt_from, dt_to = day_range(params.get("date_from"), params.get("date_to"))
+        except ValueError as e:
+            return fail(str(e), status.HTTP_400_BAD_REQUEST)
+
+        qs = order_lines_queryset(shop_id, status=params.get("status"), dt_from=dt_from, dt_to=dt_to)
+
+        response = StreamingHttpResponse(
+            iter_export(qs, file_format=file_format, gzip=use_gzip),
+            content_type="application/gzip" if use_gzip else CONTENT_TYPES[file_format],
+        )
+        filename = export_filename(shop_id, file_format, use_gzip)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+ANALYTICS_GRANULARITY = {"day": None, "week": TruncWeek, "month": TruncMonth}
+ANALYTICS_GROUP_BY = {
+    "none": (),
+    "product": ("product_id", "product__name"),
+    "category": ("category_id", "category__name"),
+}
+# Длина периода аналитики, дней (включительно)
+ANALYTICS_MAX_DAYS = 731
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name="date_from", required=False, type=str, description="YYYY-MM-DD, inclusive (default: 30 days ago)"),
+        OpenApiParameter(name="date_to", required=False, type=str, description="YYYY-MM-DD, inclusive (default: today)"),
+        OpenApiParameter(name="granularity", required=False, type=str, enum=list(ANALYTICS_GRANULARITY), description="day (default), week or month"),
+        OpenApiParameter(name="group_by", required=False, type=str, enum=list(ANALYTICS_GROUP_BY), description="none (default), product or category; orders_count is returned for product only"),
+    ],
+)
+class PartnerAnalyticsAPIView(APIView):
+    """
+    GET /api/partner/analytics/
+    Sales of supplier's shop per period (and product/category), read from daily rollups only.
+    """
+    permission_classes = [IsAuthenticated, IsSupplier]
+
+    @extend_schema(
+        responses={
+            200: OpenApiResponse(response=UnifiedResponseSerializer, description="Sales rows (unified)"),
+            400: OpenApiResponse(response=UnifiedResponseSerializer, description="Bad request / no shop"),
+            403: OpenApiResponse(response=UnifiedResponseSerializer, description="Forbidden"),
+        },
+        examples=[
+            OpenApiExample(
+                "Success response (unified)",
+                value={
+                    "Status": True,
+                    "data": {
+                        "granularity": "day",
+                        "group_by": "product",
+                        "rows": [
+                            {
+                                "period": "2026-02-24",
+                                "product_id": 7,
+                                "product_name": "iPhone",
+                                "quantity": 2,
+                                "revenue": "200.00",
+                                "orders_count": 1,
+                            }
+                        ],
                     },
-                    "items": [],
-                }
-
-            unit_price = item.unit_price
-            total = None
-            if unit_price is not None:
-                total = (unit_price * Decimal(item.quantity)).quantize(Decimal("0.01"))
-
-            orders_map[key]["items"].append(
-                {
-                    "id": item.id,
-                    "product_id": item.product_id,
-                    "product_name": item.product.name,
-                    "quantity": item.quantity,
-                    "unit_price": str(item.unit_price) if item.unit_price is not None else None,
-                    "unit_price_rrc": str(item.unit_price_rrc) if item.unit_price_rrc is not None else None,
-                    "total": str(total) if total is not None else None,
-                }
+                    "errors": None,
+                },
+                response_only=True,
             )
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        shop_id = supplier_shop_id(request)
+        if not shop_id:
+            return fail("No shop bound to this supplier yet", status.HTTP_400_BAD_REQUEST)
+
+        params = request.query_params
+        granularity = params.get("granularity") or "day"
+        if granularity not in ANALYTICS_GRANULARITY:
+            return fail(f"granularity must be one of: {', '.join(ANALYTICS_GRANULARITY)}", status.HTTP_400_BAD_REQUEST)
+        group_by = params.get("group_by") or "none"
+        if group_by not in ANALYTICS_GROUP_BY:
+            return fail(f"group_by must be one of: {', '.join(ANALYTICS_GROUP_BY)}", status.HTTP_400_BAD_REQUEST)
+
+        date_from = params.get("date_from")
+        date_to = params.get("date_to")
+        day_from = parse_date(date_from) if date_from else timezone.localdate() - timedelta(days=30)
+        day_to = parse_date(date_to) if date_to else timezone.localdate()
+        if not day_from:
+            return fail("date_from must be YYYY-MM-DD", status.HTTP_400_BAD_REQUEST)
+        if not day_to:
+            return fail("date_to must be YYYY-MM-DD", status.HTTP_400_BAD_REQUEST)
+        if day_to < day_from:
+            return fail("date_to must not be earlier than date_from", status.HTTP_400_BAD_REQUEST)
+        if (day_to - day_from).days >= ANALYTICS_MAX_DAYS:
+            return fail(f"Period must be at most {ANALYTICS_MAX_DAYS} days", status.HTTP_400_BAD_REQUEST)
+
+        trunc = ANALYTICS_GRANULARITY[granularity]
+        period = trunc("day", output_field=DateField()) if trunc else F("day")
+        group_fields = ANALYTICS_GROUP_BY[group_by]
+
+        # orders_count роллапа — заказы с товаром за день. Сумма по дням для товара точна (заказ —
+        # в одном дне), а по товарам — нет: заказ с двумя товарами учёлся бы дважды. Поэтому
+        # число заказов — только в разрезе товара
+        with_orders = group_by == "product"
+        totals = {"quantity": Sum("quantity"), "revenue": Sum("revenue")}
+        if with_orders:
+            totals["orders_count"] = Sum("orders_count")
+        rows = (
+            ProductSalesDaily.objects.filter(shop_id=shop_id, day__gte=day_from, day__lte=day_to)
+            .annotate(period=period)
+            .values("period", *group_fields)
+            .annotate(**totals)
+            .order_by("period", *group_fields[:1])
+        )
 
-        return ok({"orders": list(orders_map.values())}, status.HTTP_200_OK)
\ No newline at end of file
+        data = []
+        for row in rows:
+            out = {"period": row["period"].isoformat()}
+            if group_by == "product":
+                out["product_id"] = row["product_id"]
+                out["product_name"] = row["product__name"]
+            elif group_by == "category":
+                out["category_id"] = row["category_id"]
+                out["category_name"] = row["category__name"]
+            out["quantity"] = row["quantity"]
+            out["revenue"] = _money(row["revenue"])
+            if with_orders:
+                out["orders_count"] = row["orders_count"]
+            data.append(out)
+
+        return ok({"granularity": granularity, "group_by": group_by, "rows": data}, status.HTTP_200_OK)
@@ -42,9 +42,13 @@ class UserAdmin(DjangoUserAdmin):
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "role", "created_at", "updated_at")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
 
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "type", "value", "created_at")
     list_filter = ("type",)
-    search_fields = ("user__username", "user__email", "value")
\ No newline at end of file
+    list_select_related = ("user",)
+    search_fields = ("user__username", "user__email", "value")
+    autocomplete_fields = ("user",)
\ No newline at end of file
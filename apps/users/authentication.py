@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.users.claims import (
+    IS_ACTIVE_CLAIM,
+    IS_STAFF_CLAIM,
+    IS_SUPERUSER_CLAIM,
+    ROLE_CLAIM,
+    SHOP_CLAIM,
+    USERNAME_CLAIM,
+    cached_claims,
+    remember_claims,
+    token_claims,
+    user_claims,
+)
+
+User = get_user_model()
+
+
+def _read_only_save(*args, **kwargs):
+    raise RuntimeError("User built from JWT claims is read-only; load it from the database to modify")
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запросов к БД: пользователь собирается из claims токена
+    (user_id, username, role, shop_id, is_active, is_staff, is_superuser).
+
+    Токену верим, только если его claims совпадают с актуальными из общего кэша
+    (AUTH_TRUST_TOKEN_CLAIMS — кэш общий для всех процессов). Нет записи в кэше, claims
+    отличаются (старый токен, роль/магазин/флаги менялись) или кэш локальный — пользователь
+    загружается из БД, как в JWTAuthentication, а запись в кэше восстанавливается.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or not settings.AUTH_TRUST_TOKEN_CLAIMS:
+            return super().get_user(validated_token)
+
+        current = cached_claims(user_id)
+        if current is None:
+            user = super().get_user(validated_token)
+            current = user_claims(user)
+            remember_claims(user_id, current)
+            return self._with_claims(user, current)
+        if token_claims(validated_token) != current:
+            return self._with_claims(super().get_user(validated_token), current)
+        if not current[IS_ACTIVE_CLAIM]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        id_field = User._meta.get_field(api_settings.USER_ID_FIELD)
+        user = User(**{api_settings.USER_ID_FIELD: id_field.to_python(user_id)})
+        user.username = current[USERNAME_CLAIM]
+        user.is_active = True
+        user.is_staff = current[IS_STAFF_CLAIM]
+        user.is_superuser = current[IS_SUPERUSER_CLAIM]
+        user._state.adding = False
+        # Объект годится для фильтров и FK (user=request.user), но не для сохранения
+        user.save = _read_only_save
+        return self._with_claims(user, current)
+
+    @staticmethod
+    def _with_claims(user, claims):
+        # role / shop_id — для IsSupplier и partner-views без запросов профиля и магазина
+        user.token_role = claims[ROLE_CLAIM]
+        user.token_shop_id = claims[SHOP_CLAIM]
+        return user
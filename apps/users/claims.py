@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+ROLE_CLAIM = "role"
+SHOP_CLAIM = "shop_id"
+USERNAME_CLAIM = "username"
+IS_ACTIVE_CLAIM = "is_active"
+IS_STAFF_CLAIM = "is_staff"
+IS_SUPERUSER_CLAIM = "is_superuser"
+
+CLAIMS = (ROLE_CLAIM, SHOP_CLAIM, USERNAME_CLAIM, IS_ACTIVE_CLAIM, IS_STAFF_CLAIM, IS_SUPERUSER_CLAIM)
+# Поля User, которые попадают в claims: их изменение делает выданные токены устаревшими
+USER_CLAIM_FIELDS = frozenset({"username", "is_active", "is_staff", "is_superuser"})
+
+
+def _claims_key(user_id) -> str:
+    return f"auth:claims:{user_id}"
+
+
+def user_claims(user) -> dict:
+    """
+    Текущие claims пользователя из БД (при выдаче и обновлении токена).
+    """
+    from apps.catalog.models import Shop
+    from apps.users.models import UserProfile
+
+    role = UserProfile.objects.filter(user_id=user.pk).values_list("role", flat=True).first()
+    shop_id = Shop.objects.filter(user_id=user.pk).values_list("id", flat=True).first()
+    return {
+        ROLE_CLAIM: role,
+        SHOP_CLAIM: shop_id,
+        USERNAME_CLAIM: user.get_username(),
+        IS_ACTIVE_CLAIM: user.is_active,
+        IS_STAFF_CLAIM: user.is_staff,
+        IS_SUPERUSER_CLAIM: user.is_superuser,
+    }
+
+
+def add_claims(token, user) -> None:
+    for claim, value in user_claims(user).items():
+        token[claim] = value
+
+
+def token_claims(token) -> dict:
+    return {claim: token.get(claim) for claim in CLAIMS}
+
+
+def cached_claims(user_id) -> dict | None:
+    """
+    Актуальные claims пользователя из общего кэша; None — записи нет, верить токену нельзя.
+    """
+    return cache.get(_claims_key(user_id))
+
+
+def remember_claims(user_id, claims: dict) -> None:
+    # add, а не set: сброс из mark_claims_changed, случившийся во время нашего чтения из БД, не затираем
+    lifetime = settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"]
+    cache.add(_claims_key(user_id), claims, timeout=int(lifetime.total_seconds()))
+
+
+def mark_claims_changed(user_id) -> None:
+    """
+    Роль, магазин или флаги пользователя изменились: сбрасываем запись в кэше, и следующий
+    запрос пользователя сверяется с БД. Токены со старыми claims после этого не совпадут
+    с новой записью и тоже пойдут в БД, пока клиент не обновит токен.
+    """
+    if not user_id:
+        return
+    key = _claims_key(user_id)
+    cache.delete(key)
+    # Повторно после коммита: запрос, прочитавший из БД старые значения до коммита, мог успеть их записать
+    transaction.on_commit(lambda: cache.delete(key))
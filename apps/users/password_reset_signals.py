@@ -1,40 +1,30 @@
-from django.conf import settings
-from django.core.mail import send_mail
+import logging
+
+from django.db import transaction
 from django.dispatch import receiver
 
 from django_rest_passwordreset.signals import reset_password_token_created
 
+logger = logging.getLogger(__name__)
+
 
 @receiver(reset_password_token_created)
 def password_reset_token_created(sender, instance, reset_password_token, *args, **kwargs):
     """
-    Sends email with password reset token.
-    Сейчас EMAIL_BACKEND = console -> письмо появится в терминале runserver.
+    Sends email with password reset token (apps.users.tasks, очередь notifications).
+    Сейчас EMAIL_BACKEND = console -> письмо появится в терминале runserver / воркера.
     """
-    user = reset_password_token.user
-    to_email = getattr(user, "email", "") or ""
-    if not to_email:
-        return
-
-    subject = "[RetailProcurement] Password reset"
-    # Можно сделать ссылку на фронт, если он появится:
-    # reset_link = f"{FRONT_URL}/reset-password?token={reset_password_token.key}"
-    message = "\n".join(
-        [
-            f"Hello, {getattr(user, 'username', 'user')}!",
-            "",
-            "You requested password reset.",
-            "",
-            f"Your reset token: {reset_password_token.key}",
-            "",
-            "If you did not request this, ignore this email.",
-        ]
-    )
-
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-        recipient_list=[to_email],
-        fail_silently=False,
-    )
\ No newline at end of file
+    # celery грузим только когда есть что отправить
+    from apps.users.tasks import send_password_reset_email
+
+    token_id = reset_password_token.pk
+
+    def enqueue():
+        try:
+            send_password_reset_email.delay(token_id)
+        except Exception:
+            # Токен создан — из-за недоступного брокера ответ не роняем
+            logger.exception("Failed to enqueue password reset email for token %s", token_id)
+
+    # Токен должен быть виден воркеру — ставим задачу после коммита
+    transaction.on_commit(enqueue)
@@ -4,6 +4,10 @@ from apps.users.models import UserProfile
 
 
 def _get_role(user):
+    # Роль из JWT-claims (ClaimsJWTAuthentication) — без запроса профиля
+    role = getattr(user, "token_role", None)
+    if role is not None:
+        return role
     return getattr(getattr(user, "profile", None), "role", None)
 
 
@@ -1,5 +1,10 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .claims import add_claims
 from .models import Contact
 
 User = get_user_model()
@@ -18,6 +23,35 @@ class RegisterSerializer(serializers.ModelSerializer):
         user.set_password(password)
         user.save()
         return user
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    /api/auth/login/: в токены добавляются role и shop_id.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        add_claims(token, user)
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    /api/auth/token/refresh/: новый access-токен получает актуальные role и shop_id.
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs["refresh"])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first() if user_id else None
+        if user is not None:
+            add_claims(refresh, user)
+            attrs = {**attrs, "refresh": str(refresh)}
+        return super().validate(attrs)
+
+
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from apps.catalog.models import Shop
+
+from .claims import USER_CLAIM_FIELDS, mark_claims_changed
 from .models import UserProfile
 
 User = get_user_model()
@@ -10,4 +13,47 @@ User = get_user_model()
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_claims_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Сохранение без update_fields (админка, смена пароля) могло поменять is_active / is_staff —
+    # сброс записи в кэше дешёвый, поэтому старые значения из БД не перечитываем
+    if not created and (update_fields is None or USER_CLAIM_FIELDS & set(update_fields)):
+        mark_claims_changed(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted_claims_changed(sender, instance, **kwargs):
+    mark_claims_changed(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_claims_changed(sender, instance, created, **kwargs):
+    if not created:
+        mark_claims_changed(instance.user_id)
+
+
+@receiver(pre_save, sender=Shop)
+def remember_shop_owner(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "user" not in update_fields:
+        instance._previous_user_id = instance.user_id
+        return
+    instance._previous_user_id = (
+        Shop.objects.filter(pk=instance.pk).values_list("user_id", flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Shop)
+def shop_claims_changed(sender, instance, **kwargs):
+    # shop_id в токене меняется только при смене владельца магазина
+    previous = getattr(instance, "_previous_user_id", None)
+    if previous != instance.user_id:
+        mark_claims_changed(previous)
+        mark_claims_changed(instance.user_id)
+
+
+@receiver(post_delete, sender=Shop)
+def shop_deleted_claims_changed(sender, instance, **kwargs):
+    mark_claims_changed(instance.user_id)
@@ -0,0 +1,58 @@
+"""
+Фоновые задачи пользователей (очередь notifications).
+"""
+from __future__ import annotations
+
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django_rest_passwordreset.models import ResetPasswordToken
+
+from config.celery import app
+
+
+@app.task(
+    autoretry_for=(SMTPException, OSError),
+    retry_backoff=True,
+    retry_backoff_max=60,
+    max_retries=5,
+    # Пользователь ждёт это письмо прямо сейчас — раньше писем о заказах
+    priority=0,
+)
+def send_password_reset_email(token_id: int) -> None:
+    """
+    Письмо с токеном сброса пароля. В брокер уходит только id токена, не сам токен.
+    """
+    reset_password_token = ResetPasswordToken.objects.select_related("user").filter(pk=token_id).first()
+    if reset_password_token is None:
+        # Токен уже использован или удалён
+        return
+
+    user = reset_password_token.user
+    to_email = getattr(user, "email", "") or ""
+    if not to_email:
+        return
+
+    subject = "[RetailProcurement] Password reset"
+    # Можно сделать ссылку на фронт, если он появится:
+    # reset_link = f"{FRONT_URL}/reset-password?token={reset_password_token.key}"
+    message = "\n".join(
+        [
+            f"Hello, {getattr(user, 'username', 'user')}!",
+            "",
+            "You requested password reset.",
+            "",
+            f"Your reset token: {reset_password_token.key}",
+            "",
+            "If you did not request this, ignore this email.",
+        ]
+    )
+
+    send_mail(
+        subject=subject,
+        message=message,
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
+        recipient_list=[to_email],
+        fail_silently=False,
+    )
@@ -1,3 +1,309 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django_rest_passwordreset.models import ResetPasswordToken
+from rest_framework.test import APIClient
+
+from apps.common.testing import QueryBudgetTestCase, make_user
+from apps.users.models import Contact, UserProfile
+from apps.users.tasks import send_password_reset_email
+from apps.users.throttling import LocMemTokenBucketStore, RedisTokenBucketStore, TOKEN_BUCKET_LUA, throttle_stats
+from config.schema import schema_path, schema_store
+
+User = get_user_model()
+
+
+class UsersQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = make_user()
+        self.contacts: list[Contact] = []
+
+    def seed_contacts(self, scale):
+        self.contacts += Contact.objects.bulk_create(
+            Contact(user=self.user, type=Contact.ContactType.PHONE, value=f"+7900{i:07d}")
+            for i in range(len(self.contacts), scale)
+        )
+
+    def test_register(self):
+        self.assertQueryBudget(
+            3, self.api.post, "/api/auth/register/",
+            {"username": "newbie", "email": "newbie@example.com", "password": "Str0ng-pass-123"},
+            format="json", expected_status=201,
+        )
+
+    def test_login_and_refresh(self):
+        response = self.assertQueryBudget(
+            3, self.api.post, "/api/auth/login/",
+            {"username": self.user.username, "password": "pw123456"}, format="json",
+        )
+        self.assertQueryBudget(
+            4, self.api.post, "/api/auth/token/refresh/", {"refresh": response.data["refresh"]}, format="json"
+        )
+
+    def test_contacts(self):
+        self.api.force_authenticate(self.user)
+        self.assertBudgetAtScales(1, self.seed_contacts, lambda: (self.api.get, ("/api/contacts/",), {}))
+        self.assertQueryBudget(
+            2, self.api.post, "/api/contacts/", {"type": "phone", "value": "+79990000000"},
+            format="json", expected_status=201,
+        )
+        contact = self.contacts[0]
+        self.assertQueryBudget(
+            2, self.api.patch, f"/api/contacts/{contact.id}/", {"value": "+79001111111"}, format="json"
+        )
+        self.assertQueryBudget(2, self.api.delete, f"/api/contacts/{contact.id}/")
+
+    def test_password_reset(self):
+        self.assertQueryBudget(
+            4, self.api.post, "/api/password_reset/", {"email": self.user.email}, format="json"
+        )
+
+    def test_password_reset_survives_broker_failure(self):
+        with mock.patch.object(send_password_reset_email, "delay", side_effect=ConnectionError) as delay, \
+                self.assertLogs("apps.users", "ERROR"), self.captureOnCommitCallbacks(execute=True):
+            response = self.api.post("/api/password_reset/", {"email": self.user.email}, format="json")
+        self.assertEqual(response.status_code, 200)
+        delay.assert_called_once_with(ResetPasswordToken.objects.get(user=self.user).pk)
+
+    def test_password_reset_validate_and_confirm(self):
+        token = ResetPasswordToken.objects.create(user=self.user)
+        self.assertQueryBudget(
+            1, self.api.post, "/api/password_reset/validate_token/", {"token": token.key}, format="json"
+        )
+        self.assertQueryBudget(
+            5, self.api.post, "/api/password_reset/confirm/",
+            {"token": token.key, "password": "N3w-Str0ng-pass"}, format="json",
+        )
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("N3w-Str0ng-pass"))
+        self.assertFalse(ResetPasswordToken.objects.filter(user=self.user).exists())
+
+    def test_service_endpoints(self):
+        admin = make_user(is_staff=True)
+        self.api.force_authenticate(admin)
+        self.assertQueryBudget(0, self.api.get, "/api/throttle/stats/")
+        self.assertQueryBudget(0, self.api.get, "/metrics")
+        self.assertQueryBudget(0, self.api.get, "/api/schema/")
+        self.assertQueryBudget(0, self.api.get, "/api/docs/")
+        self.assertQueryBudget(0, self.api.get, "/api/redoc/")
+
+
+@override_settings(AUTH_TRUST_TOKEN_CLAIMS=True)
+class ClaimsJWTAuthenticationTests(QueryBudgetTestCase):
+    """
+    Настоящие Bearer-токены из /api/auth/login/, а не force_authenticate: проверяется сама аутентификация.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+
+    def login(self, user):
+        response = self.api.post(
+            "/api/auth/login/", {"username": user.username, "password": "pw123456"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        # Кэш claims заполняет первый запрос с токеном — дальше его ждём без запросов к БД
+        cache.delete(f"auth:claims:{user.pk}")
+
+    def test_staff_user_from_claims(self):
+        self.login(make_user(is_staff=True))
+        self.assertQueryBudget(3, self.api.get, "/api/throttle/stats/")
+        self.assertQueryBudget(0, self.api.get, "/api/throttle/stats/")
+
+    def test_client_permissions_from_claims(self):
+        self.login(make_user())
+        self.api.get("/api/contacts/")
+        self.assertQueryBudget(1, self.api.get, "/api/contacts/")
+        self.api.get("/api/throttle/stats/")
+        self.assertEqual(self.api.get("/api/throttle/stats/").status_code, 403)
+
+    def test_deactivated_user_rejected(self):
+        user = make_user(is_staff=True)
+        self.login(user)
+        self.assertEqual(self.api.get("/api/throttle/stats/").status_code, 200)
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.api.get("/api/throttle/stats/").status_code, 401)
+        self.assertEqual(self.api.get("/api/throttle/stats/").status_code, 401)
+
+    def test_deleted_user_rejected(self):
+        user = make_user()
+        self.login(user)
+        self.assertEqual(self.api.get("/api/contacts/").status_code, 200)
+        user.delete()
+        self.assertEqual(self.api.get("/api/contacts/").status_code, 401)
+
+    def test_stale_token_checked_against_database(self):
+        user = make_user(is_staff=True)
+        self.login(user)
+        self.assertEqual(self.api.get("/api/throttle/stats/").status_code, 200)
+        user.is_staff = False
+        user.save()
+        # Старый токен всё ещё говорит is_staff=True — и до, и после восстановления записи в кэше
+        self.assertEqual(self.api.get("/api/throttle/stats/").status_code, 403)
+        self.assertEqual(self.api.get("/api/throttle/stats/").status_code, 403)
+
+        profile = user.profile
+        profile.role = UserProfile.Role.SUPPLIER
+        profile.save()
+        self.login(user)
+        self.assertEqual(self.api.get("/api/contacts/").status_code, 403)
+        self.assertQueryBudget(0, self.api.get, "/api/throttle/stats/", expected_status=403)
+
+    @override_settings(AUTH_TRUST_TOKEN_CLAIMS=False)
+    def test_without_shared_cache_user_loaded_from_database(self):
+        user = make_user(is_staff=True)
+        self.login(user)
+        self.assertEqual(self.api.get("/api/throttle/stats/").status_code, 200)
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        self.assertEqual(self.api.get("/api/throttle/stats/").status_code, 401)
+
+
+class TokenBucketStoreTests(SimpleTestCase):
+    def test_burst_then_refill(self):
+        store = LocMemTokenBucketStore()
+        self.assertEqual(store.consume("k", 1.0, 2, now=0.0), (True, 0.0))
+        self.assertEqual(store.consume("k", 1.0, 2, now=0.0), (True, 0.0))
+        self.assertEqual(store.consume("k", 1.0, 2, now=0.0), (False, 1.0))
+        self.assertEqual(store.consume("k", 1.0, 2, now=0.5), (False, 0.5))
+        self.assertEqual(store.consume("k", 1.0, 2, now=1.5), (True, 0.0))
+        # Пополнение не выше ёмкости
+        self.assertTrue(store.consume("k", 1.0, 2, now=100.0)[0])
+        self.assertTrue(store.consume("k", 1.0, 2, now=100.0)[0])
+        self.assertFalse(store.consume("k", 1.0, 2, now=100.0)[0])
+
+    def test_keys_are_bounded(self):
+        store = LocMemTokenBucketStore(max_keys=2)
+        for key in ("a", "b", "c"):
+            store.consume(key, 1.0, 1, now=0.0)
+        # "a" вытеснен — снова с полным бакетом
+        self.assertEqual(store.consume("a", 1.0, 1, now=0.0), (True, 0.0))
+        self.assertEqual(store.consume("c", 1.0, 1, now=0.0), (False, 1.0))
+
+    def test_redis_store_uses_server_clock(self):
+        with mock.patch("redis.Redis.from_url") as from_url:
+            script = from_url.return_value.register_script.return_value
+            script.return_value = [0, b"0.25"]
+            store = RedisTokenBucketStore("redis://localhost/0")
+            self.assertEqual(store.consume("catalog:ip:1", 4.0, 10), (False, 0.25))
+        from_url.return_value.register_script.assert_called_once_with(TOKEN_BUCKET_LUA)
+        # Время клиента в скрипт не передаётся — только redis.call('TIME')
+        script.assert_called_once_with(keys=["throttle:catalog:ip:1"], args=[4.0, 10])
+        self.assertIn("redis.call('TIME')", TOKEN_BUCKET_LUA)
+
+    def test_redis_store_fails_open(self):
+        import redis
+
+        with mock.patch("redis.Redis.from_url") as from_url:
+            from_url.return_value.register_script.return_value.side_effect = redis.ConnectionError("refused")
+            store = RedisTokenBucketStore("redis://localhost/0", timeout=0.05)
+            with self.assertLogs("apps.users.throttling", "WARNING"):
+                self.assertEqual(store.consume("catalog:ip:1", 4.0, 10), (True, 0.0))
+        from_url.assert_called_once_with("redis://localhost/0", socket_timeout=0.05, socket_connect_timeout=0.05)
+
+
+@override_settings(
+    THROTTLE_BUCKETS={"basket": {"rate": "1/m", "burst": 2}},
+    DATABASE_REPLICAS=[],
+)
+class ThrottleRequestTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("apps.users.throttling._store", LocMemTokenBucketStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.api = APIClient()
+        self.user = make_user()
+        self.api.force_authenticate(self.user)
+
+    def add_item(self, api=None):
+        return (api or self.api).post("/api/basket/items/", {"product_info_id": 0, "quantity": 1}, format="json")
+
+    def test_basket_writes_limited_per_user(self):
+        before = throttle_stats.snapshot().get("basket", {"allowed": 0, "denied": 0})
+        self.assertNotEqual(self.add_item().status_code, 429)
+        self.assertNotEqual(self.add_item().status_code, 429)
+        response = self.add_item()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response["Retry-After"]) <= 60)
+
+        after = throttle_stats.snapshot()["basket"]
+        self.assertEqual(after["allowed"] - before["allowed"], 2)
+        self.assertEqual(after["denied"] - before["denied"], 1)
+
+        # Чтение корзины не ограничено, у другого пользователя — свой бакет
+        self.assertEqual(self.api.get("/api/basket/").status_code, 200)
+        other = APIClient()
+        other.force_authenticate(make_user())
+        self.assertNotEqual(self.add_item(other).status_code, 429)
+
+    @override_settings(THROTTLE_BUCKETS={})
+    def test_unconfigured_scope_not_limited(self):
+        for _ in range(5):
+            self.assertNotEqual(self.add_item().status_code, 429)
+
+
+@override_settings(THROTTLE_BUCKETS={}, DATABASE_REPLICAS=[])
+class MetricsEndpointTests(TestCase):
+    def get(self, remote_addr="127.0.0.1", **headers):
+        return self.client.get("/metrics", REMOTE_ADDR=remote_addr, headers=headers)
+
+    def test_allowed_networks_without_token(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.assertEqual(self.get("::1").status_code, 200)
+        self.assertEqual(self.get("203.0.113.7").status_code, 403)
+        self.assertEqual(self.get("10.1.2.3").status_code, 403)
+        with self.settings(METRICS_ALLOWED_NETWORKS="10.0.0.0/8"):
+            self.assertEqual(self.get("10.1.2.3").status_code, 200)
+            self.assertEqual(self.get().status_code, 403)
+        with self.settings(METRICS_ALLOWED_NETWORKS=""):
+            self.assertEqual(self.get().status_code, 403)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token(self):
+        # С токеном адрес не важен — только заголовок
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get(Authorization="Bearer wrong").status_code, 403)
+        self.assertEqual(self.get("203.0.113.7", Authorization="Bearer s3cret").status_code, 200)
+
+    def test_exposed_counters(self):
+        self.client.get("/api/catalog/categories/")
+        body = self.get().content.decode()
+        for line in (
+            "# TYPE http_requests_total counter",
+            'http_requests_total{view="catalog-categories",status="200"} ',
+            'http_request_db_queries_count{view="catalog-categories"} ',
+            "# TYPE throttle_requests_total counter",
+            'catalog_lookup_cache_requests_total{table="category",result="hits"} ',
+            'catalog_lookup_cache_size{table="parameter"} ',
+        ):
+            self.assertIn(line, body)
+
+
+class OpenApiSchemaTests(SimpleTestCase):
+    def setUp(self):
+        schema_store.reset()
+        self.addCleanup(schema_store.reset)
+
+    def test_served_from_built_file_with_etag(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(OPENAPI_SCHEMA_DIR=directory):
+            call_command("build_openapi_schema", verbosity=0)
+            schema_store.reset()
+
+            response = self.client.get("/api/schema/?format=json")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, schema_path("json").read_bytes())
+            self.assertEqual(response["Content-Type"], "application/vnd.oai.openapi+json")
+
+            cached = self.client.get("/api/schema/?format=json", HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(cached.status_code, 304)
+
+            yaml_response = self.client.get("/api/schema/")
+            self.assertEqual(yaml_response.content, schema_path("yaml").read_bytes())
+            self.assertNotEqual(yaml_response["ETag"], response["ETag"])
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate: str) -> float:
+    """
+    "20/s", "100/m", "1000/h" -> токенов в секунду.
+    """
+    num, period = rate.split("/")
+    return int(num) / _PERIODS[period[0]]
+
+
+class LocMemTokenBucketStore:
+    """
+    Token bucket в памяти процесса (один узел / тесты). На ключ хранится только
+    (tokens, ts); число ключей ограничено, старые вытесняются (LRU).
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, rate: float, capacity: int, now: float | None = None) -> tuple[bool, float]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, ts = self._buckets.pop(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - ts) * rate)
+            if tokens >= 1:
+                allowed, retry_after = True, 0.0
+                tokens -= 1
+            else:
+                allowed, retry_after = False, (1 - tokens) / rate
+
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+# Атомарно в Redis: пересчитать токены, списать один, продлить TTL ключа.
+# Время — часы сервера Redis (TIME), а не воркера: часы разных узлов расходятся,
+# и отстающий воркер иначе не пополнял бы бакет, а спешащий — пополнял лишнее
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    allowed = 1
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisTokenBucketStore:
+    """
+    Token bucket в Redis (или совместимом сервере) через Lua-скрипт — общий для всех воркеров.
+    Недоступный Redis не роняет запросы: короткие таймауты, и при ошибке запрос пропускается.
+    """
+
+    def __init__(self, url: str, prefix: str = "throttle:", timeout: float = 0.1):
+        import redis
+
+        self.prefix = prefix
+        self._errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._client.register_script(TOKEN_BUCKET_LUA)
+
+    def consume(self, key: str, rate: float, capacity: int) -> tuple[bool, float]:
+        try:
+            allowed, retry_after = self._script(keys=[self.prefix + key], args=[rate, capacity])
+        except self._errors as e:
+            # Лимит — не повод отказывать в обслуживании: без Redis пропускаем
+            logger.warning("Throttle store unavailable, request allowed: %s", e)
+            return True, 0.0
+        return bool(int(allowed)), float(retry_after)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                url = getattr(settings, "THROTTLE_REDIS_URL", "")
+                timeout = getattr(settings, "THROTTLE_REDIS_TIMEOUT", 0.1)
+                _store = RedisTokenBucketStore(url, timeout=timeout) if url else LocMemTokenBucketStore()
+    return _store
+
+
+class ThrottleStats:
+    """
+    Счётчики allowed/denied по группам (scope) в процессе — для планирования ёмкости.
+    """
+
+    def __init__(self):
+        self._counts: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, scope: str, allowed: bool) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(scope, {"allowed": 0, "denied": 0})
+            counts["allowed" if allowed else "denied"] += 1
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {scope: dict(counts) for scope, counts in self._counts.items()}
+
+
+throttle_stats = ThrottleStats()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Троттлинг по алгоритму token bucket: rate — скорость пополнения, burst — ёмкость.
+    Настройки группы берутся из settings.THROTTLE_BUCKETS[scope].
+    """
+    scope: str | None = None
+
+    def __init__(self):
+        self._retry_after = None
+
+    def get_config(self):
+        return getattr(settings, "THROTTLE_BUCKETS", {}).get(self.scope)
+
+    def get_cache_key(self, request, view) -> str:
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return f"{self.scope}:{ident}"
+
+    def allow_request(self, request, view) -> bool:
+        config = self.get_config()
+        if not config:
+            return True
+
+        allowed, retry_after = get_store().consume(
+            self.get_cache_key(request, view),
+            parse_rate(config["rate"]),
+            int(config.get("burst", 1)),
+        )
+        throttle_stats.record(self.scope, allowed)
+        self._retry_after = retry_after
+        return allowed
+
+    def wait(self):
+        return self._retry_after
+
+
+class CatalogReadThrottle(TokenBucketThrottle):
+    scope = "catalog"
+
+
+class BasketWriteThrottle(TokenBucketThrottle):
+    scope = "basket"
+
+    def allow_request(self, request, view) -> bool:
+        # Чтение корзины не ограничиваем — только изменения
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
+
+
+class ImportThrottle(TokenBucketThrottle):
+    scope = "imports"
+
+
+class OfferDeltaThrottle(TokenBucketThrottle):
+    scope = "offers"
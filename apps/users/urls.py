@@ -1,6 +1,6 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import RegisterAPIView, ContactListCreateAPIView, ContactDetailAPIView
+from .views import RegisterAPIView, ContactListCreateAPIView, ContactDetailAPIView, ThrottleStatsAPIView
 
 urlpatterns = [
     path("auth/register/", RegisterAPIView.as_view(), name="auth-register"),
@@ -9,4 +9,6 @@ urlpatterns = [
 
     path("contacts/", ContactListCreateAPIView.as_view(), name="contacts"),
     path("contacts/<int:contact_id>/", ContactDetailAPIView.as_view(), name="contact-detail"),
+
+    path("throttle/stats/", ThrottleStatsAPIView.as_view(), name="throttle-stats"),
 ]
\ No newline at end of file
@@ -8,10 +8,11 @@ from rest_framework.views import APIView
 
 from .serializers import RegisterSerializer
 
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from apps.users.permissions import IsClient
 from .models import Contact
 from .serializers import ContactSerializer
+from .throttling import throttle_stats
 
 def ok(data=None, http_status=status.HTTP_200_OK):
     return Response({"Status": True, "data": data, "errors": None}, status=http_status)
@@ -70,4 +71,13 @@ class ContactDetailAPIView(APIView):
             return fail("Contact not found", status.HTTP_404_NOT_FOUND)
 
         contact.delete()
-        return ok({"deleted": True})
\ No newline at end of file
+        return ok({"deleted": True})
+
+class ThrottleStatsAPIView(APIView):
+    """
+    Счётчики троттлинга (allowed/denied по группам) текущего процесса — для планирования ёмкости.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return ok(throttle_stats.snapshot())
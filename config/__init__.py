@@ -0,0 +1,4 @@
+# Celery-приложение загружается вместе с Django: @shared_task и celery -A config используют его
+from .celery import app as celery_app
+
+__all__ = ("celery_app",)
@@ -0,0 +1,107 @@
+"""
+Миксины админки для больших таблиц (каталог, заказы — миллионы строк).
+
+- LargeTableAdminMixin: changelist без точного COUNT(*) по всей таблице — оценка из
+  pg_class.reltuples (EstimatedCountPaginator) и без второго COUNT для «всего N».
+- PaginatedInlineMixin: инлайн показывает строки страницами, а не все позиции объекта сразу.
+
+Поиск (search_fields) по name/model каталога идёт по trigram-индексам (catalog 0005):
+icontains Django — это UPPER(col::text) LIKE UPPER(...), индексы построены по тому же выражению.
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_count(queryset) -> int | None:
+    """
+    Оценка числа строк по статистике планировщика — только для запроса по всей таблице
+    (без WHERE, DISTINCT, среза) на PostgreSQL. None — оценки нет, считать точно.
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.combinator or query.is_sliced:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # -1 — таблица ещё не анализировалась
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Нефильтрованный список таблицы больше ADMIN_ESTIMATED_COUNT_THRESHOLD строк считается
+    по reltuples (число страниц приблизительное); небольшие таблицы и фильтры — точным COUNT.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        estimate = estimated_count(self.object_list) if hasattr(self.object_list, "query") else None
+        if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    # «N результатов (всего M)» — это ещё один COUNT(*) по всей таблице на каждый поиск и фильтр
+    show_full_result_count = False
+
+
+class PaginatedInlineMixin:
+    """
+    Инлайн по per_page строк; страница — параметр <prefix>-page в адресе формы объекта.
+    Форма отправляется на тот же адрес, поэтому сохраняется именно показанная страница.
+    """
+    per_page = 50
+    template = "admin/edit_inline/tabular_paginated.html"
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset_class = super().get_formset(request, obj, **kwargs)
+        per_page = self.per_page
+
+        class PaginatedFormSet(formset_class):
+            def get_queryset(self):
+                if not hasattr(self, "_page"):
+                    self._page = Paginator(super().get_queryset(), per_page).get_page(
+                        request.GET.get(self.page_param)
+                    )
+                    self._queryset = self._page.object_list
+                return self._queryset
+
+            @property
+            def page_param(self) -> str:
+                return f"{self.prefix}-page"
+
+            @property
+            def page(self):
+                self.get_queryset()
+                return self._page
+
+            def page_links(self) -> list[tuple[int | str, str]]:
+                """
+                (номер, ссылка) для навигации; у текущей страницы и «…» ссылки нет.
+                """
+                page = self.page
+                links = []
+                for number in page.paginator.get_elided_page_range(page.number):
+                    if number == page.number or not isinstance(number, int):
+                        links.append((number, ""))
+                        continue
+                    params = request.GET.copy()
+                    params[self.page_param] = number
+                    links.append((number, f"?{params.urlencode()}"))
+                return links
+
+        return PaginatedFormSet
@@ -1,11 +1,72 @@
+"""
+Celery-приложение. Задачи лежат в apps/<app>/tasks.py и регистрируются на этом app
+(web-процесс импортирует их лениво — только когда ставит задачу в очередь).
+
+Очереди (маршруты — CELERY_TASK_ROUTES в settings):
+  imports       — импорт прайсов: долгие, грузят CPU и БД;
+  notifications — письма: короткие, ждут SMTP;
+  maintenance   — пересчёты и прочее фоновое обслуживание (очередь по умолчанию).
+
+Каждую очередь обслуживает свой воркер с профилем из WORKER_PROFILES (concurrency, prefetch,
+перезапуск процессов), чтобы долгий импорт не задерживал письма:
+
+  CELERY_WORKER_PROFILE=imports celery -A config worker -n imports@%h
+  CELERY_WORKER_PROFILE=notifications celery -A config worker -n notifications@%h
+  CELERY_WORKER_PROFILE=maintenance celery -A config worker -n maintenance@%h
+
+Без профиля воркер слушает все очереди (dev). Явные параметры командной строки (-Q, -c)
+важнее профиля.
+"""
 import os
+import sys
+import time
+
 from celery import Celery
-from celery.contrib.pytest import celery_app
+from celery.signals import celeryd_init
+
+
+def _is_celery_command() -> bool:
+    # celery ... или python -m celery ...
+    program = sys.argv[0] if sys.argv else ""
+    return os.path.basename(program) in ("celery", "celery.exe") or program.endswith(
+        os.path.join("celery", "__main__.py")
+    )
+
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Настройки соединений с БД для воркеров (см. DB_PROCESS_ROLE в settings). Модуль импортирует
+# и web-процесс (config/__init__.py) — ему роль не меняем
+if _is_celery_command():
+    os.environ.setdefault("DB_PROCESS_ROLE", "worker")
 
 app = Celery("config")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
-__all__ = ("celery_app",)
\ No newline at end of file
+
+@celeryd_init.connect
+def apply_worker_profile(sender=None, instance=None, conf=None, **kwargs):
+    name = os.getenv("CELERY_WORKER_PROFILE", "")
+    if not name:
+        return
+
+    from django.conf import settings
+
+    try:
+        profile = settings.WORKER_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown CELERY_WORKER_PROFILE={name!r}, expected one of {sorted(settings.WORKER_PROFILES)}")
+
+    # Опции из командной строки берутся раньше conf, поэтому профиль их не перекрывает
+    instance.app.amqp.queues.select(profile["queues"])
+    for key, value in profile.items():
+        if key != "queues":
+            conf[f"worker_{key}"] = value
+
+
+@app.task(name="config.celery.ping", ignore_result=False)
+def ping() -> float:
+    """
+    Время начала выполнения на воркере (time.time()) — задержку очереди меряет benchmark_task_latency.
+    """
+    return time.time()
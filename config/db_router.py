@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Чтения, которые можно отдавать реплике (имена URL): каталог и списки заказов/отчёты
+REPLICA_READ_VIEWS = frozenset({
+    "catalog-categories",
+    "catalog-shops",
+    "catalog-products",
+    "catalog-product-detail",
+    "client-orders",
+    "partner-orders",
+    "partner-orders-export",
+    "partner-analytics",
+})
+
+# Отставание реплики в секундах; 0 — если всё полученное уже применено или это не реплика
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+# Реплика, выбранная для текущего запроса (None — читаем с primary)
+_replica: ContextVar[str | None] = ContextVar("db_replica", default=None)
+
+
+@contextmanager
+def use_replica(enabled: bool = True, alias: str | None = None):
+    """
+    Чтения внутри блока идут на одну реплику: alias или выбранную при входе здоровую
+    (None, если таких нет). Все запросы блока видят одно состояние — COUNT страницы
+    и её строки не расходятся из-за разного отставания реплик.
+    """
+    if alias is None and enabled:
+        alias = pick_replica()
+    token = _replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaHealth:
+    """
+    Кэш проверки отставания реплик: не чаще раза в REPLICA_CHECK_INTERVAL секунд на реплику.
+    Недоступная или отстающая больше REPLICA_MAX_LAG_SECONDS реплика не используется.
+    """
+
+    def __init__(self):
+        self._checked: dict[str, tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias: str) -> bool:
+        interval = getattr(settings, "REPLICA_CHECK_INTERVAL", 5)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._checked.get(alias)
+        if cached and now - cached[0] < interval:
+            return cached[1]
+
+        healthy = self._check(alias)
+        with self._lock:
+            self._checked[alias] = (now, healthy)
+        return healthy
+
+    def _check(self, alias: str) -> bool:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError:
+            return False
+        return lag <= getattr(settings, "REPLICA_MAX_LAG_SECONDS", 5)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._checked.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+def pick_replica() -> str | None:
+    replicas = [alias for alias in getattr(settings, "DATABASE_REPLICAS", []) if replica_health.is_healthy(alias)]
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    """
+    Запись и всё по умолчанию — primary. Реплика — только для чтений, явно разрешённых
+    (use_replica: middleware для REPLICA_READ_VIEWS), и только если она не отстаёт.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, "DATABASE_REPLICAS", []):
+            return False
+        return None
@@ -0,0 +1,76 @@
+"""
+JSON-рендерер и парсер DRF на orjson. Вывод байт в байт совпадает со стандартным
+JSONRenderer (компактный, UTF-8, \\u2028/\\u2029 экранированы, datetime с "Z", Decimal вне
+сериализаторов — числом): всё, что orjson не умеет сам, кодирует тот же rest_framework JSONEncoder.
+Без orjson, для indent и в редких случаях, которые orjson не принимает (целые больше 64 бит,
+нестроковые ключи сложных типов), работает стандартная реализация.
+
+Известные отличия: float с экспонентой (1e+16 у json против 1e16 у orjson) — в наших ответах
+float появляется только из Decimal вне сериализаторов; парсер читает целые больше 64 бит
+как float — IntegerField такое значение всё равно отклоняет.
+"""
+from __future__ import annotations
+
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson из requirements.txt
+    orjson = None
+
+_LINE_SEPARATOR = "\u2028".encode()
+_PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+
+def orjson_available() -> bool:
+    return orjson is not None
+
+
+class FastJSONRenderer(JSONRenderer):
+    _default = staticmethod(JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self._default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if _LINE_SEPARATOR in ret or _PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(_LINE_SEPARATOR, b"\\u2028").replace(_PARAGRAPH_SEPARATOR, b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Ошибка (или то, что orjson не принимает) — стандартный парсер с его сообщением
+            return super().parse(io.BytesIO(body), media_type, parser_context)
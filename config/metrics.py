@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from ipaddress import ip_address, ip_network
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами: на серию — счётчики по корзинам, сумма и количество.
+    """
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float],
+                 labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [счётчики по корзинам + +Inf, сумма, количество]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, ([*s[0]], s[1], s[2])) for labels, s in self._series.items())
+        names = (*self.labelnames, "le")
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(names, (*labels, le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by view and status code.", ("view", "status"))
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Wall time of the request.", TIME_BUCKETS, ("view",)
+)
+DB_QUERIES = Histogram("http_request_db_queries", "DB queries per request.", QUERY_BUCKETS, ("view",))
+DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Total DB time per request.", TIME_BUCKETS, ("view",)
+)
+RENDER_DURATION = Histogram(
+    "http_response_render_seconds", "Time spent rendering the response body.", TIME_BUCKETS, ("view",)
+)
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "Response body size.", SIZE_BUCKETS, ("view",))
+DB_CONNECTIONS = Counter(
+    "db_connections_opened_total", "New DB connections (handshakes) by database alias.", ("alias",)
+)
+
+METRICS = [REQUESTS, REQUEST_DURATION, DB_QUERIES, DB_DURATION, RENDER_DURATION, RESPONSE_SIZE, DB_CONNECTIONS]
+
+
+def _count_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS.inc(connection.alias)
+
+
+connection_created.connect(_count_connection, dispatch_uid="metrics_count_connection")
+
+# Дополнительные источники метрик (троттлинг, пулы соединений и т.п.): функции, возвращающие строки
+_collectors: list[Callable[[], list[str]]] = []
+
+
+def register_collector(collector: Callable[[], list[str]]) -> Callable[[], list[str]]:
+    _collectors.append(collector)
+    return collector
+
+
+@register_collector
+def _throttle_collector() -> list[str]:
+    from apps.users.throttling import throttle_stats
+
+    name = "throttle_requests_total"
+    lines = [f"# HELP {name} Throttle decisions by scope.", f"# TYPE {name} counter"]
+    for scope, counts in sorted(throttle_stats.snapshot().items()):
+        for result, value in sorted(counts.items()):
+            lines.append(f"{name}{_labels(('scope', 'result'), (scope, result))} {value}")
+    return lines
+
+
+@register_collector
+def _lookup_cache_collector() -> list[str]:
+    from apps.catalog.services.lookups import LOOKUP_CACHES
+
+    lines: list[str] = []
+    for name, kind, key, documentation in (
+        ("catalog_lookup_cache_requests_total", "counter", None, "Category/Parameter name -> id lookups."),
+        ("catalog_lookup_cache_size", "gauge", "size", "Names held in the process cache."),
+    ):
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+        for table, lookup_cache in sorted(LOOKUP_CACHES.items()):
+            stats = lookup_cache.snapshot()
+            if key:
+                lines.append(f"{name}{_labels(('table',), (table,))} {stats[key]}")
+                continue
+            for result in ("hits", "misses"):
+                lines.append(f"{name}{_labels(('table', 'result'), (table, result))} {stats[result]}")
+    return lines
+
+
+# Статистика psycopg_pool: (ключ get_stats(), метрика, тип, описание)
+POOL_STATS = (
+    ("pool_max", "db_pool_max_size", "gauge", "Configured maximum pool size."),
+    ("pool_size", "db_pool_size", "gauge", "Connections currently managed by the pool."),
+    ("pool_available", "db_pool_available", "gauge", "Idle connections in the pool."),
+    ("requests_waiting", "db_pool_requests_waiting", "gauge", "Requests waiting for a connection."),
+    ("requests_num", "db_pool_requests_total", "counter", "Connection requests served."),
+    ("requests_queued", "db_pool_requests_queued_total", "counter", "Requests that had to wait."),
+    ("requests_wait_ms", "db_pool_requests_wait_ms_total", "counter", "Total time spent waiting, ms."),
+    ("requests_errors", "db_pool_requests_errors_total", "counter", "Requests that timed out or failed."),
+    ("connections_num", "db_pool_connections_total", "counter", "Connections opened by the pool."),
+    ("connections_lost", "db_pool_connections_lost_total", "counter", "Connections found broken."),
+)
+
+
+@register_collector
+def _db_pool_collector() -> list[str]:
+    pools = {
+        conn.alias: conn.pool.get_stats()
+        for conn in connections.all()
+        if conn.settings_dict.get("OPTIONS", {}).get("pool")
+    }
+    if not pools:
+        return []
+
+    lines: list[str] = []
+    for key, name, kind, documentation in POOL_STATS:
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+        for alias, stats in sorted(pools.items()):
+            lines.append(f"{name}{_labels(('alias',), (alias,))} {stats.get(key, 0)}")
+
+    name = "db_pool_utilization"
+    lines += [f"# HELP {name} Share of pool_max connections in use.", f"# TYPE {name} gauge"]
+    for alias, stats in sorted(pools.items()):
+        in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+        utilization = in_use / stats["pool_max"] if stats.get("pool_max") else 0.0
+        lines.append(f"{name}{_labels(('alias',), (alias,))} {_number(float(utilization))}")
+    return lines
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for metric in METRICS:
+        lines.extend(metric.collect())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+@lru_cache(maxsize=8)
+def _networks(spec: str) -> tuple:
+    return tuple(ip_network(item.strip(), strict=False) for item in spec.split(",") if item.strip())
+
+
+def _from_allowed_network(request) -> bool:
+    try:
+        address = ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(address in network for network in _networks(getattr(settings, "METRICS_ALLOWED_NETWORKS", "")))
+
+
+def metrics_view(request):
+    """
+    Метрики процесса в формате Prometheus. Если задан METRICS_TOKEN — нужен заголовок
+    Authorization: Bearer <token>; без токена — только с адресов METRICS_ALLOWED_NETWORKS.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        allowed = constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+    else:
+        allowed = _from_allowed_network(request)
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.middleware.gzip import GZipMiddleware
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from config import metrics
+from config.db_router import REPLICA_READ_VIEWS, use_replica
+
+logger = logging.getLogger("perf")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+DB_PIN_COOKIE = "db_pin"
+
+SQL_LOG_LIMIT = 500
+
+# Уже сжатые форматы: повторное сжатие только тратит CPU
+COMPRESSION_SKIP_TYPES = ("image/", "video/", "application/gzip", "application/zip", "application/vnd.openxmlformats")
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+
+class QueryStats:
+    """
+    execute_wrapper: считает запросы и время в БД, держит top N самых медленных.
+    """
+
+    def __init__(self, top_n: int = 5):
+        self.top_n = top_n
+        self.count = 0
+        self.duration = 0.0
+        self._slowest: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if self.top_n:
+                entry = (elapsed, next(self._seq), sql)
+                if len(self._slowest) < self.top_n:
+                    heapq.heappush(self._slowest, entry)
+                elif elapsed > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> list[tuple[float, str]]:
+        return [(elapsed, sql) for elapsed, _, sql in sorted(self._slowest, reverse=True)]
+
+
+# Статистика SQL текущего запроса. ContextVar, а не атрибут соединения: под ASGI ORM
+# выполняется в потоке sync_to_async, а контекст туда копируется вместе с запросом.
+_current_queries: ContextVar[QueryStats | None] = ContextVar("perf_current_queries", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    queries = _current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    return queries(execute, sql, params, many, context)
+
+
+def _install_query_wrapper(connection) -> None:
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install_query_wrapper(connection)
+
+
+connection_created.connect(_on_connection_created, dispatch_uid="perf_query_wrapper")
+
+
+def _view_label(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.view_name or "unnamed"
+
+
+class RequestMetricsMiddleware:
+    """
+    На каждый запрос: общее время, число и время SQL, время рендера ответа и его размер.
+    Метка — имя URL (catalog-products, basket-checkout, ...). Данные уходят в гистограммы
+    config.metrics (/metrics), по желанию — в заголовок Server-Timing и в лог медленных запросов.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "PERF_METRICS_ENABLED", True)
+        self.server_timing = getattr(settings, "PERF_SERVER_TIMING", False)
+        self.slow_request_ms = getattr(settings, "PERF_SLOW_REQUEST_MS", 1000)
+        self.slow_sql_top = getattr(settings, "PERF_SLOW_SQL_TOP", 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        # Соединения, открытые до подключения сигнала (например, в тестах)
+        for connection in connections.all(initialized_only=True):
+            _install_query_wrapper(connection)
+
+        queries, token = self._start(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_queries.reset(token)
+        self._record(request, response, queries, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        queries, token = self._start(request)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_queries.reset(token)
+        self._record(request, response, queries, time.perf_counter() - start)
+        return response
+
+    def _start(self, request):
+        request._perf_render = 0.0
+        queries = QueryStats(self.slow_sql_top)
+        return queries, _current_queries.set(queries)
+
+    def process_template_response(self, request, response):
+        # DRF Response рендерится (сериализация в JSON) уже после view — замеряем отдельно
+        if hasattr(request, "_perf_render"):
+            started = time.perf_counter()
+
+            def _rendered(rendered_response):
+                request._perf_render = time.perf_counter() - started
+
+            response.add_post_render_callback(_rendered)
+        return response
+
+    def _record(self, request, response, queries: QueryStats, total: float) -> None:
+        view = _view_label(request)
+        render = request._perf_render
+
+        metrics.REQUESTS.inc(view, response.status_code)
+        metrics.REQUEST_DURATION.observe(total, view)
+        metrics.DB_QUERIES.observe(queries.count, view)
+        metrics.DB_DURATION.observe(queries.duration, view)
+        metrics.RENDER_DURATION.observe(render, view)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), view)
+
+        if self.server_timing:
+            response["Server-Timing"] = (
+                f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries", '
+                f"render;dur={render * 1000:.1f}, "
+                f"total;dur={total * 1000:.1f}"
+            )
+
+        if total * 1000 >= self.slow_request_ms:
+            statements = "\n".join(
+                f"  {elapsed * 1000:.1f} ms: {sql[:SQL_LOG_LIMIT]}" for elapsed, sql in queries.slowest()
+            )
+            logger.warning(
+                "Slow request %s %s [%s] %.1f ms, status %s, %d queries / %.1f ms DB, render %.1f ms\n%s",
+                request.method, request.path, view, total * 1000, response.status_code,
+                queries.count, queries.duration * 1000, render * 1000, statements,
+            )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    GET к REPLICA_READ_VIEWS читает с реплики. После успешной записи клиент получает
+    короткоживущую cookie db_pin и следующие REPLICA_PIN_SECONDS секунд читает с primary
+    (read-your-writes).
+
+    Реплика выбирается один раз на запрос и ставится и снимается в одном блоке вокруг
+    get_response (use_replica) — поэтому решение принимается до view, по URL запроса,
+    а не в process_view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        self.pin_seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with use_replica(self._reads_from_replica(request)) as replica:
+            response = self.get_response(request)
+        return self._finish(request, response, replica)
+
+    async def __acall__(self, request):
+        with use_replica(self._reads_from_replica(request)) as replica:
+            response = await self.get_response(request)
+        return self._finish(request, response, replica)
+
+    def _reads_from_replica(self, request) -> bool:
+        if not self.replicas or request.method not in ("GET", "HEAD") or DB_PIN_COOKIE in request.COOKIES:
+            return False
+        # resolver_match появляется только в обработчике — резолвим сами (только для чтений при репликах)
+        try:
+            match = resolve(request.path_info, getattr(request, "urlconf", None))
+        except Resolver404:
+            return False
+        return match.url_name in REPLICA_READ_VIEWS
+
+    def _finish(self, request, response, replica: str | None):
+        if replica and response.streaming and not response.is_async:
+            # Выгрузки читают БД уже после выхода из view — с той же реплики
+            response.streaming_content = self._stream_from_replica(response.streaming_content, replica)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400 and self.replicas:
+            response.set_cookie(DB_PIN_COOKIE, "1", max_age=self.pin_seconds, httponly=True, samesite="Lax")
+        return response
+
+    @staticmethod
+    def _stream_from_replica(content, replica: str):
+        with use_replica(alias=replica):
+            yield from content
+
+
+def brotli_available() -> bool:
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Сжатие ответов от COMPRESSION_MIN_SIZE байт: brotli (если установлен пакет brotli
+    и клиент его принимает), иначе gzip. Потоковые ответы сжимаются по мере отдачи,
+    уже сжатые форматы (COMPRESSION_SKIP_TYPES, выгрузка ?gzip=1) не трогаем.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.brotli_quality = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 5)
+        self.brotli = brotli_available() and self.brotli_quality > 0
+
+    async def __acall__(self, request):
+        # Без перехода в поток, который MiddlewareMixin делает для process_response
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        if response.has_header("Content-Encoding") or response.get("Content-Type", "").startswith(
+            COMPRESSION_SKIP_TYPES
+        ):
+            return response
+        if self.brotli and re_accepts_brotli.search(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+            return self._compress_brotli(response)
+        return super().process_response(request, response)
+
+    def _compress_brotli(self, response):
+        import brotli
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._abrotli_stream(response.streaming_content)
+            else:
+                response.streaming_content = self._brotli_stream(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+    def _brotli_stream(self, chunks):
+        import brotli
+
+        compressor = brotli.Compressor(quality=self.brotli_quality)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    async def _abrotli_stream(self, chunks):
+        import brotli
+
+        compressor = brotli.Compressor(quality=self.brotli_quality)
+        async for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
@@ -0,0 +1,132 @@
+"""
+OpenAPI-схема без генерации на лету: manage.py build_openapi_schema пишет её в
+OPENAPI_SCHEMA_DIR/schema-<VERSION>.{yaml,json}, процесс читает файл один раз и отдаёт
+из памяти с ETag. Если файла нет — схема генерируется при первом запросе и тоже остаётся в памяти.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_safe
+
+SCHEMA_FORMATS = ("yaml", "json")
+
+# media type из Accept -> (формат, Content-Type ответа); как у SpectacularAPIView
+MEDIA_TYPES = {
+    "application/vnd.oai.openapi+json": ("json", "application/vnd.oai.openapi+json"),
+    "application/json": ("json", "application/json"),
+    "application/vnd.oai.openapi": ("yaml", "application/vnd.oai.openapi; charset=utf-8"),
+    "application/yaml": ("yaml", "application/yaml; charset=utf-8"),
+}
+DEFAULT_CONTENT_TYPES = {
+    "yaml": "application/vnd.oai.openapi; charset=utf-8",
+    "json": "application/vnd.oai.openapi+json",
+}
+
+
+def schema_version() -> str:
+    return str(settings.SPECTACULAR_SETTINGS.get("VERSION") or "0")
+
+
+def schema_path(fmt: str, directory: Path | None = None) -> Path:
+    directory = Path(directory or settings.OPENAPI_SCHEMA_DIR)
+    return directory / f"schema-{schema_version()}.{fmt}"
+
+
+def generate_schema() -> dict[str, bytes]:
+    """
+    Полная генерация (обход всех views) — медленно; для сборки и запасного пути.
+    """
+    from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        "yaml": OpenApiYamlRenderer().render(schema, renderer_context={}),
+        "json": OpenApiJsonRenderer().render(schema, renderer_context={}),
+    }
+
+
+class SchemaStore:
+    """
+    Документы схемы в памяти процесса: формат -> (тело, ETag).
+    """
+
+    def __init__(self):
+        self._documents: dict[str, tuple[bytes, str]] | None = None
+        self._lock = threading.Lock()
+
+    def get(self, fmt: str) -> tuple[bytes, str]:
+        if self._documents is None:
+            with self._lock:
+                if self._documents is None:
+                    self._documents = {
+                        name: (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+                        for name, body in self._load().items()
+                    }
+        return self._documents[fmt]
+
+    @staticmethod
+    def _load() -> dict[str, bytes]:
+        paths = {fmt: schema_path(fmt) for fmt in SCHEMA_FORMATS}
+        if all(path.exists() for path in paths.values()):
+            return {fmt: path.read_bytes() for fmt, path in paths.items()}
+        return generate_schema()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._documents = None
+
+
+schema_store = SchemaStore()
+
+
+def _negotiate(request) -> tuple[str, str]:
+    fmt = request.GET.get("format")
+    if fmt in SCHEMA_FORMATS:
+        return fmt, DEFAULT_CONTENT_TYPES[fmt]
+    for media_type in request.headers.get("Accept", "").split(","):
+        negotiated = MEDIA_TYPES.get(media_type.split(";")[0].strip())
+        if negotiated:
+            return negotiated
+    return "yaml", DEFAULT_CONTENT_TYPES["yaml"]
+
+
+def _schema_etag(request) -> str:
+    return schema_store.get(_negotiate(request)[0])[1]
+
+
+@require_safe
+@condition(etag_func=_schema_etag)
+def schema_view(request):
+    fmt, content_type = _negotiate(request)
+    body, _ = schema_store.get(fmt)
+    response = HttpResponse(body, content_type=content_type)
+    title = settings.SPECTACULAR_SETTINGS.get("TITLE") or "schema"
+    response["Content-Disposition"] = f'inline; filename="{title}.{fmt}"'
+    response["Vary"] = "Accept"
+    return response
+
+
+def lazy_view(dotted_path: str, **initkwargs):
+    """
+    View, класс которого импортируется при первом запросе: drf_spectacular.views тянет
+    генератор схемы, а Swagger/Redoc нужны редко — не платим за это на старте процесса.
+    """
+    view = None
+
+    @csrf_exempt
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return wrapper
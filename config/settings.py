@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 from datetime import timedelta
 
@@ -35,7 +36,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы время запроса включало все остальные middleware
+    "config.middleware.RequestMetricsMiddleware",
+    # Сразу после метрик: размер ответа в метриках — уже сжатый, как он уходит клиенту
+    "config.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "config.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -49,7 +55,8 @@ ROOT_URLCONF = "config.urls"
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [],
+        # Общие шаблоны админки (config/admin.py)
+        "DIRS": [BASE_DIR / "config" / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
@@ -63,6 +70,26 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# -----------------------
+# Database + connections
+# -----------------------
+# web — gunicorn/uvicorn, worker — celery (выставляется в config/celery.py).
+# Любую настройку ниже можно задать для роли (DB_WEB_POOL_MAX_SIZE) или общей (DB_POOL_MAX_SIZE).
+DB_PROCESS_ROLE = os.getenv("DB_PROCESS_ROLE", "web")
+# wsgi или asgi (выставляется в config/asgi.py)
+SERVER_INTERFACE = os.getenv("SERVER_INTERFACE", "wsgi")
+
+_DB_ROLE_DEFAULTS = {
+    "web": {"POOL_MIN_SIZE": "2", "POOL_MAX_SIZE": "10"},
+    "worker": {"POOL_MIN_SIZE": "1", "POOL_MAX_SIZE": "4"},
+}
+
+
+def _db_env(name: str, default: str) -> str:
+    default = _DB_ROLE_DEFAULTS.get(DB_PROCESS_ROLE, {}).get(name, default)
+    return os.getenv(f"DB_{DB_PROCESS_ROLE.upper()}_{name}", os.getenv(f"DB_{name}", default))
+
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -71,9 +98,62 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST", "127.0.0.1"),
         "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        # Постоянные соединения: одно на поток, живёт CONN_MAX_AGE секунд; перед
+        # повторным использованием проверяется (CONN_HEALTH_CHECKS). Под ASGI соединения
+        # не переиспользуются (каждый запрос — в новом потоке) и только копятся — там 0, а для
+        # переиспользования — DB_POOL=1
+        "CONN_MAX_AGE": 0 if SERVER_INTERFACE == "asgi" else int(_db_env("CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
 }
 
+# Пул соединений Django (нужен psycopg 3 + psycopg-pool): соединения берутся из общего пула процесса
+DB_POOL = _db_env("POOL", "0") == "1"
+if DB_POOL:
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError as e:
+        from django.core.exceptions import ImproperlyConfigured
+
+        raise ImproperlyConfigured("DB_POOL=1 requires psycopg[pool] (psycopg 3)") from e
+
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # с пулом постоянные соединения не используются
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(_db_env("POOL_MIN_SIZE", "2")),
+        "max_size": int(_db_env("POOL_MAX_SIZE", "10")),
+        # Сколько ждать свободное соединение, прежде чем отдать ошибку
+        "timeout": float(_db_env("POOL_TIMEOUT", "10")),
+        "max_idle": float(_db_env("POOL_MAX_IDLE", "300")),
+        "max_lifetime": float(_db_env("POOL_MAX_LIFETIME", "1800")),
+        # Проверку соединения при выдаче из пула Django включает сам (CONN_HEALTH_CHECKS)
+    }
+
+# Реплики только для чтения: DB_REPLICAS="host[:port][/dbname],..." -> алиасы replica1, replica2, ...
+# (для unix-сокета dbname обязателен: /var/run/postgresql/shop). Каталог и списки заказов читают
+# с них (config.db_router), запись — всегда в default.
+DATABASE_REPLICAS = []
+for _i, _spec in enumerate(filter(None, (s.strip() for s in os.getenv("DB_REPLICAS", "").split(","))), start=1):
+    _hostport, _, _name = _spec.rpartition("/") if "/" in _spec else (_spec, "", "")
+    _host, _, _port = _hostport.partition(":")
+    DATABASES[f"replica{_i}"] = {
+        **DATABASES["default"],
+        "HOST": _host or DATABASES["default"]["HOST"],
+        "PORT": _port or DATABASES["default"]["PORT"],
+        "NAME": _name or DATABASES["default"]["NAME"],
+        "OPTIONS": {**DATABASES["default"]["OPTIONS"]},
+        # В тестах реплика — то же соединение, что и default
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{_i}")
+
+DATABASE_ROUTERS = ["config.db_router.ReplicaRouter"]
+# Реплика, отстающая больше чем на столько секунд, не используется (проверка раз в REPLICA_CHECK_INTERVAL)
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+# Сколько секунд после записи клиент читает только с primary
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -94,8 +174,19 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # -----------------------
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # orjson: тот же JSON, что у стандартного рендерера, в несколько раз быстрее
+    "DEFAULT_RENDERER_CLASSES": [
+        "config.fastjson.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.fastjson.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT с claims role/shop_id/флагами: пользователь собирается из токена (AUTH_TRUST_TOKEN_CLAIMS)
+        "apps.users.authentication.ClaimsJWTAuthentication",
         "rest_framework.authentication.BasicAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
@@ -105,11 +196,106 @@ REST_FRAMEWORK = {
 
 }
 
+# -----------------------
+# Throttling (token bucket)
+# -----------------------
+# rate — пополнение бакета, burst — его ёмкость. Группы назначаются во views через throttle_classes.
+THROTTLE_BUCKETS = {
+    "catalog": {
+        "rate": os.getenv("THROTTLE_CATALOG_RATE", "20/s"),
+        "burst": int(os.getenv("THROTTLE_CATALOG_BURST", "60")),
+    },
+    "basket": {
+        "rate": os.getenv("THROTTLE_BASKET_RATE", "5/s"),
+        "burst": int(os.getenv("THROTTLE_BASKET_BURST", "20")),
+    },
+    "imports": {
+        "rate": os.getenv("THROTTLE_IMPORTS_RATE", "6/m"),
+        "burst": int(os.getenv("THROTTLE_IMPORTS_BURST", "2")),
+    },
+    # Дельты остатков/цен поставщика: запрос лёгкий, но может нести тысячи позиций
+    "offers": {
+        "rate": os.getenv("THROTTLE_OFFERS_RATE", "1/s"),
+        "burst": int(os.getenv("THROTTLE_OFFERS_BURST", "10")),
+    },
+}
+# Пусто — бакеты в памяти процесса (один узел / тесты); иначе Redis-совместимый сервер
+THROTTLE_REDIS_URL = os.getenv("THROTTLE_REDIS_URL", "")
+# Таймаут соединения и ответа Redis троттлинга, сек: при ошибке или таймауте запрос пропускается
+THROTTLE_REDIS_TIMEOUT = float(os.getenv("THROTTLE_REDIS_TIMEOUT", "0.1"))
+
+# -----------------------
+# Cache / catalog
+# -----------------------
+# Пусто — LocMemCache (кэш и его сброс — в пределах процесса); иначе общий Redis для всех процессов
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+    }
+# Под ASGI каталог обслуживают async-views (apps/catalog/async_views.py)
+CATALOG_ASYNC_VIEWS = os.getenv("CATALOG_ASYNC_VIEWS", "0") == "1"
+# Кэш ответов async-каталога, сек; сбрасывается при любом изменении каталога. 0 — выключен
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "60"))
+
+# Импорт пишет параметры ещё и строками ProductParameter (админка, выгрузки). Каталог читает
+# только ProductInfo.params; 0 — импорт без EAV-строк, заметно быстрее
+CATALOG_PARAMS_EAV = os.getenv("CATALOG_PARAMS_EAV", "1") == "1"
+
+# Имён Category / Parameter в кэше name -> id процесса (на справочник, LRU)
+CATALOG_LOOKUP_CACHE_SIZE = int(os.getenv("CATALOG_LOOKUP_CACHE_SIZE", "10000"))
+
+# Позиций в одном POST /api/partner/offers/delta/
+PARTNER_OFFER_DELTA_MAX_ITEMS = int(os.getenv("PARTNER_OFFER_DELTA_MAX_ITEMS", "10000"))
+# Лента заказов поставщика (since): изменения моложе стольких секунд отдаются в следующем опросе —
+# транзакция, поставившая updated_at, должна успеть закоммититься
+PARTNER_ORDERS_SINCE_DELAY = float(os.getenv("PARTNER_ORDERS_SINCE_DELAY", "5"))
+# Ошибок проверки прайса в ответе импорта (считаются все, показываются первые)
+PRICE_IMPORT_MAX_ERRORS = int(os.getenv("PRICE_IMPORT_MAX_ERRORS", "50"))
+
+# -----------------------
+# Админка (config/admin.py)
+# -----------------------
+# Список таблицы больше стольких строк (по статистике pg_class) без фильтров — без точного COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv("ADMIN_ESTIMATED_COUNT_THRESHOLD", "100000"))
+
+# -----------------------
+# Автообновление прайсов (apps.partners.services.schedule), сек
+# -----------------------
+# Интервал проверки: меняется прайс — сжимается до MIN, не меняется — растёт до MAX
+PRICE_REFRESH_MIN_INTERVAL = int(os.getenv("PRICE_REFRESH_MIN_INTERVAL", "900"))
+PRICE_REFRESH_MAX_INTERVAL = int(os.getenv("PRICE_REFRESH_MAX_INTERVAL", "86400"))
+# Разброс момента следующей проверки: ±доля интервала
+PRICE_REFRESH_JITTER = float(os.getenv("PRICE_REFRESH_JITTER", "0.1"))
+# Сколько магазинов планировщик ставит в очередь за один проход
+PRICE_REFRESH_BATCH = int(os.getenv("PRICE_REFRESH_BATCH", "100"))
+
+# -----------------------
+# Performance metrics (/metrics)
+# -----------------------
+PERF_METRICS_ENABLED = os.getenv("PERF_METRICS_ENABLED", "1") == "1"
+PERF_SERVER_TIMING = os.getenv("PERF_SERVER_TIMING", "1" if DEBUG else "0") == "1"
+PERF_SLOW_REQUEST_MS = int(os.getenv("PERF_SLOW_REQUEST_MS", "1000"))
+PERF_SLOW_SQL_TOP = int(os.getenv("PERF_SLOW_SQL_TOP", "5"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Без METRICS_TOKEN /metrics отдаётся только этим сетям (REMOTE_ADDR: за прокси — адрес прокси)
+METRICS_ALLOWED_NETWORKS = os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.1/32,::1/128")
+
+# Сжатие ответов (config.middleware.CompressionMiddleware): меньше порога — отдаём как есть
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# brotli — только если установлен пакет brotli; 0 — только gzip
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Retail Procurement API",
     "DESCRIPTION": "Backend-сервис автоматизации закупок (Django + DRF).",
     "VERSION": "0.1.0",
 }
+# Сюда build_openapi_schema пишет schema-<VERSION>.yaml/.json; /api/schema/ отдаёт их из памяти
+OPENAPI_SCHEMA_DIR = Path(os.getenv("OPENAPI_SCHEMA_DIR", BASE_DIR / "openapi"))
 
 # -----------------------
 # Password Reset (Stage 1)
@@ -124,19 +310,88 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "no-reply@retail.local")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@retail.local")
 
 # -----------------------
-# Celery (Stage 1: config only)
+# Celery (config/celery.py, задачи — apps/<app>/tasks.py)
 # -----------------------
-CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://127.0.0.1:6379/0")
-CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://127.0.0.1:6379/1")
+# Eager-режим (задачи выполняются сразу в вызывающем процессе, брокер и результаты — в его памяти)
+# включается только явно: CELERY_TASK_ALWAYS_EAGER=1 в dev, а в тестах (manage.py test) — всегда
+TESTING = sys.argv[1:2] == ["test"]
+CELERY_TASK_ALWAYS_EAGER = TESTING or os.getenv("CELERY_TASK_ALWAYS_EAGER", "0") == "1"
+CELERY_BROKER_URL = os.getenv(
+    "CELERY_BROKER_URL", "memory://" if CELERY_TASK_ALWAYS_EAGER else "redis://127.0.0.1:6379/0"
+)
+CELERY_RESULT_BACKEND = os.getenv(
+    "CELERY_RESULT_BACKEND", "cache+memory://" if CELERY_TASK_ALWAYS_EAGER else "redis://127.0.0.1:6379/1"
+)
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 
+CELERY_TASK_DEFAULT_QUEUE = "maintenance"
+CELERY_TASK_CREATE_MISSING_QUEUES = True
+CELERY_TASK_ROUTES = {
+    "apps.partners.tasks.enqueue_due_imports": {"queue": "maintenance"},
+    "apps.partners.tasks.*": {"queue": "imports"},
+    "apps.orders.tasks.send_*": {"queue": "notifications"},
+    "apps.users.tasks.send_*": {"queue": "notifications"},
+}
+# Результат нужен только импорту (статус для поставщика); остальным задачам его не храним
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_RESULT_EXPIRES = timedelta(seconds=int(os.getenv("CELERY_RESULT_EXPIRES", "86400")))
+
+# Импорт: подтверждение после выполнения (acks_late) — упавший воркер не теряет прайс.
+# Redis вернёт неподтверждённую задачу в очередь через visibility_timeout, поэтому он
+# должен быть больше самого долгого импорта — иначе задача выполнится второй раз.
+IMPORT_TASK_SOFT_TIME_LIMIT = int(os.getenv("IMPORT_TASK_SOFT_TIME_LIMIT", "600"))
+IMPORT_TASK_TIME_LIMIT = IMPORT_TASK_SOFT_TIME_LIMIT + 60
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": IMPORT_TASK_TIME_LIMIT * 2,
+    # Приоритеты внутри очереди (в Redis 0 — самый срочный): сброс пароля раньше писем о заказах
+    "queue_order_strategy": "priority",
+    "priority_steps": [0, 3, 6, 9],
+}
+CELERY_TASK_DEFAULT_PRIORITY = 6
+
+# celery -A config beat: раз в минуту ставит в очередь прайсы, которым пора обновиться
+CELERY_BEAT_SCHEDULE = {
+    "enqueue-due-price-imports": {
+        "task": "apps.partners.tasks.enqueue_due_imports",
+        "schedule": float(os.getenv("PRICE_REFRESH_TICK", "60")),
+    },
+}
+
+# Профили воркеров по очередям (CELERY_WORKER_PROFILE=<имя>, см. config/celery.py)
+WORKER_PROFILES = {
+    # CPU: процессов не больше ядер, по одной задаче за раз — остальные ждут в брокере,
+    # а не в буфере занятого процесса; процесс перезапускается, чтобы не копить память после YAML
+    "imports": {
+        "queues": ["imports"],
+        "concurrency": int(os.getenv("CELERY_IMPORTS_CONCURRENCY", "2")),
+        "prefetch_multiplier": 1,
+        "max_tasks_per_child": 50,
+    },
+    # I/O: задачи короткие и в основном ждут SMTP — процессов больше ядер, prefetch побольше
+    "notifications": {
+        "queues": ["notifications"],
+        "concurrency": int(os.getenv("CELERY_NOTIFICATIONS_CONCURRENCY", "8")),
+        "prefetch_multiplier": 4,
+    },
+    "maintenance": {
+        "queues": ["maintenance"],
+        "concurrency": int(os.getenv("CELERY_MAINTENANCE_CONCURRENCY", "1")),
+        "prefetch_multiplier": 1,
+    },
+}
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=2),  # 48 hour for refresh user token
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": False,
-}
\ No newline at end of file
+    "TOKEN_OBTAIN_SERIALIZER": "apps.users.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "apps.users.serializers.ClaimsTokenRefreshSerializer",
+}
+# Собирать пользователя из claims токена без запроса к БД. Актуальные claims хранятся в кэше,
+# и их сброс должен быть виден всем процессам — поэтому по умолчанию только с общим Redis-кэшем
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "1" if CACHE_REDIS_URL else "0") == "1"
@@ -17,22 +17,22 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView,
-)
+from config.metrics import metrics_view
+from config.schema import lazy_view, schema_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
 
+    # Prometheus
+    path("metrics", metrics_view, name="metrics"),
+
     # Password reset endpoints
     path("api/password_reset/", include("django_rest_passwordreset.urls", namespace="password_reset")),
 
-    # OpenAPI schema + docs
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
-    path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    # OpenAPI schema (собранная build_openapi_schema, из памяти) + docs
+    path("api/schema/", schema_view, name="schema"),
+    path("api/docs/", lazy_view("drf_spectacular.views.SpectacularSwaggerView", url_name="schema"), name="swagger-ui"),
+    path("api/redoc/", lazy_view("drf_spectacular.views.SpectacularRedocView", url_name="schema"), name="redoc"),
 
     path("api/", include("apps.users.urls")),
 